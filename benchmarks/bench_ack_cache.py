@@ -0,0 +1,30 @@
+"""
+Answering an interchange that was answered before: parsing it and
+generating the APERAK again compared to a digest and a lookup in the
+acknowledgement cache
+
+    python -m benchmarks.bench_ack_cache [n_messages]
+"""
+import io
+import sys
+import contextlib
+from types import SimpleNamespace
+
+import ediel_parser.lib.mailPipeline as pipeline
+from ediel_parser.lib.AckCache import AckCache
+from benchmarks.utils import utilts_interchange, rate, report
+from tests.utils import mail_with
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    options = SimpleNamespace(our_ediel='99999', our_city='Uzbekistan', utilts_err=False)
+    payload = mail_with(utilts_interchange(n))
+    cache = AckCache()
+    with contextlib.redirect_stdout(io.StringIO()):
+        first = pipeline.responses(payload, options)
+        cached = pipeline.responses(payload, options, cache)
+        assert [m.get_payload() for m in pipeline.responses(payload, options, cache)] == [m.get_payload() for m in cached]
+        assert len(first) == len(cached)
+        before = rate(lambda: pipeline.responses(payload, options))
+    after = rate(lambda: pipeline.responses(payload, options, cache))
+    report('duplicate interchange of {} messages'.format(n), before, after, 'mails/s')
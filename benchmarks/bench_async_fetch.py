@@ -0,0 +1,41 @@
+"""
+Fetching mails from a mailbox with a round trip time: one FETCH per mail
+and round trip (what EDICommunicator.get_mail_with does in a loop)
+compared to pipelined batches of AsyncEDICommunicator
+
+    python -m benchmarks.bench_async_fetch [n_mails] [rtt_ms]
+"""
+import sys
+import time
+import asyncio
+
+from ediel_parser.lib.AsyncEDICommunicator import AsyncEDICommunicator, WINDOW, BATCH_SIZE
+from benchmarks.utils import utilts_interchange, report
+from tests.imap_server import FakeIMAPServer
+
+async def fetch_all(server, window, batch_size):
+    com = AsyncEDICommunicator(username='u', password='p', server='127.0.0.1', port=server.port, use_tls=False,
+                               window=window, batch_size=batch_size)
+    async with com:
+        ids = await com.search('ALL')
+        start = time.perf_counter()
+        n = 0
+        async with com.fetch(ids) as mails:
+            async for mail_id, body in mails:
+                n += 1
+        return n / (time.perf_counter() - start)
+
+async def main(n, rtt):
+    mail = b'Subject: UTILTS\r\n\r\n' + utilts_interchange(10).encode('utf-8')
+    server = await FakeIMAPServer([mail] * n, latency=rtt).start()
+    try:
+        before = await fetch_all(server, 1, 1)
+        after = await fetch_all(server, WINDOW, BATCH_SIZE)
+        report('fetch {} mails, rtt {:.0f} ms'.format(n, rtt * 1000), before, after, 'mails/s')
+    finally:
+        await server.stop()
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rtt = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.005
+    asyncio.run(main(n, rtt))
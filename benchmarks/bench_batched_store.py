@@ -0,0 +1,39 @@
+"""
+Flagging and fetching mails over a connection with a round trip time:
+one STORE/FETCH per mail (what com.py did, on top of a new login per
+STORE) compared to the compressed id sets of EDICommunicator
+
+    python -m benchmarks.bench_batched_store [n_mails] [rtt_ms]
+"""
+import sys
+import time
+import imaplib
+
+from ediel_parser.lib.EDICommunicator import EDICommunicator
+from benchmarks.utils import report
+from tests.imap_server import FakeIMAPServer, serving
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rtt = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.005
+    mails = [b'Subject: UTILTS\r\n\r\nUNB+UNOC:3\r\n'] * n
+    with serving(FakeIMAPServer(mails, latency=rtt)) as server:
+        com = EDICommunicator()
+        com.imap = imaplib.IMAP4('127.0.0.1', server.port)
+        com.imap.login('user', 'pass')
+        com.imap.select()
+        ids = com.format_mail_ids(com.imap_search_query('ALL'))
+
+        before = n / timed(lambda: [com.imap_store_query(i, '+FLAGS', '(\\Seen \\Answered)') for i in ids])
+        after = n / timed(lambda: com.store_flags(ids, '+FLAGS', '(\\Seen \\Answered)'))
+        report('store {} mails, rtt {:.0f} ms'.format(n, rtt * 1000), before, after, 'mails/s')
+
+        before = n / timed(lambda: [com.get_mail_with(i, decode=False) for i in ids])
+        after = n / timed(lambda: list(com.fetch_mails(ids)))
+        report('fetch {} mails, rtt {:.0f} ms'.format(n, rtt * 1000), before, after, 'mails/s')
+        com.close()
@@ -0,0 +1,49 @@
+"""
+Cost of one poll as the mailbox grows, with a few new mails among many
+answered ones: the search query over the whole mailbox compared to a
+search of the UIDs after the checkpoint, alone and with the search for
+flagged mails below the checkpoint, and with that search on every 15th
+poll as `serve` runs it with the default --interval and --again-interval.
+The fake server checks the flags of every mail like it checks a subject,
+a server keeping flags in its index answers that search for less.
+
+    python -m benchmarks.bench_checkpoint [sizes,...] [new_mails]
+"""
+import sys
+import time
+import imaplib
+
+from ediel_parser.lib.EDICommunicator import EDICommunicator
+from ediel_parser.lib.Checkpoint import Checkpoint
+from benchmarks.utils import rate, report
+from tests.imap_server import FakeIMAPServer, serving
+
+QUERY = 'OR (NOT ANSWERED SUBJECT UTILTS) (SUBJECT UTILTS FLAGGED)'
+AGAIN_QUERY = 'FLAGGED SUBJECT UTILTS'
+
+if __name__ == '__main__':
+    sizes = [int(s) for s in sys.argv[1].split(',')] if len(sys.argv) > 1 else [10_000, 100_000, 300_000]
+    new = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    for size in sizes:
+        server = FakeIMAPServer([b'Subject: UTILTS\r\n\r\n'] * size)
+        answered = frozenset(['\\Answered', '\\Seen'])
+        for uid in server.uids[:-new]:
+            server.flags[uid] = answered
+        with serving(server):
+            com = EDICommunicator(uid=True)
+            com.imap = imaplib.IMAP4('127.0.0.1', server.port)
+            com.imap.login('user', 'pass')
+            com.imap.select()
+            checkpoint = Checkpoint()
+            checkpoint.save(com.mailbox, server.uidvalidity, size - new)
+
+            assert len(com.imap_search_query(QUERY)) == new
+            assert len(com.search_new(QUERY, checkpoint, AGAIN_QUERY)[0]) == new
+            before = rate(lambda: com.imap_search_query(QUERY))
+            after = rate(lambda: com.search_new(QUERY, checkpoint))
+            report('poll of {:,} mails'.format(size), before, after, 'polls/s')
+            new_only = after
+            after = rate(lambda: com.search_new(QUERY, checkpoint, AGAIN_QUERY))
+            report('  with flagged search', before, after, 'polls/s')
+            report('  flagged every 15th poll', before, 15 / (14 / new_only + 1 / after), 'polls/s')
+            com.close()
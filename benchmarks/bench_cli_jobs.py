@@ -0,0 +1,43 @@
+"""
+`cli.py parse --aperak --input-dir` over many UTILTS files, one process
+compared to --jobs processes (default: all cores)
+
+    python -m benchmarks.bench_cli_jobs [n_files] [jobs]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+
+from benchmarks.utils import utilts_interchange, report
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def parse(input_dir, output_dir, jobs):
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, 'cli.py', 'parse', '--aperak', '--to', 'edi', '--our-ediel', '99999',
+         '--input-dir', input_dir, '--output-dir', output_dir, '--jobs', str(jobs)],
+        cwd=os.path.join(ROOT, 'ediel_parser'), env=dict(os.environ, PYTHONPATH=ROOT),
+        stdout=subprocess.DEVNULL, check=True,
+    )
+    return time.perf_counter() - start
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    jobs = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    directory = tempfile.mkdtemp()
+    try:
+        input_dir = os.path.join(directory, 'in')
+        os.mkdir(input_dir)
+        payload = utilts_interchange(100)
+        for i in range(n):
+            with open(os.path.join(input_dir, '{}.edi'.format(i)), 'w') as fh:
+                fh.write(payload)
+        before = n / parse(input_dir, tempfile.mkdtemp(dir=directory), 1)
+        after = n / parse(input_dir, tempfile.mkdtemp(dir=directory), jobs)
+        report('--jobs {}'.format(jobs), before, after, 'files/s')
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,51 @@
+"""
+Peak memory of tokenizing a UTILTS file read as text, as bytes and
+memory mapped. Mapped pages belong to the page cache and are not
+traced, the segments are consumed without being kept.
+
+    python -m benchmarks.bench_input [n_transactions]
+"""
+import os
+import sys
+import mmap
+import tempfile
+import tracemalloc
+from collections import deque
+
+from ediel_parser.lib.EDITokenizer import tokenize
+from benchmarks.utils import utilts_interchange, report
+
+def peak(func):
+    tracemalloc.start()
+    func()
+    _, size = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size
+
+def consume(source):
+    deque(tokenize(source), maxlen=0)
+
+def read_text(path):
+    with open(path, 'r', encoding='utf-8') as fh:
+        consume(fh.read())
+
+def read_bytes(path):
+    with open(path, 'rb') as fh:
+        consume(fh.read())
+
+def read_mapped(path):
+    with open(path, 'rb') as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        consume(mapped)
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    with tempfile.NamedTemporaryFile(suffix='.edi', delete=False) as fh:
+        fh.write(utilts_interchange(n).encode('utf-8'))
+    try:
+        size = os.path.getsize(fh.name) / 1024
+        print('{:,} transactions, {:,.0f} kB'.format(n, size))
+        text = peak(lambda: read_text(fh.name)) / 1024
+        report('peak, text -> bytes', text, peak(lambda: read_bytes(fh.name)) / 1024, 'kB')
+        report('peak, text -> mmap', text, peak(lambda: read_mapped(fh.name)) / 1024, 'kB')
+    finally:
+        os.unlink(fh.name)
@@ -0,0 +1,50 @@
+"""
+Peak memory of reading a UTILTS interchange from a file, parsing it
+whole compared to iterparse one IDE transaction at a time
+
+    python -m benchmarks.bench_iterparse [n_transactions]
+"""
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from ediel_parser.lib.EDIParser import EDIParser
+from benchmarks.utils import HEADER, TRAILER, utilts_transaction, report
+
+def write_interchange(fh, n_transactions):
+    n_segments = 8
+    for i in range(n_transactions):
+        transaction = utilts_transaction(i)
+        n_segments += transaction.count("'")
+        fh.write(transaction.encode('utf-8'))
+    fh.write(TRAILER.format(n_segments).encode('utf-8'))
+
+def peak(func):
+    tracemalloc.start()
+    result = func()
+    _, size = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, result
+
+def parse(path):
+    with open(path, 'rb') as fh:
+        return len(EDIParser(fh.read(), 'edi', '99999', 'Sweden').segments.index.transactions)
+
+def stream(path):
+    with open(path, 'rb') as fh:
+        return sum(1 for _ in EDIParser.iterparse(fh))
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    with tempfile.NamedTemporaryFile(suffix='.edi', delete=False) as fh:
+        fh.write(HEADER.encode('utf-8'))
+        write_interchange(fh, n)
+    try:
+        before, parsed = peak(lambda: parse(fh.name))
+        after, streamed = peak(lambda: stream(fh.name))
+        assert parsed == streamed == n
+        print('{:,} transactions, {:,} kB'.format(n, os.path.getsize(fh.name) // 1024))
+        report('peak memory', before / 1024, after / 1024, 'kB')
+    finally:
+        os.unlink(fh.name)
@@ -0,0 +1,24 @@
+"""
+Routing a UTILTS interchange on UNB, UNH, BGM and the IDE identifiers,
+eager parsing compared to lazy loading of the segments
+
+    python -m benchmarks.bench_lazy
+"""
+from ediel_parser.lib.EDIParser import EDIParser
+from benchmarks.utils import utilts_interchange, rate, report
+
+def route(payload, lazy):
+    segments = EDIParser(payload, 'edi', '99999', 'Sweden', lazy=lazy).segments
+    return (
+        segments['UNB']['interchange_sender'][0].value,
+        segments['UNH']['message_identifier'][0].value,
+        segments['BGM']['document-message_number'].value,
+        [s['identification_number']['identity_number'].value for s in segments.index.all('IDE')],
+    )
+
+if __name__ == '__main__':
+    payload = utilts_interchange(1_000).encode('utf-8')
+    assert route(payload, False) == route(payload, True)
+    before = rate(lambda: route(payload, False))
+    after = rate(lambda: route(payload, True))
+    report('route 1000 transactions', before, after, 'payloads/s')
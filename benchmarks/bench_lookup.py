@@ -0,0 +1,40 @@
+"""
+Nested element lookups per second on a parsed UNB segment, compared to
+the previous linear scan over a tree with one Segment object per element
+
+    python -m benchmarks.bench_lookup
+"""
+from copy import deepcopy
+
+from ediel_parser.lib.UNSegment import UNSegment, resolve
+from ediel_parser.lib.segmentDefinitions import definitions
+from benchmarks.utils import rate, report
+
+UNB = [['UNOC', '3'], ['91100', 'ZZ'], ['92165', 'ZZ'], ['230417', '2200'], 'E230417749098', '', '23-DDQ-E66-S', '', '1']
+
+def linear_lookup(segment, key):
+    for child in segment.children:
+        if 'r:' in key:
+            clean_key = key.replace('r:', '')
+            if child.ref == clean_key: return child
+        else:
+            if child.id == key or child.tag == key: return child
+
+if __name__ == '__main__':
+    tree = deepcopy(definitions['UNB'])
+    tree.load(UNB)
+    unb = UNSegment('UNB')
+    unb.load(UNB)
+    path = resolve('UNB', ('interchange_recipient', 'routing_address'))
+    before = rate(lambda: linear_lookup(linear_lookup(tree, 'interchange_recipient'), 'routing_address').value)
+
+    after = rate(lambda: unb['interchange_recipient']['routing_address'].value)
+    report('lookup by name', before, after, 'op/s')
+    after = rate(lambda: unb[path].value)
+    report('lookup by resolved path', before, after, 'op/s')
+    after = rate(lambda: unb.get(path))
+    report('value at resolved path', before, after, 'op/s')
+
+    before = rate(lambda: linear_lookup(tree, 'r:0026').value)
+    after = rate(lambda: unb['r:0026'].value)
+    report('lookup by ref', before, after, 'op/s')
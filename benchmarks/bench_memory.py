@@ -0,0 +1,35 @@
+"""
+Memory held by the parsed segments of a UTILTS interchange, compared to
+full segment trees with one Segment object per element
+
+    python -m benchmarks.bench_memory
+"""
+import tracemalloc
+from copy import deepcopy
+
+from pydifact.message import Message as PMessage
+
+from ediel_parser.lib.segmentDefinitions import definitions
+from ediel_parser.lib.UNSegment import UNSegment
+from benchmarks.utils import utilts_interchange, report
+
+def tree_segment(tag):
+    return deepcopy(definitions[tag])
+
+def allocated(create, segments):
+    tracemalloc.start()
+    loaded = []
+    for segment in segments:
+        template = create(segment.tag)
+        template.load(segment.elements)
+        loaded.append(template)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size
+
+if __name__ == '__main__':
+    segments = PMessage.from_str(utilts_interchange(500)).segments
+    n = len(segments)
+    before = allocated(tree_segment, segments) / n
+    after = allocated(UNSegment, segments) / n
+    report('memory per segment', before, after, 'B')
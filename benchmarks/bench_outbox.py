@@ -0,0 +1,45 @@
+"""
+Cost of the durable outbox: queueing, delivering and flagging responses
+through an SQLite file compared to handing them to the senders directly
+
+    python -m benchmarks.bench_outbox [n_mails]
+"""
+import os
+import sys
+import shutil
+import tempfile
+from email.mime.text import MIMEText
+
+from ediel_parser.lib.Outbox import Outbox
+from benchmarks.utils import utilts_interchange, rate, report
+
+def send(mails):
+    for mail in mails:
+        mail.as_string()
+    return [None] * len(mails)
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    mails = []
+    for i in range(n):
+        mail = MIMEText(utilts_interchange(1))
+        mail['From'], mail['To'] = 'us@example.com', 'partner{}@example.com'.format(i)
+        mails.append(mail)
+    directory = tempfile.mkdtemp()
+    runs = [0]
+
+    def through_outbox():
+        runs[0] += 1
+        outbox = Outbox(os.path.join(directory, '{}.sqlite'.format(runs[0])))
+        for i, mail in enumerate(mails):
+            outbox.add(str(i), [mail])
+        outbox.deliver(send)
+        outbox.flag(lambda ids: None)
+        outbox.close()
+
+    try:
+        before = n * rate(lambda: send(mails))
+        after = n * rate(through_outbox)
+        report('{} responses'.format(n), before, after, 'mails/s')
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,36 @@
+"""
+Parsing one large UTILTS interchange sequentially compared to loading
+its IDE transactions in a pool of workers (default: all cores, at least
+two), both followed by one pass over every segment
+
+The speedup only shows on several cores. The time the main process
+spends on its own (searching for IDE segments, reading back the chunks,
+indexing them and building the segments accessed) bounds it whatever
+the number of workers, it is reported as the serial bound.
+
+    python -m benchmarks.bench_parallel [n_transactions] [workers]
+"""
+import os
+import sys
+import time
+import multiprocessing
+
+from ediel_parser.lib.EDIParser import EDIParser
+from benchmarks.utils import utilts_interchange, report
+
+def parse(payload, workers=None, pool=None):
+    start, cpu = time.perf_counter(), time.process_time()
+    parser = EDIParser(payload, 'edi', '99999', 'Sweden', workers=workers, pool=pool)
+    for segment in parser.segments.children:
+        pass
+    return time.perf_counter() - start, time.process_time() - cpu
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else max(2, os.cpu_count() or 1)
+    payload = utilts_interchange(n)
+    sequential, _ = parse(payload)
+    with multiprocessing.Pool(workers) as pool:
+        parallel, main_process = parse(payload, workers, pool)
+    report('parse, {} workers'.format(workers), n / sequential, n / parallel, 'transactions/s')
+    report('serial bound', n / sequential, n / main_process, 'transactions/s')
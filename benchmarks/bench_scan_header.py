@@ -0,0 +1,28 @@
+"""
+Classifying a UTILTS interchange by its header, a full EDIParser
+compared to scan_header
+
+    python -m benchmarks.bench_scan_header
+"""
+from ediel_parser.lib.EDIParser import EDIParser, scan_header
+from benchmarks.utils import utilts_interchange, rate, report
+
+def classify(payload):
+    parser = EDIParser(payload, 'edi', '99999', 'Sweden')
+    return (
+        parser['UNH']['message_identifier']['message_type_identifier'].value,
+        parser['UNB']['interchange_sender']['sender_identification'].value,
+        parser['UNB']['application_reference'].value,
+    )
+
+def scan(payload):
+    header = scan_header(payload)
+    return header.message_type, header.sender, header.application_reference
+
+if __name__ == '__main__':
+    for n in (10, 1_000):
+        payload = utilts_interchange(n).encode('utf-8')
+        assert classify(payload) == scan(payload)
+        before = rate(lambda: classify(payload))
+        after = rate(lambda: scan(payload))
+        report('classify {} transactions'.format(n), before, after, 'payloads/s')
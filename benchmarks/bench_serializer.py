@@ -0,0 +1,47 @@
+"""
+Writing an outbound APERAK and a UTILTS interchange as EDI, compared to
+the previous pydifact Message round trip per segment
+
+    python -m benchmarks.bench_serializer
+"""
+import io
+import contextlib
+
+from pydifact.message import Message as PMessage
+from pydifact.segments import Segment as PSegment
+
+from ediel_parser.lib.EDIParser import EDIParser
+from benchmarks.utils import utilts_interchange, rate, report
+
+def pydifact_segment(segment):
+    message = PMessage()
+    tag, elements = segment.tag, segment.toList()
+    s = PSegment(tag, None)
+    if elements is not None and len(elements) > 0:
+        s = PSegment(tag, *elements)
+    message.add_segment(s)
+    return message.serialize()
+
+def pydifact_edi(segments):
+    return ''.join(map(pydifact_segment, segments))
+
+if __name__ == '__main__':
+    parser = EDIParser(utilts_interchange(2_000), 'edi', '99999', 'Sweden')
+    with contextlib.redirect_stdout(io.StringIO()):
+        aperak = parser.create_aperak()[0]
+    assert pydifact_edi(aperak) == parser.toEdi(aperak)
+    assert pydifact_edi(parser.segments) == parser.toEdi()
+    n = len(aperak)
+    before = rate(lambda: pydifact_edi(aperak)) * n
+    after = rate(lambda: parser.toEdi(aperak)) * n
+    report('APERAK toEdi', before, after, 'seg/s')
+
+    n = len(parser.segments)
+    before = rate(lambda: pydifact_edi(parser.segments)) * n
+    after = rate(lambda: parser.toEdi()) * n
+    report('UTILTS toEdi', before, after, 'seg/s')
+
+    n = len(aperak)
+    before = rate(lambda: io.StringIO().write(pydifact_edi(aperak))) * n
+    after = rate(lambda: parser.writeEdi(io.StringIO(), aperak)) * n
+    report('APERAK writeEdi', before, after, 'seg/s')
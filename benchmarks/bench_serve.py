@@ -0,0 +1,55 @@
+"""
+Answering a poll of mails: the parse stage of bin/send-aperak-utilts.sh
+(mails staged in a directory, a new `cli.py parse` process) compared to
+the warm in-process pipeline of `cli.py serve`. The IMAP and SMTP stages
+are left out, they are a process and a login each in the script.
+
+    python -m benchmarks.bench_serve [n_mails]
+"""
+import os
+import sys
+import io
+import shutil
+import tempfile
+import subprocess
+import contextlib
+from types import SimpleNamespace
+from collections import Counter
+
+import ediel_parser.lib.mailPipeline as pipeline
+from ediel_parser.lib.Outbox import Outbox
+from benchmarks.utils import utilts_interchange, rate, report
+from tests.utils import mail_with, FakeCom
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def staged(mails, directory):
+    input_dir = tempfile.mkdtemp(dir=directory)
+    output_dir = tempfile.mkdtemp(dir=directory)
+    for mail_id, mail in mails.items():
+        with open(os.path.join(input_dir, '{}.eml'.format(mail_id)), 'wb') as fh:
+            fh.write(mail)
+    subprocess.run(
+        [sys.executable, 'cli.py', 'parse', '--from', 'mail', '--to', 'mail', '--aperak', '--our-ediel', '99999',
+         '--input-dir', input_dir, '--output-dir', output_dir],
+        cwd=os.path.join(ROOT, 'ediel_parser'), env=dict(os.environ, PYTHONPATH=ROOT),
+        stdout=subprocess.DEVNULL, check=True,
+    )
+    for path in os.listdir(output_dir):
+        with open(os.path.join(output_dir, path)) as fh:
+            fh.read()
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    mails = {str(i): mail_with(utilts_interchange(10)) for i in range(n)}
+    options = SimpleNamespace(our_ediel='99999', our_city=None, search_query=pipeline.SEARCH_QUERY, utilts_err=False)
+    directory = tempfile.mkdtemp()
+    try:
+        before = n * rate(lambda: staged(mails, directory), 3.0)
+        com = FakeCom(mails)
+        with contextlib.redirect_stdout(io.StringIO()):
+            # a new outbox every time, so the mails are answered again
+            after = n * rate(lambda: pipeline.poll(com, Outbox(), options, Counter(), io.StringIO()))
+        report('poll of {} mails'.format(n), before, after, 'mails/s')
+    finally:
+        shutil.rmtree(directory)
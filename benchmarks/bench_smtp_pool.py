@@ -0,0 +1,52 @@
+"""
+Sending a burst of APERAK mails to an SMTP server with a handshake cost
+(connect, STARTTLS and login) and a round trip per mail: a new session
+per mail (what send_mail does) compared to the pool of send_mails
+
+    python -m benchmarks.bench_smtp_pool [n_mails] [sessions] [handshake_ms] [send_ms]
+"""
+import sys
+import time
+from email.mime.text import MIMEText
+
+from ediel_parser.lib.SMTPPool import SMTPPool, POOL_SIZE
+from benchmarks.utils import report
+
+class SlowSMTP:
+    def __init__(self, handshake, send):
+        self.send = send
+        time.sleep(handshake)
+
+    def sendmail(self, sender, to, body):
+        time.sleep(self.send)
+
+    def quit(self):
+        time.sleep(self.send)
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+def one_session_per_mail(mails, handshake, send):
+    for mail in mails:
+        session = SlowSMTP(handshake, send)
+        session.sendmail(mail['From'], mail['To'], mail.as_string())
+        session.quit()
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    sessions = int(sys.argv[2]) if len(sys.argv) > 2 else POOL_SIZE
+    handshake = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.03
+    send = float(sys.argv[4]) / 1000 if len(sys.argv) > 4 else 0.005
+    mails = []
+    for i in range(n):
+        mail = MIMEText('APERAK')
+        mail['From'], mail['To'] = 'us@example.com', 'partner{}@example.com'.format(i)
+        mails.append(mail)
+
+    before = n / timed(lambda: one_session_per_mail(mails, handshake, send))
+    pool = SMTPPool(lambda: SlowSMTP(handshake, send), sessions)
+    after = n / timed(lambda: pool.send_many(mails))
+    pool.close()
+    report('send {} mails, {} sessions'.format(n, sessions), before, after, 'mails/s')
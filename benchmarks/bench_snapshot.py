@@ -0,0 +1,28 @@
+"""
+Parsing a mail again that was parsed before: MIME parsing, tokenizing
+and loading compared to reading its snapshot back
+
+    python -m benchmarks.bench_snapshot [n_transactions,...]
+"""
+import sys
+import shutil
+import tempfile
+
+from ediel_parser.lib.EDIParser import EDIParser
+from benchmarks.utils import utilts_interchange, rate, report
+from tests.utils import mail_with
+
+if __name__ == '__main__':
+    sizes = [int(s) for s in sys.argv[1].split(',')] if len(sys.argv) > 1 else [10, 1000]
+    directory = tempfile.mkdtemp()
+    try:
+        for n in sizes:
+            payload = mail_with(utilts_interchange(n))
+            parsed = EDIParser(payload, 'mail', '99999', 'Uzbekistan')
+            assert EDIParser(payload, 'mail', '99999', 'Uzbekistan', snapshots=directory).toEdi() == parsed.toEdi()
+            assert EDIParser(payload, 'mail', '99999', 'Uzbekistan', snapshots=directory).toEdi() == parsed.toEdi()
+            before = rate(lambda: EDIParser(payload, 'mail', '99999', 'Uzbekistan'))
+            after = rate(lambda: EDIParser(payload, 'mail', '99999', 'Uzbekistan', snapshots=directory))
+            report('mail of {} transactions'.format(n), before, after, 'mails/s')
+    finally:
+        shutil.rmtree(directory)
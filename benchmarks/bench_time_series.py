@@ -0,0 +1,54 @@
+"""
+Metering values of a parsed quarter-hourly UTILTS: walking the segments
+by element names for every value compared to EDIParser.time_series
+
+    python -m benchmarks.bench_time_series [n_transactions] [n_values]
+"""
+import sys
+
+from ediel_parser.lib.EDIParser import EDIParser
+from benchmarks.utils import utilts_interchange, rate, report
+
+def walk(parser) -> list:
+    result = []
+    offset = '+0000'
+    for segment in parser.segments.children:
+        tag = segment.tag
+        if tag == 'IDE':
+            series = {'transaction': segment['identification_number']['identity_number'].value,
+                      'timestamps': [], 'quantities': [], 'qualifiers': [], 'seqs': []}
+            result.append(series)
+        elif tag == 'DTM':
+            qualifier = segment['date-time-period']['date-time-period_qualifier'].value
+            period = segment['date-time-period']['date-time-period'].value
+            if qualifier == '735':
+                offset = period
+            elif qualifier == '324':
+                series['start'] = int(parser.to_datetime(period[:12], offset).timestamp())
+                series['end'] = int(parser.to_datetime(period[12:], offset).timestamp())
+            elif qualifier == '354':
+                series['resolution'] = parser.get_resolution(segment)
+        elif tag == 'LOC' and segment['place-location_qualifier'].value == '172':
+            series['metering_point'] = segment['location_identification']['place-location_identification'].value
+        elif tag == 'SEQ':
+            seq = int(segment['sequence_information']['sequence_number'].value)
+        elif tag == 'QTY':
+            details = segment['quantity_details']
+            series['timestamps'].append(series['start'] + 900 * len(series['timestamps']))
+            series['quantities'].append(round(float(details['quantity'].value) * 1_000))
+            series['qualifiers'].append(int(details['quantity_qualifier'].value))
+            series['seqs'].append(seq)
+    return result
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    n_values = int(sys.argv[2]) if len(sys.argv) > 2 else 96
+    payload = utilts_interchange(n, n_values).replace('DTM+354:1:802', 'DTM+354:15:806')
+    parser = EDIParser(payload, 'edi', '99999', 'Uzbekistan')
+    for extracted, walked in zip(parser.time_series(), walk(parser)):
+        assert list(extracted.timestamps) == walked['timestamps']
+        assert list(extracted.quantities) == walked['quantities']
+        assert extracted.metering_point == walked['metering_point']
+    before = n * n_values * rate(lambda: walk(parser))
+    after = n * n_values * rate(parser.time_series)
+    report('{:,} values'.format(n * n_values), before, after, 'values/s')
@@ -0,0 +1,40 @@
+"""
+Tokenizing a UTILTS interchange with the native tokenizer, compared to
+pydifact's character by character tokenizer
+
+    python -m benchmarks.bench_tokenizer
+"""
+import io
+
+from pydifact.message import Message as PMessage
+
+from ediel_parser.lib.EDIParser import EDIParser
+from ediel_parser.lib.EDITokenizer import tokenize
+from ediel_parser.lib.Segment import Group
+from benchmarks.utils import utilts_interchange, rate, report
+
+def pydifact_tokens(payload):
+    return [(s.tag, s.elements) for s in PMessage.from_str(payload).segments]
+
+def native_tokens(payload):
+    return [tuple(s) for s in tokenize(payload)]
+
+if __name__ == '__main__':
+    payload = utilts_interchange(1_000)
+    assert pydifact_tokens(payload) == native_tokens(payload)
+    n = len(payload) / 1_000_000
+    before = rate(lambda: pydifact_tokens(payload)) * n
+    after = rate(lambda: native_tokens(payload)) * n
+    report('tokenize str', before, after, 'MB/s')
+
+    encoded = payload.encode('utf-8')
+    after = rate(lambda: native_tokens(io.BytesIO(encoded))) * n
+    report('tokenize binary file', before, after, 'MB/s')
+
+    parser = EDIParser(payload, 'edi', '99999', 'Sweden')
+    def pydifact_parse():
+        return Group('edi').structure(*map(parser.load_segment, PMessage.from_str(payload).segments))
+    n = 1_000
+    before = rate(pydifact_parse) * n
+    after = rate(parser.parse_edi) * n
+    report('parse_edi', before, after, 'transactions/s')
@@ -0,0 +1,34 @@
+"""
+Segments per second created through UNSegment, compared to the
+previous deepcopy of the segment definitions
+
+    python -m benchmarks.bench_unsegment
+"""
+from copy import deepcopy
+
+from pydifact.message import Message as PMessage
+
+from ediel_parser.lib.segmentDefinitions import definitions
+from ediel_parser.lib.UNSegment import UNSegment
+from benchmarks.utils import utilts_interchange, rate, report
+
+def deepcopy_segment(tag):
+    return deepcopy(definitions[tag])
+
+def load_all(create, segments):
+    for segment in segments:
+        template = create(segment.tag)
+        template.load(segment.elements)
+
+if __name__ == '__main__':
+    segments = PMessage.from_str(utilts_interchange(500)).segments
+    n = len(segments)
+
+    for tag in ['QTY', 'DTM', 'SEQ', 'UNB']:
+        before = rate(lambda: deepcopy_segment(tag))
+        after = rate(lambda: UNSegment(tag))
+        report('create {}'.format(tag), before, after, 'seg/s')
+
+    before = rate(lambda: load_all(deepcopy_segment, segments)) * n
+    after = rate(lambda: load_all(UNSegment, segments)) * n
+    report('create + load UTILTS', before, after, 'seg/s')
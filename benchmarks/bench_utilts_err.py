@@ -0,0 +1,32 @@
+"""
+UTILTS error report generation for interchanges of growing size,
+compared to the previous LOC lookup that filtered the whole message
+once per IDE transaction
+
+    python -m benchmarks.bench_utilts_err
+"""
+import time
+
+from ediel_parser.lib.EDIParser import EDIParser
+from benchmarks.utils import utilts_interchange
+
+def legacy_loc_lookup(segments):
+    for i, s in enumerate(segments.index.all('IDE')):
+        loc = list(filter(lambda s: s.tag == 'LOC', segments))
+        loc[i*2+1], loc[i*2]
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+if __name__ == '__main__':
+    for n in [1_000, 2_000, 5_000, 10_000]:
+        parser = EDIParser(utilts_interchange(n), 'edi', '99999', 'Sweden')
+        errors = ['E19'] * n
+        after = timed(lambda: parser.create_utilts_err(parser.segments, errors))
+        line = '{:>6} transactions  create_utilts_err {:>7.3f} s'.format(n, after)
+        if n <= 2_000:
+            before = timed(lambda: legacy_loc_lookup(parser.segments))
+            line += '  previous LOC lookup alone {:>7.3f} s'.format(before)
+        print(line)
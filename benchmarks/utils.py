@@ -0,0 +1,43 @@
+import time
+
+HEADER = (
+    "UNA:+.? 'UNB+UNOC:3+91100:ZZ+92165:ZZ+230420:1534+E230420754641++23-DDQ-E66-S++1'"
+    "UNH+1+UTILTS:D:02B:UN:E5SE1B'BGM+E66::260+E230420754642+9+AB'DTM+137:202304201434:203'"
+    "DTM+735:?+0100:406'MKS+23+E02::260'NAD+DDQ'NAD+MR+92165:SVK:260'NAD+MS+91100:SVK:260'"
+)
+
+TRAILER = "UNT+{}+1'UNZ+1+E230420754641'"
+
+def utilts_transaction(i, n_values=3):
+    transaction = (
+        "IDE+24+E{:012d}'LOC+239+TES:SVK:260'LOC+172+{:018d}::9'LIN+++8716867000030:::9'"
+        "DTM+324:202303010000202304010000:719'DTM+597:202304010000:203'DTM+354:1:802'STS+7++E88::260'"
+        "MEA+AAZ++KWH'CCI+++E12::260'CAV+E17::260'"
+    ).format(i, 735999888000000000 + i)
+    for n in range(n_values):
+        transaction += "SEQ++{}'RFF+AES:101'RFF+MG:M-{:04d}'QTY+136:{}'DTM+597:202303010000:203'".format(n + 1, i % 10_000, n + 1)
+    return transaction
+
+"""
+Generate a UTILTS interchange with n IDE transactions
+"""
+def utilts_interchange(n_transactions, n_values=3):
+    body = ''.join(utilts_transaction(i, n_values) for i in range(n_transactions))
+    n_segments = body.count("'") + 8
+    return HEADER + body + TRAILER.format(n_segments)
+
+"""
+Run func repeatedly for at least min_time seconds, return calls per second
+"""
+def rate(func, min_time=1.0):
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0
+    while elapsed < min_time:
+        func()
+        calls += 1
+        elapsed = time.perf_counter() - start
+    return calls / elapsed
+
+def report(name, before, after, unit):
+    print('{:<32} {:>12,.0f} {unit} -> {:>12,.0f} {unit} ({:.1f}x)'.format(name, before, after, after / before, unit=unit))
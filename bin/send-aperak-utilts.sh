@@ -9,9 +9,13 @@ IMAP_SEARCH_QUERY="OR (NOT ANSWERED SUBJECT UTILTS) (SUBJECT UTILTS FLAGGED)"
 mkdir -p "$FMAILS" && \
 mkdir -p "$FAPERAK" && \
 cd ../ediel-parser/ && \
-"$SL_PYTHON_EXEC" cli.py com --imap-search-query "$IMAP_SEARCH_QUERY" --output-dir "$FMAILS" && \
-"$SL_PYTHON_EXEC" cli.py parse --from mail --to mail --aperak --input-dir "$FMAILS" --output-dir "$FAPERAK" && \
+"$SL_PYTHON_EXEC" cli.py com --imap-search-query "$IMAP_SEARCH_QUERY" --output-dir "$FMAILS" || exit 1
+
+# mails that fail to parse are left unanswered and make the script fail, the others are still answered
+"$SL_PYTHON_EXEC" cli.py parse --from mail --to mail --aperak --input-dir "$FMAILS" --output-dir "$FAPERAK"
+PARSE_STATUS=$?
 "$SL_PYTHON_EXEC" cli.py com --input-dir "$FAPERAK" --imap-store-query \"+FLAGS\" "\\Seen \\Answered" --send | \
 "$SL_PYTHON_EXEC" cli.py com --imap-store-query \"-FLAGS\" "\\Flagged"
 
-rm -r "$FMAILS/" "$FAPERAK/"
\ No newline at end of file
+rm -r "$FMAILS/" "$FAPERAK/"
+exit $PARSE_STATUS
\ No newline at end of file
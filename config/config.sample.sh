@@ -4,4 +4,7 @@ export SL_COM_SERVER=""
 export SL_COM_OUTGOING_SERVER=""
 export SL_COM_INCOMING_SERVER=""
 
+export SL_EDIEL_ID=""
+export SL_EDIEL_CITY=""
+
 export SL_PYTHON_EXEC="/usr/bin/python3"
\ No newline at end of file
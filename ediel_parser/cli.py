@@ -1,6 +1,6 @@
 import argparse
 import sys
-from lib.cli import parse, com
+from lib.cli import parse, com, serve
 
 def load_args(module, parser):
     module.set_args(parser)
@@ -16,14 +16,18 @@ if __name__ == '__main__':
     subparsers = parser.add_subparsers(dest='command')
     load_args(parse, subparsers)
     load_args(com, subparsers)
+    load_args(serve, subparsers)
 
     args = parser.parse_args()
     command = args.command
 
-    if command == "parse":
-        run(parse, args)
-    elif command == "com":
-        run(com, args)
-    
-    args.input.close()
-    args.output.close()
+    try:
+        if command == "parse":
+            run(parse, args)
+        elif command == "com":
+            run(com, args)
+        elif command == "serve":
+            run(serve, args)
+    finally: # a SystemExit of the command keeps its status
+        args.input.close()
+        args.output.close()
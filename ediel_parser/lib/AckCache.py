@@ -0,0 +1,97 @@
+import json
+import time
+import sqlite3
+
+import ediel_parser.lib.idGenerators as ids
+
+MAX_ENTRIES = 100_000
+MAX_AGE = 30 * 24 * 3600 # seconds
+EVICT_EVERY = 100 # puts between evictions
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS acks (
+    key TEXT PRIMARY KEY,
+    acks TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS acks_created ON acks(created);
+"""
+
+"""
+Key of an interchange by a digest of its bytes, within a scope of the
+options its acknowledgements were generated with
+"""
+def content_key(edi: bytes, scope='') -> str:
+    return '{}|md5:{}'.format(scope, ids.payload_digest(edi))
+
+"""
+Key of an interchange by its sender and interchange control reference,
+None when the UNB segment has neither
+"""
+def interchange_key(header, scope=''):
+    if header.sender is None or header.interchange_control_reference is None:
+        return None
+    return '{}|unb:{}:{}'.format(scope, header.sender, header.interchange_control_reference)
+
+class AckCache():
+    """
+    Acknowledgements generated for interchanges, as (subject, EDI) pairs,
+    looked up by a digest of the raw EDI or by the sender and interchange
+    control reference of UNB, so an interchange sent again is answered
+    without being parsed. Keys are scoped by the options the
+    acknowledgements depend on. Entries older than max_age are evicted, and the
+    oldest ones beyond max_entries. Age is the time since the
+    acknowledgements were generated, a hit does not renew them.
+    """
+    def __init__(self, path=':memory:', *, max_entries=MAX_ENTRIES, max_age=MAX_AGE, clock=time.time):
+        self.db = sqlite3.connect(path)
+        if path != ':memory:':
+            self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.executescript(SCHEMA)
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.clock = clock
+        self.puts = 0
+
+    def close(self):
+        self.db.close()
+
+    def __len__(self):
+        return self.db.execute('SELECT COUNT(*) FROM acks').fetchone()[0]
+
+    """
+    Acknowledgements stored under a key, None when unknown or expired
+    """
+    def get(self, key: str):
+        row = self.db.execute('SELECT acks, created FROM acks WHERE key = ?', (key,)).fetchone()
+        if row is None or row[1] < self.clock() - self.max_age:
+            return None
+        return [tuple(ack) for ack in json.loads(row[0])]
+
+    """
+    Store the acknowledgements of an interchange under all its keys
+    """
+    def put(self, keys: list, acks: list):
+        value = json.dumps(acks)
+        now = self.clock()
+        with self.db:
+            self.db.executemany('INSERT OR REPLACE INTO acks (key, acks, created) VALUES (?, ?, ?)',
+                                [(key, value, now) for key in keys])
+        self.puts += 1
+        if self.puts % EVICT_EVERY == 0:
+            self.evict()
+
+    """
+    Store the acknowledgements of an existing key under another one as
+    well, as old as they are
+    """
+    def alias(self, key: str, existing: str):
+        with self.db:
+            self.db.execute('INSERT OR REPLACE INTO acks (key, acks, created) SELECT ?, acks, created FROM acks WHERE key = ?',
+                            (key, existing))
+
+    def evict(self):
+        with self.db:
+            self.db.execute('DELETE FROM acks WHERE created < ?', (self.clock() - self.max_age,))
+            self.db.execute('DELETE FROM acks WHERE key IN '
+                            '(SELECT key FROM acks ORDER BY created DESC LIMIT -1 OFFSET ?)', (self.max_entries,))
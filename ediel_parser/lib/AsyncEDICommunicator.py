@@ -0,0 +1,198 @@
+import re
+import ssl
+import asyncio
+from collections import deque
+
+from ediel_parser.lib.EDICommunicator import id_sets
+
+IMAP_PORT = 993
+WINDOW = 8 # FETCH commands in flight
+BATCH_SIZE = 50 # ids fetched by one FETCH command
+LINE_LIMIT = 1 << 24 # SEARCH answers are one line with every id
+
+LITERAL = re.compile(rb'\{(\d+)\}\r\n$')
+FETCH = re.compile(rb'^\* (\d+) FETCH ')
+UID = re.compile(rb'[( ]UID (\d+)')
+
+class IMAPError(Exception):
+    pass
+
+class AsyncEDICommunicator():
+    """
+    IMAP client on asyncio streams for fetching many mails. FETCH
+    commands for batches of ids are sent without waiting for the answers
+    of the previous ones, at most `window` at a time, and bodies are
+    handed to the caller as they arrive.
+    """
+    def __init__(self, *, username=None, password=None, server=None, port=IMAP_PORT, use_tls=True,
+                 uid=True, window=WINDOW, batch_size=BATCH_SIZE):
+        self.username = username
+        self.password = password
+        self.server = server
+        self.port = port
+        self.use_tls = use_tls
+        self.uid = uid # UID commands, or message sequence numbers like EDICommunicator
+        self.window = window
+        self.batch_size = batch_size
+        self.reader = None
+        self.writer = None
+        self.tags = 0
+
+    async def connect(self):
+        context = ssl.create_default_context() if self.use_tls else None
+        self.reader, self.writer = await asyncio.open_connection(self.server, self.port, ssl=context, limit=LINE_LIMIT)
+        await self.read_response() # greeting
+        await self.command('LOGIN', quote(self.username), quote(self.password))
+        await self.command('SELECT', 'INBOX')
+
+    async def close(self):
+        if self.writer is None:
+            return
+        try:
+            await self.command('LOGOUT')
+        except (IMAPError, OSError, asyncio.IncompleteReadError):
+            pass
+        self.writer.close()
+        self.reader, self.writer = None, None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def send(self, *args) -> bytes:
+        self.tags += 1
+        tag = 'A{:04d}'.format(self.tags).encode('ascii')
+        self.writer.write(b' '.join([tag, *(a.encode('utf-8') for a in args)]) + b'\r\n')
+        return tag
+
+    """
+    One response: its lines and the literals between them
+    """
+    async def read_response(self) -> list:
+        parts = []
+        while True:
+            line = await self.reader.readline()
+            if line == b'':
+                raise asyncio.IncompleteReadError(b'', None)
+            parts.append(line)
+            literal = LITERAL.search(line)
+            if literal is None:
+                return parts
+            parts.append(await self.reader.readexactly(int(literal.group(1))))
+
+    """
+    Send a command and wait for its completion, the untagged responses
+    are returned
+    """
+    async def command(self, *args) -> list:
+        tag = self.send(*args)
+        await self.writer.drain()
+        untagged = []
+        while True:
+            parts = await self.read_response()
+            if parts[0].startswith(tag + b' '):
+                check(parts[0])
+                return untagged
+            if not parts[0].startswith((b'* ', b'+ ')): # completion of another command, e.g. an unfinished fetch
+                raise IMAPError('unexpected completion while waiting for {}: {}'.format(
+                    tag.decode('ascii'), parts[0].decode('utf-8', 'replace').strip()))
+            untagged.append(parts)
+
+    def prefix(self, command: str) -> tuple:
+        return ('UID', command) if self.uid else (command,)
+
+    async def search(self, query: str) -> list:
+        ids = []
+        for parts in await self.command(*self.prefix('SEARCH'), query):
+            if parts[0].startswith(b'* SEARCH'):
+                ids += parts[0].split()[2:]
+        return [i.decode('ascii') for i in ids]
+
+    async def store(self, ids: list, command: str, flags: str):
+        for id_set in id_sets(ids):
+            await self.command(*self.prefix('STORE'), id_set, command, flags)
+
+    """
+    (id, body) of every mail of ids, in the order the server answers,
+    see Fetch. Use it as `async with com.fetch(ids) as mails:` and
+    iterate mails, the responses left when the loop stops early are read
+    on leaving the block.
+    """
+    def fetch(self, ids: list, selection='BODY.PEEK[]'):
+        return Fetch(self, ids, selection)
+
+    def fetched(self, parts: list):
+        match = FETCH.match(parts[0])
+        if match is None or len(parts) < 2:
+            return None
+        if self.uid:
+            uid = UID.search(b''.join(parts[0::2]))
+            if uid is None:
+                return None
+            return uid.group(1).decode('ascii'), parts[1]
+        return match.group(1).decode('ascii'), parts[1]
+
+class Fetch():
+    """
+    Mails of a fetch. Batches of batch_size ids are fetched by one
+    command and up to window commands are in flight, a slow consumer
+    stops further commands from being sent. aclose reads the answers of
+    the commands still in flight, so the session can be used again.
+    """
+    def __init__(self, com, ids: list, selection: str):
+        self.com = com
+        self.batches = deque(id_sets(ids, com.batch_size))
+        self.items = '(UID {})'.format(selection) if com.uid else '({})'.format(selection)
+        self.pending = set()
+        self.mails = self.read()
+
+    def __aiter__(self):
+        return self.mails
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    def send_next(self):
+        if len(self.batches) > 0:
+            self.pending.add(self.com.send(*self.com.prefix('FETCH'), self.batches.popleft(), self.items))
+
+    async def read(self):
+        com = self.com
+        for _ in range(com.window):
+            self.send_next()
+        await com.writer.drain()
+        while len(self.pending) > 0:
+            parts = await com.read_response()
+            head = parts[0]
+            if head.startswith(b'* '):
+                fetched = com.fetched(parts)
+                if fetched is not None:
+                    yield fetched
+                continue
+            tag = head.split(b' ', 1)[0]
+            if tag in self.pending:
+                self.pending.discard(tag)
+                check(head)
+                self.send_next()
+                await com.writer.drain()
+
+    async def aclose(self):
+        await self.mails.aclose()
+        self.batches.clear()
+        while len(self.pending) > 0: # stopped early or on a failed batch
+            head = (await self.com.read_response())[0]
+            self.pending.discard(head.split(b' ', 1)[0])
+
+def check(line: bytes):
+    status = line.split(b' ', 2)[1:2]
+    if status != [b'OK']:
+        raise IMAPError(line.decode('utf-8', 'replace').strip())
+
+def quote(value: str) -> str:
+    return '"{}"'.format(value.replace('\\', '\\\\').replace('"', '\\"'))
@@ -0,0 +1,32 @@
+import os
+import json
+
+class Checkpoint():
+    """
+    Last handled UID of every mailbox with the UIDVALIDITY it belongs to,
+    kept in a JSON file, or in memory without a path
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self.mailboxes = {}
+        if path is not None and os.path.exists(path):
+            with open(path) as fh:
+                self.mailboxes = json.load(fh)
+
+    """
+    (uidvalidity, last_uid) of a mailbox, None before the first save
+    """
+    def get(self, mailbox: str):
+        saved = self.mailboxes.get(mailbox)
+        return None if saved is None else (saved['uidvalidity'], saved['last_uid'])
+
+    def save(self, mailbox: str, uidvalidity: int, last_uid: int):
+        self.mailboxes[mailbox] = {'uidvalidity': uidvalidity, 'last_uid': last_uid}
+        if self.path is None:
+            return
+        temporary = '{}.tmp'.format(self.path)
+        with open(temporary, 'w') as fh:
+            json.dump(self.mailboxes, fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(temporary, self.path) # a crash leaves the old or the new checkpoint, never half of one
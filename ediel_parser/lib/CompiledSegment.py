@@ -0,0 +1,292 @@
+from ediel_parser.lib.Segment import Segment
+
+class SegmentSchema():
+    """
+    Immutable layout of a segment definition. One schema is compiled per
+    tag and shared by every segment of that tag, the values of a segment
+    are kept in a flat list indexed by the slot of each simple element.
+    """
+    __slots__ = ('id', 'tag', 'ref', 'length', 'min', 'max', 'mandatory', 'group',
+                 'children', 'slot', 'defaults', 'index', 'stripped', 'layout')
+
+    def __init__(self, definition: Segment, defaults: list):
+        self.id = definition.id
+        self.tag = definition.tag
+        self.ref = definition.ref
+        self.length = definition.length
+        self.min = definition.min
+        self.max = definition.max
+        self.mandatory = definition.mandatory
+        self.group = definition.group
+        if len(definition.children) > 0:
+            self.slot = None
+            self.children = tuple(SegmentSchema(child, defaults) for child in definition.children)
+        else:
+            self.slot = len(defaults)
+            self.children = ()
+            defaults.append(definition.value)
+        self.defaults = None
+        self.stripped = {}
+        self.layout = None
+        self.build_index()
+
+    def build_index(self):
+        # name and 'r:'-prefixed ref to child position, first match wins as in Segment.__getitem__
+        self.index = {}
+        for i, child in enumerate(self.children):
+            self.index.setdefault(child.id, i)
+            if child.tag is not None:
+                self.index.setdefault(child.tag, i)
+            if child.ref is not None:
+                self.index.setdefault('r:' + child.ref, i)
+
+    @classmethod
+    def compile(cls, definition: Segment):
+        defaults = []
+        schema = cls(definition, defaults)
+        schema.defaults = tuple(defaults)
+        return schema
+
+    def __len__(self):
+        return len(self.children)
+
+    def child(self, key):
+        if type(key) is str:
+            i = self.index.get(key)
+            if i is None:
+                raise IndexError(key + ' does not exist')
+            return self.children[i]
+        return self.children[key]
+
+    """
+    Resolve a path of element names, refs or positions into a tuple of
+    positions that can be reused to index segments of this schema
+    """
+    def resolve(self, path: tuple) -> tuple:
+        schema = self
+        positions = []
+        for key in path:
+            if type(key) is str:
+                position = schema.index.get(key)
+                if position is None:
+                    raise IndexError(key + ' does not exist')
+            else:
+                position = key
+            positions.append(position)
+            schema = schema.children[position]
+        return tuple(positions)
+
+    def load(self, elements: list, values: list):
+        children = self.children
+        for i in range(0, min(len(elements), len(children))):
+            value = elements[i]
+            child = children[i]
+            if type(value) is list:
+                child.load(value, values)
+                continue
+            if isinstance(value, tuple): # repeated element, the first repetition is kept
+                value = value[0]
+                if type(value) is list:
+                    child.load(value, values)
+                    continue
+            if child.slot is None:
+                first = child.children[0]
+                if first.slot is not None:
+                    values[first.slot] = value
+            else:
+                values[child.slot] = value
+
+    """
+    Children left after removing trailing empty elements as in
+    ediTools.rstrip, None for a simple element and the shape of the kept
+    children for a composite one
+    """
+    def shape(self, values: list) -> tuple:
+        kept = []
+        trailing = True
+        for child in reversed(self.children):
+            if child.children:
+                child_shape = child.shape(values)
+                if trailing and len(child_shape) == 0:
+                    continue
+                kept.append(child_shape)
+            else:
+                if trailing and (child.slot is None or values[child.slot] is None):
+                    continue
+                kept.append(None)
+            trailing = False
+        return tuple(reversed(kept))
+
+    """
+    Schema with only the children of the shape, cached per shape
+    """
+    def strip(self, shape: tuple):
+        stripped = self.stripped.get(shape)
+        if stripped is None:
+            stripped = SegmentSchema.__new__(SegmentSchema)
+            for attribute in ('id', 'tag', 'ref', 'length', 'min', 'max', 'mandatory', 'group', 'slot', 'defaults'):
+                setattr(stripped, attribute, getattr(self, attribute))
+            stripped.children = tuple(
+                child if child_shape is None else child.strip(child_shape)
+                for child, child_shape in zip(self.children, shape)
+            )
+            stripped.stripped = {}
+            stripped.layout = None
+            stripped.build_index()
+            self.stripped[shape] = stripped
+        return stripped
+
+    def to_list(self, values: list):
+        if not self.children:
+            return None if self.slot is None else values[self.slot]
+        return [child.to_list(values) for child in self.children]
+
+    def to_dict(self, values: list):
+        if not self.children:
+            return None if self.slot is None else values[self.slot]
+        result = {}
+        if self.tag is not None:
+            result['tag'] = self.tag
+        for child in self.children:
+            result[child.id] = child.to_dict(values)
+        return result
+
+registry = {} # tag -> schema of the segment definitions, filled by UNSegment
+
+"""
+Segment of a registered schema out of its values, used when unpickling
+"""
+def restore(tag: str, values: list):
+    return CompiledSegment(registry[tag], values)
+
+class CompiledSegment(Segment):
+    """
+    Segment backed by a shared schema and its own list of values,
+    child elements are views on the same list of values. The structure
+    is the schema's, children can not be added or removed.
+
+    A view is kept per key once it has been looked up, a repeated lookup
+    like segment['quantity_details']['quantity'] returns the same views.
+    """
+
+    def __init__(self, schema: SegmentSchema, values: list):
+        self.schema = schema
+        self.values = values
+
+    id = property(lambda self: self.schema.id)
+    tag = property(lambda self: self.schema.tag)
+    ref = property(lambda self: self.schema.ref)
+    length = property(lambda self: self.schema.length)
+    min = property(lambda self: self.schema.min)
+    max = property(lambda self: self.schema.max)
+    mandatory = property(lambda self: self.schema.mandatory)
+    group = property(lambda self: self.schema.group)
+    index = None
+    views = None # key -> child view, set on the first lookup
+
+    @property
+    def children(self) -> tuple:
+        values = self.values
+        return tuple(CompiledSegment(child, values) for child in self.schema.children)
+
+    @property
+    def value(self):
+        slot = self.schema.slot
+        return None if slot is None else self.values[slot]
+
+    @value.setter
+    def value(self, value):
+        slot = self.schema.slot
+        if slot is None:
+            raise AttributeError('{} is a composite element'.format(self.id))
+        self.values[slot] = value
+
+    def __len__(self):
+        return len(self.schema.children)
+
+    def __getitem__(self, key):
+        views = self.views
+        if views is None:
+            views = self.views = {}
+        else:
+            view = views.get(key)
+            if view is not None:
+                return view
+        schema = self.schema
+        if type(key) is str:
+            i = schema.index.get(key)
+            if i is None:
+                raise IndexError(key + ' does not exist')
+            schema = schema.children[i]
+        elif type(key) is tuple:
+            for position in key:
+                schema = schema.children[position]
+        else:
+            schema = schema.children[key]
+        view = views[key] = CompiledSegment(schema, self.values)
+        return view
+
+    def __setitem__(self, key, value):
+        child = self.schema.child(key)
+        if type(value) is list:
+            element = CompiledSegment(child, self.values)
+            for i in range(0, len(value)):
+                element[i] = value[i]
+            return
+        if child.slot is None:
+            child = child.children[0]
+        self.values[child.slot] = value
+
+    """
+    Value of the simple element at a path, without creating views for
+    the elements along the way. Paths resolved with SegmentSchema.resolve
+    skip the name lookups.
+    """
+    def get(self, path: tuple):
+        schema = self.schema
+        for position in path:
+            if type(position) is str:
+                position = schema.index.get(position)
+                if position is None:
+                    raise IndexError('{} does not exist'.format(path))
+            schema = schema.children[position]
+        slot = schema.slot
+        return None if slot is None else self.values[slot]
+
+    def __delitem__(self, key):
+        raise AttributeError('the structure of {} is defined by its schema'.format(self.id))
+
+    def __deepcopy__(self, memo):
+        return CompiledSegment(self.schema, list(self.values))
+
+    """
+    Segments of the registered schemas pickle as their tag and values,
+    e.g. when parsed in a worker process
+    """
+    def __reduce__(self):
+        schema = self.schema
+        if registry.get(schema.tag) is schema:
+            return restore, (schema.tag, self.values)
+        return CompiledSegment, (schema, self.values)
+
+    def load(self, segments: list):
+        self.schema.load(segments, self.values)
+
+    """
+    Segment without trailing empty elements, sharing the values of this one
+    """
+    def rstrip(self):
+        schema = self.schema
+        return CompiledSegment(schema.strip(schema.shape(self.values)), self.values)
+
+    def structure(self, *children):
+        raise AttributeError('the structure of {} is defined by its schema'.format(self.id))
+
+    def add_segment(self, segment):
+        raise AttributeError('the structure of {} is defined by its schema'.format(self.id))
+
+    def toList(self):
+        return self.schema.to_list(self.values)
+
+    def toDict(self):
+        return self.schema.to_dict(self.values)
@@ -1,23 +1,84 @@
+import re
 import imaplib
 import smtplib
 import os
 import email
 import time
 
+from ediel_parser.lib.SMTPPool import SMTPPool
+
 SMTP_PORT = 587
+SENT_FOLDER = 'INBOX.Sent'
+MAILBOX = 'INBOX'
+UID = re.compile(rb'UID (\d+)')
+STATUS = re.compile(rb'(UIDVALIDITY|UIDNEXT) (\d+)')
+FETCH_BATCH = 100 # mails fetched by one command
+SET_LENGTH = 4000 # characters of the id set of one command, servers limit the line length
+
+"""
+Ids as runs of consecutive numbers: ['1', '2', '3', '5'] -> ['1:3', '5']
+"""
+def id_ranges(ids) -> [str]:
+    numbers = sorted(set(map(int, ids)))
+    ranges = []
+    i = 0
+    while i < len(numbers):
+        j = i
+        while j + 1 < len(numbers) and numbers[j + 1] == numbers[j] + 1:
+            j += 1
+        ranges.append(str(numbers[i]) if i == j else '{}:{}'.format(numbers[i], numbers[j]))
+        i = j + 1
+    return ranges
+
+"""
+Compressed sequence sets like '1:500,502' for as few commands as
+possible, each with at most max_ids ids and max_length characters
+"""
+def id_sets(ids, max_ids=None, max_length=SET_LENGTH) -> [str]:
+    ids = sorted(set(map(int, ids)))
+    groups = [ids] if max_ids is None else [ids[i:i + max_ids] for i in range(0, len(ids), max_ids)]
+    sets = []
+    for group in groups:
+        current, length = [], 0
+        for part in id_ranges(group):
+            if len(current) > 0 and length + len(part) + 1 > max_length:
+                sets.append(','.join(current))
+                current, length = [], 0
+            current.append(part)
+            length += len(part) + 1
+        if len(current) > 0:
+            sets.append(','.join(current))
+    return sets
+
 class EDICommunicator():
-    def __init__(self, *, username=None, password=None, server=None, output_dir=None, input_dir=None, use_tls=True):
+    def __init__(self, *, username=None, password=None, server=None, output_dir=None, input_dir=None, use_tls=True, smtp_sessions=1, smtp_rate=None, uid=False):
         self.username = username
         self.password = password
         self.server = server
         self.use_tls = use_tls
+        self.uid = uid # mail ids are UIDs instead of sequence numbers
+        self.mailbox = MAILBOX
+        self.imap = None
+        self.pool = SMTPPool(self.init_smtp, smtp_sessions, smtp_rate) # sessions kept open by send_mail(keep_alive=True) and send_mails
         if username is not None and password is not None and server is not None:
             self.init_imap()
 
     def init_imap(self):
         self.imap = imaplib.IMAP4_SSL(self.server)
         self.imap.login(self.username, self.password)
-        self.imap.select()
+        self.imap.select(self.mailbox)
+
+    """
+    Check the IMAP session of a long running process, log in again if
+    the server closed it
+    """
+    def ensure_imap(self):
+        try:
+            if self.imap is not None and self.imap.noop()[0] == 'OK':
+                return
+        except (imaplib.IMAP4.abort, OSError):
+            pass
+        self.init_imap()
 
     def list_labels(self):
         return self.imap.list()
@@ -26,37 +87,156 @@ class EDICommunicator():
         mail = email.message_from_string(mail_str)
         return mail
 
+    """
+    SEARCH, FETCH or STORE on UIDs in uid mode, on sequence numbers otherwise
+    """
+    def imap_command(self, name: str, *args):
+        if self.uid:
+            return self.imap.uid(name, *args)
+        return getattr(self.imap, name.lower())(*args)
+
+    def response_id(self, response: bytes) -> str:
+        if not self.uid:
+            return response.split(b' ', 1)[0].decode('ascii')
+        match = UID.search(response)
+        return None if match is None else match.group(1).decode('ascii')
+
     def imap_search_query(self, query: str):
-        res, emails = self.imap.search(None, query)
+        res, emails = self.imap_command('SEARCH', None, query)
         emails = emails[0].split()
         return emails
 
+    """
+    (UIDVALIDITY, UIDNEXT) of the mailbox
+    """
+    def uid_status(self) -> tuple:
+        res, data = self.imap.status(self.mailbox, '(UIDVALIDITY UIDNEXT)')
+        status = dict(STATUS.findall(data[0]))
+        return int(status[b'UIDVALIDITY']), int(status[b'UIDNEXT'])
+
+    """
+    UIDs of the mails matching the query that arrived after the checkpoint
+    of the mailbox, and the checkpoint to save once they are handled. The
+    server only searches the new UIDs, the whole mailbox is searched when
+    there is no checkpoint or the UIDVALIDITY of the mailbox changed.
+    Older mails matching again, e.g. FLAGGED to be answered again, are
+    searched below the checkpoint and returned with the new ones.
+    """
+    def search_new(self, query: str, checkpoint, again=None) -> tuple:
+        if not self.uid:
+            raise ValueError('a checkpoint needs a communicator with uid=True')
+        uidvalidity, uidnext = self.uid_status()
+        saved = checkpoint.get(self.mailbox)
+        if saved is None or saved[0] != uidvalidity:
+            found = self.format_mail_ids(self.imap_search_query(query))
+            return found, (uidvalidity, max([uidnext - 1] + [int(uid) for uid in found]))
+
+        last_uid = saved[1]
+        new = []
+        if uidnext - 1 > last_uid:
+            found = self.format_mail_ids(self.imap_search_query('UID {}:* ({})'.format(last_uid + 1, query)))
+            new = [uid for uid in found if int(uid) > last_uid] # n:* always matches the last mail
+        if again is not None and last_uid > 0:
+            new = self.format_mail_ids(self.imap_search_query('UID 1:{} ({})'.format(last_uid, again))) + new
+        return new, (uidvalidity, max([uidnext - 1, last_uid] + [int(uid) for uid in new]))
+
     def str_mail_ids(self, mail_ids: [str]) -> str:
         return ','.join(mail_ids)
 
     def mail_ids_from_filenames(self, filenames: [str]) -> [str]:
         return list(map(lambda f: f.split('.')[0], filenames))
 
+    """
+    Ids of the mails all files of which were sent, a mail answered with
+    several files (<id>.eml.eml, <id>.eml.1.eml) is only sent with all of
+    them. errors holds the error of every file or None when it was sent.
+    """
+    def sent_mail_ids(self, filenames: [str], errors: list) -> [str]:
+        mail_ids = self.mail_ids_from_filenames(filenames)
+        failed = {mail_id for mail_id, error in zip(mail_ids, errors) if error is not None}
+        return [mail_id for mail_id in dict.fromkeys(mail_ids) if mail_id not in failed]
+
     def format_mail_ids(self, mail_ids: [str]) -> [str]:
         return list(map(lambda i: i.decode('utf-8'), mail_ids))
 
     def imap_store_query(self, email_id: str, command, flags, return_raw=False) -> str:
-        res, emails = self.imap.store(email_id, command, flags)
-        emails = list(map(lambda e: e.decode('utf-8'), filter(None, emails)))
-        if return_raw is False and len(emails) > 0:
-            emails = list(map(lambda e: e.split()[0], emails))
-        return self.str_mail_ids(emails)
+        res, emails = self.imap_command('STORE', email_id, command, flags)
+        emails = list(filter(None, emails))
+        if return_raw is False:
+            return self.str_mail_ids(filter(None, map(self.response_id, emails)))
+        return self.str_mail_ids(map(lambda e: e.decode('utf-8'), emails))
+
+    """
+    Set flags of many mails with a few STORE commands, the ids the server
+    reported are returned
+    """
+    def store_flags(self, mail_ids: [str], command, flags) -> [str]:
+        stored = []
+        for id_set in id_sets(mail_ids):
+            stored += filter(None, self.imap_store_query(id_set, command, flags).split(','))
+        return stored
+
+    """
+    (id, body) of many mails fetched with a few FETCH commands
+    """
+    def fetch_mails(self, mail_ids: [str], selection='(BODY.PEEK[])', batch_size=FETCH_BATCH):
+        selection = '(UID {}'.format(selection[1:]) if self.uid else selection
+        for id_set in id_sets(mail_ids, batch_size):
+            res, data = self.imap_command('FETCH', id_set, selection)
+            for i, item in enumerate(data):
+                if type(item) is tuple:
+                    mail_id = self.response_id(item[0])
+                    if mail_id is None and i + 1 < len(data) and type(data[i + 1]) is bytes: # UID after the body
+                        mail_id = self.response_id(data[i + 1])
+                    yield mail_id, item[1]
 
-    def get_mail_with(self, email_id: str, selection='(BODY.PEEK[])') -> str:
-        res, data = self.imap.fetch(email_id, selection)
-        return data[0][1].decode('utf-8') # mail body
+    def get_mail_with(self, email_id: str, selection='(BODY.PEEK[])', decode=True) -> str:
+        res, data = self.imap_command('FETCH', email_id, selection)
+        body = data[0][1]
+        return body.decode('utf-8') if decode else body # mail body
 
-    def send_mail(self, mail, port=SMTP_PORT):
+    def init_smtp(self, port=SMTP_PORT):
         server = smtplib.SMTP()
         server.connect(self.server, port)
         if self.use_tls:
             server.starttls()
         server.login(self.username, self.password)
-        server.sendmail(mail['From'], mail['To'], mail.as_string())
-        self.imap.append('INBOX.Sent', '', imaplib.Time2Internaldate(time.time()), mail.as_bytes())
-        server.quit()
+        return server
+
+    """
+    Send a mail and store it in the sent folder, with keep_alive a session
+    of the pool is used and kept for the next mail
+    """
+    def send_mail(self, mail, port=SMTP_PORT, keep_alive=False):
+        if not keep_alive:
+            server = self.init_smtp(port)
+            server.sendmail(mail['From'], mail['To'], mail.as_string())
+            server.quit()
+        else:
+            self.pool.send(mail)
+        self.append_sent([mail])
+
+    """
+    Send a burst of mails over the sessions of the pool and store the sent
+    ones in the sent folder after the burst, the error of every mail or
+    None when it was sent is returned in order
+    """
+    def send_mails(self, mails: list, store=True) -> list:
+        errors = self.pool.send_many(mails)
+        if store:
+            self.append_sent([mail for mail, error in zip(mails, errors) if error is None])
+        return errors
+
+    def append_sent(self, mails: list):
+        now = imaplib.Time2Internaldate(time.time())
+        for mail in mails:
+            self.imap.append(SENT_FOLDER, '', now, mail.as_bytes())
+
+    def close(self):
+        self.pool.close()
+        if self.imap is not None:
+            try:
+                self.imap.logout()
+            except (imaplib.IMAP4.error, OSError):
+                pass
+            self.imap = None
@@ -1,42 +1,184 @@
 import json
 from datetime import datetime
 from functools import reduce
-from hashlib import md5
-from math import isclose
-import time
 import email
 from email.utils import formatdate
 from email.mime.base import MIMEBase
+from email.message import Message
 from email import encoders
-from typing import List, Tuple
-
-from pydifact.message import Message as PMessage
+from typing import List, Tuple, NamedTuple
 
 from ediel_parser.lib.Segment import Segment, Group
-from ediel_parser.lib.UNSegment import UNSegment
+from ediel_parser.lib.UNSegment import UNSegment, resolve
+from ediel_parser.lib.SegmentIndex import SegmentIndex
+from ediel_parser.lib.EDISerializer import serializer
+from ediel_parser.lib.EDITokenizer import EDITokenizer, tokenize
+from ediel_parser.lib.LazySegments import LazySegments
+import ediel_parser.lib.EDIStream as stream
+import ediel_parser.lib.parallelParse as parallel
+import ediel_parser.lib.parseSnapshot as snapshot
+import ediel_parser.lib.timeSeries as series
+import ediel_parser.lib.validationRules as rules
 import ediel_parser.lib.ediTools as edi
+import ediel_parser.lib.idGenerators as ids
 
 EDI_FILENAME = 'edifact.edi'
 
+HEADER_END_TAGS = ('IDE', 'UNT', 'UNZ')
+HEADER_FIELDS = {
+    'UNB': (
+        ('syntax_identifier', resolve('UNB', ('syntax_identifier', 'syntax_identifier'))),
+        ('sender', resolve('UNB', ('interchange_sender', 'sender_identification'))),
+        ('recipient', resolve('UNB', ('interchange_recipient', 'recipient_identification'))),
+        ('interchange_control_reference', resolve('UNB', ('interchange_control_reference',))),
+        ('application_reference', resolve('UNB', ('application_reference',))),
+    ),
+    'UNH': (
+        ('message_reference', resolve('UNH', ('message_reference_number',))),
+        ('message_type', resolve('UNH', ('message_identifier', 'message_type_identifier'))),
+        ('message_version', resolve('UNH', ('message_identifier', 'message_type_version_number'))),
+        ('message_release', resolve('UNH', ('message_identifier', 'message_type_release_number'))),
+        ('association_code', resolve('UNH', ('message_identifier', 'association_assigned_code'))),
+    ),
+    'BGM': (
+        ('document_name', resolve('BGM', ('document-message_name', 'document-message_name-coded'))),
+        ('document_number', resolve('BGM', ('document-message_number',))),
+    ),
+}
+
+class Header(NamedTuple):
+    """
+    Routing fields of an interchange out of its UNB and its first UNH and
+    BGM segments, None for the fields that are missing
+    """
+    syntax_identifier: str = None
+    sender: str = None
+    recipient: str = None
+    interchange_control_reference: str = None
+    application_reference: str = None
+    message_reference: str = None
+    message_type: str = None
+    message_version: str = None
+    message_release: str = None
+    association_code: str = None
+    document_name: str = None
+    document_number: str = None
+
+"""
+Mail out of a str or bytes payload
+"""
+def mail_from_payload(payload):
+    if type(payload) is str:
+        return email.message_from_string(payload)
+    return email.message_from_bytes(bytes(payload))
+
+"""
+First attachment of a mail or of a mail payload, the mail itself when
+there is none
+"""
+def attachment_from_mail(payload):
+    mail = payload if isinstance(payload, Message) else mail_from_payload(payload)
+    for i, part in enumerate(mail.walk()):
+        if part.get_content_maintype() != 'multipart' and part.get('Content-Disposition') is not None:
+            return part.get_payload(decode=True)
+    return mail
+
+"""
+Mail answering cur with an EDI attachment, the subject is the UNB
+segment of the attachment
+"""
+def response_mail(cur, subject: str, file_content: str, send_from=None):
+    mail = MIMEBase('application', "EDIFACT")
+    mail['From'] = cur['To'] if send_from is None else send_from
+    mail['To'] = cur['From']
+    mail['Date'] = formatdate(localtime=True)
+    mail['Subject'] = subject
+
+    mail.set_payload(file_content)
+    encoders.encode_base64(mail)
+    mail.add_header('Content-Disposition', 'attachment; filename="{}"'.format(EDI_FILENAME))
+
+    return mail
+
+"""
+Header of an EDI or mail payload without parsing it, tokenizing stops
+at the first BGM segment or at the first transaction. A mail without
+attachment raises ValueError.
+"""
+def scan_header(payload, format='edi', encoding='utf-8') -> Header:
+    if format == 'mail':
+        payload = attachment_from_mail(payload)
+        if isinstance(payload, Message):
+            raise ValueError('no EDI attachment')
+    tokenizer = EDITokenizer(payload, encoding=encoding)
+    fields = {}
+    for raw in tokenizer.raw_segments():
+        tag = tokenizer.tag(raw)
+        if tag in HEADER_END_TAGS:
+            break
+        paths = HEADER_FIELDS.get(tag)
+        if paths is None or paths[0][0] in fields:
+            continue
+        segment = UNSegment(tag)
+        segment.load(tokenizer.segment(raw).elements)
+        for name, path in paths:
+            fields[name] = segment.get(path)
+        if tag == 'BGM':
+            break
+    return Header(**fields)
+
 class EDIParser():
     def __init__(self,
                  payload: str,
                  format: str,
                  our_ediel: str,
-                 our_city: str):
-        self.payload = payload # raw input
+                 our_city: str,
+                 id_generator=None,
+                 encoding='utf-8',
+                 lazy=False,
+                 workers=None,
+                 pool=None,
+                 snapshots=None):
+        self.payload = payload # raw input, str or bytes, bytearray, memoryview, mmap
         self.format = format
+        self.encoding = encoding
+        self.lazy = lazy # load edi segments when they are accessed, see LazySegments
+        self.workers = workers # number of processes loading IDE transactions in parallel, see parallelParse
+        self.pool = pool # running multiprocessing pool of workers processes, one for this parse when None
+        self.snapshots = snapshots # directory of parsed segments by payload digest, see parseSnapshot
+        self.payload_digest = ids.payload_digest(payload) # hashed once, seeds the generated ids
+        self.id_generator = ids.PayloadIdGenerator() if id_generator is None else id_generator
         self.segments = self.parse()
+        self._messages = None
         self.our_ediel_id = our_ediel
         self.our_city = our_city
 
     def __getitem__(self, key):
         if type(key) is str:
-            for segment in self.segments:
-                if segment.tag == key:
-                    return segment
+            return self.segments.index.first(key)
+
+    """
+    New interchange/message id for a generated message
+    """
+    def new_id(self) -> str:
+        return self.id_generator(self.payload_digest)
 
+    """
+    Segments of the payload, read from its snapshot when there is one for
+    the current segment definitions. Lazy parsing does not use snapshots.
+    """
     def parse(self):
+        if self.snapshots is None or self.lazy:
+            return self.parse_payload()
+        path = snapshot.snapshot_path(self.snapshots, self.payload_digest, self.format, self.encoding)
+        segments = snapshot.read(path)
+        if segments is not None:
+            return Group(self.format).structure(*segments)
+        group = self.parse_payload()
+        snapshot.write(path, group.children)
+        return group
+
+    def parse_payload(self):
         if self.format == 'edi':
             return self.parse_edi()
         elif self.format == 'json':
@@ -52,15 +194,10 @@ class EDIParser():
 
     def get_attachment_from_mail(self, mail_str=None):
         mail_str = self.payload if mail_str is None else mail_str
-        mail = email.message_from_string(mail_str)
-        for i, part in enumerate(mail.walk()):
-            if part.get_content_maintype() != 'multipart' and part.get('Content-Disposition') is not None:
-                return part.get_payload(decode=True)
-        return mail
+        return attachment_from_mail(mail_str)
 
     def parse_email(self):
         content = self.get_attachment_from_mail()
-        content = content.decode('utf-8')
         segments = self.parse_edi(content)
         return segments
 
@@ -73,12 +210,35 @@ class EDIParser():
 
     def parse_edi(self, payload=None):
         payload = self.payload if payload is None else payload
-        message = PMessage.from_str(payload)
+        if self.lazy:
+            children = LazySegments(EDITokenizer(payload, encoding=self.encoding), self.load_segment)
+            return Group(self.format).structure_from(children, children.tags)
+        if self.workers is not None and self.workers != 1:
+            children, index = parallel.parse(payload, self.workers, self.encoding, self.pool)
+            return Group(self.format).structure_from(children, index=index)
         segments = Group(self.format).structure(
-            *map(self.load_segment, message.segments)
+            *map(self.load_segment, tokenize(payload, encoding=self.encoding))
         )
         return segments
 
+    """
+    IDE transactions of the parsed message with their header, see
+    EDIStream.MessagePart
+    """
+    def iter_transactions(self):
+        return stream.split(self.segments, stream.TRANSACTION, self.format)
+
+    def iter_messages(self):
+        return stream.split(self.segments, stream.MESSAGE, self.format)
+
+    """
+    Parse an interchange from a file object one transaction or message
+    at a time, without keeping the whole interchange in memory
+    """
+    @staticmethod
+    def iterparse(source, unit=stream.TRANSACTION, **args):
+        return stream.iterparse(source, unit, **args)
+
     def parse_json(self, payload=None):
         payload = self.payload if payload is None else payload
         segments = []
@@ -110,10 +270,7 @@ class EDIParser():
 
     def create_contrl(self, segments=None) -> List[Segment]:
         segments = self.segments if segments is None else segments
-        unix_timestamp = time.time()
-        segment_hash = segments.__str__()
-        hash_string = '{}:{}'.format(segment_hash, unix_timestamp).encode('utf-8')
-        UNIQUE_ID = str(md5(hash_string).hexdigest())[:14]
+        UNIQUE_ID = self.new_id()
         RECIPIENT_EDIEL_ID = self.segments['UNB']['interchange_sender'][0].value
 
         timestamp_now = edi.format_timestamp(datetime.now())
@@ -165,20 +322,37 @@ class EDIParser():
         return edi.rstrip(contrl)
 
     """
-    Generate aperak based on payload information
+    UNH messages of an interchange, every message as a group of its own
+    with the interchange header (UNA, UNB) and its own index. A payload
+    with a single message is returned as is.
     """
-    def create_aperak(self, segments = None) -> List[List[Segment]]:
-
+    def split_messages(self, segments=None) -> list:
         segments = self.segments if segments is None else segments
-        segment_hash = segments.__str__()
-        unix_timestamp = time.time()
-        hash_string = '{}:{}'.format(segment_hash, unix_timestamp).encode('utf-8')
+        if len(SegmentIndex.of(segments).positions('UNH')) <= 1:
+            return [segments]
+        return [part.message() for part in stream.split(segments, stream.MESSAGE, self.format)]
+
+    @property
+    def messages(self) -> list:
+        if self._messages is None:
+            self._messages = self.split_messages()
+        return self._messages
 
+    """
+    Generate aperak based on payload information, one per message
+    """
+    def create_aperak(self, segments = None) -> List[List[Segment]]:
+        messages = self.messages if segments is None else self.split_messages(segments)
+        return [self.create_message_aperak(message) for message in messages]
+
+    """
+    APERAK, or UTILTS ERR on functional errors, for a single message
+    """
+    def create_message_aperak(self, segments) -> List[Segment]:
         APERAK_START_ID = 1337
-        UNIQUE_ID = str(md5(hash_string).hexdigest())[:14]
+        UNIQUE_ID = self.new_id()
         RECIPIENT_EDIEL_ID = segments['UNB']['interchange_sender'][0].value
 
-        aperaks = []
         incorrect_field = None
         validation = False
         timestamp_now = edi.format_timestamp(datetime.now())
@@ -214,15 +388,13 @@ class EDIParser():
         bgm[1] = UNIQUE_ID
         bgm[2] = '9'
 
-        if self.check_ref_qualifier(segments) and self.check_reg_moment(segments) and self.check_reg_time(segments):
-            validation = True
+        verdict = self.validate(segments)
+        validation = verdict.valid
 
         if validation:
             bgm[0] = '312' # Positive
-        elif not self.check_ref_qualifier(segments) or not self.check_reg_time(segments):
-            incorrect_field = '512'
         else:
-            incorrect_field = '224'
+            incorrect_field = verdict.incorrect_field
 
         aperak.append(bgm)
 
@@ -253,37 +425,36 @@ class EDIParser():
         nad3[0] = 'DDQ'
         aperak.append(nad3)
 
-        for s in segments:
-            if s.tag == 'IDE': # transaction
-                transaction_id = s['identification_number']['identity_number'].value
+        for s in SegmentIndex.of(segments).all('IDE'): # transaction
+            transaction_id = s['identification_number']['identity_number'].value
 
-                erc = UNSegment('ERC')
-                if validation:
-                    erc[0] = ['100', None, '260']
-                else:
-                    erc[0] = ['41', None, '260']
+            erc = UNSegment('ERC')
+            if validation:
+                erc[0] = ['100', None, '260']
+            else:
+                erc[0] = ['41', None, '260']
 
-                aperak.append(erc)
+            aperak.append(erc)
 
-                ftx = UNSegment('FTX') # godkänt
-                ftx[0] = 'AAO'
-                if validation:
-                    ftx[3] = 'OK'
-                else:
-                    ftx[2] = [incorrect_field, None , '260']
-                    ftx[3] = 'MANDATORY FIELD MISSING'
+            ftx = UNSegment('FTX') # godkänt
+            ftx[0] = 'AAO'
+            if validation:
+                ftx[3] = 'OK'
+            else:
+                ftx[2] = [incorrect_field, None , '260']
+                ftx[3] = 'MANDATORY FIELD MISSING'
 
-                aperak.append(ftx)
+            aperak.append(ftx)
 
-                aperak_id = str(APERAK_START_ID + aperak_cnt)
-                aperak_cnt += 1
-                rff = UNSegment('RFF')
-                rff[0] = ['DM', aperak_id]
-                aperak.append(rff)
+            aperak_id = str(APERAK_START_ID + aperak_cnt)
+            aperak_cnt += 1
+            rff = UNSegment('RFF')
+            rff[0] = ['DM', aperak_id]
+            aperak.append(rff)
 
-                rff2 = UNSegment('RFF')
-                rff2[0] = ['ACW', transaction_id]
-                aperak.append(rff2)
+            rff2 = UNSegment('RFF')
+            rff2[0] = ['ACW', transaction_id]
+            aperak.append(rff2)
 
         unt = UNSegment('UNT')
         unt[0] = str(reduce(lambda acc, _: acc + 1, aperak, 0) - 1)
@@ -294,110 +465,47 @@ class EDIParser():
         unz[0] = '1'
         unz[1] = UNIQUE_ID
         aperak.append(unz)
-        aperaks.append(edi.rstrip(self.check_functional_errors(segments, aperak)))
+        if verdict.errors:
+            aperak = self.create_utilts_err(segments, verdict.errors)
+        return edi.rstrip(aperak)
 
-        return aperaks
+    """
+    Run all APERAK rules in a single pass over the segments
+    """
+    def validate(self, segments=None, rule_set=rules.APERAK_RULES) -> rules.Verdict:
+        segments = self.segments if segments is None else segments
+        return rule_set.run(segments, self)
 
     def check_ref_qualifier(self, segments):
-        seen_dtm = False
-        for s in segments:
-            if s.tag == 'DTM' and s['date-time-period']['date-time-period_qualifier'].value == '137':
-                seen_dtm = True
-            elif s.tag == 'SEQ' and seen_dtm:
-                continue
-            elif s.tag == 'SEQ' and not seen_dtm:
-                return False
-
-        return seen_dtm
+        return self.validate(segments, rules.RuleSet(rules.REF_QUALIFIER))['ref_qualifier']
 
     def check_reg_time(self, segments):
-        seen_dtm = False
-        for s in segments:
-            if s.tag == 'DTM' and s['date-time-period']['date-time-period_qualifier'].value == '597':
-                seen_dtm = True
-            elif s.tag == 'SEQ' and not seen_dtm:
-                break
-
-        return seen_dtm
+        return self.validate(segments, rules.RuleSet(rules.REG_TIME))['reg_time']
 
     def check_reg_moment(self, segments):
-        seen_rff = False
-        for s in segments:
-            if s.tag == 'RFF' and s['reference']['reference_qualifier'].value == 'MG':
-                return True
-            elif s.tag == 'RFF':
-                seen_rff = True
-
-        return not seen_rff
+        return self.validate(segments, rules.RuleSet(rules.REG_MOMENT))['reg_moment']
 
     def check_functional_errors(self, segments: List[Segment], aperak: List[Segment]):
-        last_qty_220 = None
-        last_qty_diff = None
-        num_qty_136 = 0
-        qty_136 = 0
-        error = []
-        ediel_tz_offset = None
-        resolution = None
-        start_time = None
-        end_time = None
-        i = 0
-
-        for s in segments:
-            if s.tag == 'IDE':
-                i += 1
-                if(num_qty_136 and not self.check_num_qty(resolution, num_qty_136, start_time, end_time)):
-                    if len(error) < i: error.append('E50')
-                elif(not last_qty_diff or not last_qty_220 or isclose(last_qty_diff, qty_136, abs_tol=10)):
-                    last_qty_220 = None
-                    last_qty_diff = None
-                    qty_136 = 0
-                else:
-                    if len(error) < i: error.append('E19')
-
-                num_qty_136 = 0
-            elif s.tag == 'STS' and s["status_event"]["status_event-coded"].value == '46' and num_qty_136 > 0:
-                if len(error) < i: error.append('E90')
-            elif s.tag == 'DTM' and s["date-time-period"]["date-time-period_qualifier"].value == '354':
-                resolution = self.get_resolution(s)
-            elif s.tag == 'DTM' and s["date-time-period"]["date-time-period_qualifier"].value == '735':
-                ediel_tz_offset = s["date-time-period"]["date-time-period"].value
-            elif s.tag == 'DTM' and s["date-time-period"]["date-time-period_qualifier"].value == '324':
-                start_time = s["date-time-period"]["date-time-period"].value[:12]
-                start_time = self.to_datetime(start_time, ediel_tz_offset)
-
-                end_time = s["date-time-period"]["date-time-period"].value[12:]
-                end_time = self.to_datetime(end_time, ediel_tz_offset)
-            elif s.tag == 'QTY':
-                if s['quantity_details']['quantity_qualifier'].value == '220':
-                    if last_qty_220:
-                        # this should not be null if it is, ignore it
-                        if s['quantity_details']['quantity'].value != 'NULL':
-                            last_qty_diff = int(float(s['quantity_details']['quantity'].value) * 1_000) - last_qty_220
-                            last_qty_220 = None
-                    else:
-                        last_qty_220 = int(float(s['quantity_details']['quantity'].value) * 1_000)
-                elif s['quantity_details']['quantity_qualifier'].value == '136':
-                    if float(s['quantity_details']['quantity'].value) >= 0:
-                        qty_136 += int(float(s['quantity_details']['quantity'].value) * 1_000)
-                        num_qty_136 += 1
-                    else:
-                        last_qty_220 = None
-                        last_qty_diff = None
-                        qty_136 = 0
-                        num_qty_136 += 1
-                        if len(error) < i: error.append('E98')
-
+        error = self.validate(segments, rules.RuleSet(rules.FUNCTIONAL_ERRORS)).errors
         if error:
             return self.create_utilts_err(segments, error)
         else:
             return aperak
 
-    def create_utilts_err(self, segments: List[Segment], error: List[str]):
-        segment_hash = segments.__str__()
-        unix_timestamp = time.time()
-        hash_string = '{}:{}'.format(segment_hash, unix_timestamp).encode('utf-8')
+    """
+    UTILTS ERR for every message of the payload with functional errors
+    """
+    def create_utilts_errs(self, segments=None) -> List[List[Segment]]:
+        messages = self.messages if segments is None else self.split_messages(segments)
+        responses = []
+        for message in messages:
+            error = self.validate(message, rules.RuleSet(rules.FUNCTIONAL_ERRORS)).errors
+            if error:
+                responses.append(self.create_utilts_err(message, error))
+        return responses
 
-        UNIQUE_ID = str(md5(hash_string).hexdigest())[:14]
+    def create_utilts_err(self, segments: List[Segment], error: List[str]):
+        UNIQUE_ID = self.new_id()
         RECIPIENT_EDIEL_ID = segments['UNB']['interchange_sender'][0].value
 
         timestamp_now = edi.format_timestamp(datetime.now())
@@ -459,38 +567,35 @@ class EDIParser():
         nad3[0] = 'DDQ'
         aperak.append(nad3)
 
-        i = 0
-        for s in segments:
-            if s.tag == 'IDE': # transaction
-                transaction_id = s['identification_number']['identity_number'].value
-
-                ide = UNSegment('IDE')
-                ide[0] = '24'
-                ide[1] = transaction_id
-                aperak.append(ide)
-                loc = list(filter(lambda s: s.tag == 'LOC', segments))
-
-                sts = UNSegment('STS')
-                sts[0] = ['E01', None, '260']
-                sts[1] = '41'
-                if len(error) > i:
-                    sts[2] = [error[i], None, '260']
-                else:
-                    sts[2] = [error[-1:][0], None, '260']
-                aperak.append(loc[i*2+1])
-                aperak.append(loc[i*2])
-
-                aperak.append(segments['STS'])
-                aperak.append(sts)
-                i = i + 1
-
-                rff = UNSegment('RFF')
-                rff[0] = ['TN', error_segment_ref]
-                aperak.append(rff)
-
-                rff2 = UNSegment('RFF')
-                rff2[0] = ['E66', doc_message_number]
-                aperak.append(rff2)
+        for i, transaction in enumerate(SegmentIndex.of(segments).transactions):
+            transaction_id = transaction.ide['identification_number']['identity_number'].value
+
+            ide = UNSegment('IDE')
+            ide[0] = '24'
+            ide[1] = transaction_id
+            aperak.append(ide)
+
+            sts = UNSegment('STS')
+            sts[0] = ['E01', None, '260']
+            sts[1] = '41'
+            if len(error) > i:
+                sts[2] = [error[i], None, '260']
+            else:
+                sts[2] = [error[-1:][0], None, '260']
+            aperak.extend(reversed(transaction.all('LOC')))
+
+            transaction_sts = transaction.first('STS')
+            if transaction_sts is not None:
+                aperak.append(transaction_sts)
+            aperak.append(sts)
+
+            rff = UNSegment('RFF')
+            rff[0] = ['TN', error_segment_ref]
+            aperak.append(rff)
+
+            rff2 = UNSegment('RFF')
+            rff2[0] = ['E66', doc_message_number]
+            aperak.append(rff2)
 
         unt = UNSegment('UNT')
         unt[0] = str(reduce(lambda acc, _: acc + 1, aperak, 0) - 1)
@@ -549,6 +654,13 @@ class EDIParser():
             f"unsupported combination of unit and time period, period={period}, format={period_format_qualifier}"
         )
 
+    """
+    Metering values of every IDE transaction as arrays, see timeSeries
+    """
+    def time_series(self, segments=None) -> list:
+        segments = self.segments if segments is None else segments
+        return series.extract(segments, self)
+
     """
     Dictionary out of payload segments
     """
@@ -574,25 +686,18 @@ class EDIParser():
     """
     def toEdi(self, segments=None) -> str:
         segments = self.segments if segments is None else segments
-        # segments = edi.rstrip(segments)
-        raw_result = map(lambda s: s.toEdi(), segments)
-        return ''.join(raw_result)
+        return serializer.serialize(segments)
+
+    """
+    Write EDI out of payload segments to a text file or buffer
+    """
+    def writeEdi(self, fh, segments=None):
+        segments = self.segments if segments is None else segments
+        serializer.write(segments, fh)
 
     def current_mail(self):
-        return email.message_from_string(self.payload)
+        return mail_from_payload(self.payload)
 
     def toMail(self, segments=None, send_from=None, send_to=None, subject=None, filename=None):
-        cur = self.current_mail()
-        mail = MIMEBase('application', "EDIFACT")
-        mail['From'] = cur['To'] if send_from is None else send_from
-        mail['To'] = cur['From']
-        mail['Date'] = formatdate(localtime=True)
         unb = list(filter(lambda s: s.tag == 'UNB', segments))[0]
-        mail['Subject'] = unb.toEdi()
-
-        file_content = self.toEdi(segments)
-        mail.set_payload(file_content)
-        encoders.encode_base64(mail)
-        mail.add_header('Content-Disposition', 'attachment; filename="{}"'.format(EDI_FILENAME))
-
-        return mail
+        return response_mail(self.current_mail(), unb.toEdi(), self.toEdi(segments), send_from)
@@ -0,0 +1,120 @@
+import io
+
+COMPONENT_SEPARATOR = ':'
+DATA_SEPARATOR = '+'
+RELEASE_CHARACTER = '?'
+SEGMENT_TERMINATOR = "'"
+
+class EDISerializer():
+    """
+    Writes segments as EDIFACT text. Output is the same as serializing
+    every segment on its own with pydifact: service characters are
+    released with '?', None is written as an empty element and the
+    UNA segment is written as is.
+    """
+    def __init__(self,
+                 component_separator=COMPONENT_SEPARATOR,
+                 data_separator=DATA_SEPARATOR,
+                 release_character=RELEASE_CHARACTER,
+                 segment_terminator=SEGMENT_TERMINATOR):
+        self.component_separator = component_separator
+        self.data_separator = data_separator
+        self.release_character = release_character
+        self.segment_terminator = segment_terminator
+        self.release_table = str.maketrans({
+            c: release_character + c
+            for c in (release_character, component_separator, data_separator, segment_terminator)
+        })
+        self.empty = data_separator + segment_terminator
+        self.compiled = {} # schema -> serializer of its values
+
+    def escape(self, value) -> str:
+        if value is None:
+            return ''
+        if type(value) is not str:
+            raise TypeError('{} is not a str, it is {}'.format(value, type(value)))
+        return value.translate(self.release_table)
+
+    def segment(self, segment) -> str:
+        tag = segment.tag
+        assert(tag is not None)
+        if tag == 'UNA':
+            return tag + segment.toList()[0]
+        schema = getattr(segment, 'schema', None)
+        if schema is not None:
+            serialize = self.compiled.get(schema)
+            if serialize is None:
+                serialize = self.compile(schema)
+            if serialize is not False:
+                return serialize(segment.values)
+        return self.elements(tag, segment.toList())
+
+    def elements(self, tag, elements) -> str:
+        if elements is None or len(elements) == 0:
+            return tag + self.empty
+        escape = self.escape
+        parts = [tag]
+        for element in elements:
+            if type(element) is list:
+                parts.append(self.component_separator.join([escape(e) for e in element]))
+            else:
+                parts.append(escape(element))
+        return self.data_separator.join(parts) + self.segment_terminator
+
+    """
+    Precompile the element layout of a schema into a function writing a
+    list of values, False for layouts that need the generic path
+    """
+    def compile(self, schema):
+        layout = []
+        for child in schema.children:
+            if not child.children:
+                layout.append(child.slot)
+            elif any(c.children for c in child.children):
+                layout = None
+                break
+            else:
+                layout.append(tuple(c.slot for c in child.children))
+
+        if layout is None:
+            serialize = False
+        elif len(layout) == 0:
+            empty = schema.tag + self.empty
+            serialize = lambda values: empty
+        else:
+            serialize = self.compile_layout(schema.tag, tuple(layout))
+        self.compiled[schema] = serialize
+        return serialize
+
+    def compile_layout(self, tag, layout):
+        escape = self.escape
+        join_components = self.component_separator.join
+        join_elements = self.data_separator.join
+        terminator = self.segment_terminator
+
+        def serialize(values):
+            parts = [tag]
+            for element in layout:
+                if type(element) is tuple:
+                    parts.append(join_components([
+                        '' if slot is None else escape(values[slot]) for slot in element
+                    ]))
+                elif element is None:
+                    parts.append('')
+                else:
+                    parts.append(escape(values[element]))
+            return join_elements(parts) + terminator
+
+        return serialize
+
+    def write(self, segments, fh):
+        segment = self.segment
+        for s in segments:
+            fh.write(segment(s))
+
+    def serialize(self, segments) -> str:
+        buffer = io.StringIO()
+        self.write(segments, buffer)
+        return buffer.getvalue()
+
+serializer = EDISerializer()
@@ -0,0 +1,154 @@
+from ediel_parser.lib.EDITokenizer import tokenize, CHUNK_SIZE
+from ediel_parser.lib.Segment import Group
+from ediel_parser.lib.SegmentIndex import TRANSACTION_TAG
+from ediel_parser.lib.UNSegment import UNSegment
+
+TRANSACTION = 'transaction'
+MESSAGE = 'message'
+
+INTERCHANGE_TAGS = ('UNA', 'UNB')
+MESSAGE_START_TAG = 'UNH'
+MESSAGE_END_TAG = 'UNT'
+INTERCHANGE_END_TAG = 'UNZ'
+
+class MessagePart():
+    """
+    One IDE transaction or one UNH message of an interchange read as a
+    stream. The header holds the segments it belongs to: UNA and UNB,
+    and for a transaction the message segments before the first IDE
+    (UNH, BGM, DTM, NAD, ...). Parts of the same message share their header.
+    """
+    __slots__ = ('header', 'segments', 'number')
+
+    def __init__(self, header, segments: list, number: int):
+        self.header = header
+        self.segments = segments
+        self.number = number # position of the part in its message or interchange
+
+    """
+    First segment with the tag, in the part itself or in its header
+    """
+    def __getitem__(self, tag):
+        for segment in self.segments:
+            if segment.tag == tag:
+                return segment
+        return self.header.index.first(tag)
+
+    def __iter__(self):
+        return iter(self.segments)
+
+    def __len__(self):
+        return len(self.segments)
+
+    @property
+    def ide(self):
+        segment = self.segments[0] if self.segments else None
+        return segment if segment is not None and segment.tag == TRANSACTION_TAG else None
+
+    """
+    Header and part as one parsed message, as EDIParser.segments
+    """
+    def message(self):
+        return Group(self.header.id).structure(*self.header.children, *self.segments)
+
+class Interchange():
+    """
+    Interchange header segments seen so far in a stream
+    """
+    def __init__(self, format):
+        self.format = format
+        self.segments = []
+        self.header = None
+
+    def add(self, segment):
+        if segment.tag == 'UNB' and len(self.segments) == 1 and self.segments[0].tag == 'UNA':
+            self.segments.append(segment)
+        else:
+            self.segments = [segment]
+        self.header = None
+
+    def group(self, *segments):
+        return Group(self.format).structure(*self.segments, *segments)
+
+"""
+Split loaded segments into IDE transactions or UNH messages, keeping
+only the current part and its header
+"""
+def split(segments, unit=TRANSACTION, format='edi'):
+    if unit == TRANSACTION:
+        return split_transactions(segments, format)
+    elif unit == MESSAGE:
+        return split_messages(segments, format)
+    raise ValueError('unit has to be {} or {}: {}'.format(TRANSACTION, MESSAGE, unit))
+
+def split_transactions(segments, format='edi'):
+    interchange = Interchange(format)
+    message = None # segments of the message before its first transaction
+    header = None
+    transaction = None
+    number = 0
+    for segment in segments:
+        tag = segment.tag
+        if transaction is not None and (tag == TRANSACTION_TAG or tag == MESSAGE_START_TAG or
+                                        tag == MESSAGE_END_TAG or tag == INTERCHANGE_END_TAG):
+            yield MessagePart(header, transaction, number)
+            number += 1
+            transaction = None
+
+        if tag == TRANSACTION_TAG:
+            if header is None:
+                header = interchange.group(*(message or ()))
+            transaction = [segment]
+        elif transaction is not None:
+            transaction.append(segment)
+        elif tag == MESSAGE_START_TAG:
+            message = [segment]
+            header = None
+            number = 0
+        elif tag == MESSAGE_END_TAG or tag == INTERCHANGE_END_TAG:
+            message = None
+            header = None
+        elif message is not None:
+            message.append(segment)
+        elif tag in INTERCHANGE_TAGS:
+            interchange.add(segment)
+    if transaction is not None:
+        yield MessagePart(header, transaction, number)
+
+def split_messages(segments, format='edi'):
+    interchange = Interchange(format)
+    message = None
+    number = 0
+    for segment in segments:
+        tag = segment.tag
+        if tag == MESSAGE_START_TAG:
+            if message is not None: # message without UNT
+                yield MessagePart(interchange.header, message, number)
+                number += 1
+            if interchange.header is None:
+                interchange.header = interchange.group()
+            message = [segment]
+        elif message is not None:
+            message.append(segment)
+            if tag == MESSAGE_END_TAG:
+                yield MessagePart(interchange.header, message, number)
+                number += 1
+                message = None
+        elif tag in INTERCHANGE_TAGS:
+            interchange.add(segment)
+            number = 0
+    if message is not None:
+        yield MessagePart(interchange.header, message, number)
+
+def load_segment(raw):
+    segment = UNSegment(raw.tag)
+    segment.load(raw.elements)
+    return segment
+
+"""
+Parse an interchange from a file object, str or bytes one part at a
+time, memory stays bounded by the largest transaction or message
+"""
+def iterparse(source, unit=TRANSACTION, *, encoding='utf-8', chunk_size=CHUNK_SIZE):
+    segments = map(load_segment, tokenize(source, encoding=encoding, chunk_size=chunk_size))
+    return split(segments, unit)
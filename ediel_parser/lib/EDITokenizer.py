@@ -0,0 +1,231 @@
+import re
+import mmap
+from collections import namedtuple
+
+CHUNK_SIZE = 1 << 16
+DEFAULT_SERVICE_CHARACTERS = ":+.? '"
+LINE_TERMINATORS = ' \r\n'
+
+RawSegment = namedtuple('RawSegment', ['tag', 'elements'])
+
+class Repetitions(tuple):
+    """
+    Repeated data element, only produced when the UNA segment advises a
+    repetition separator (syntax version 4)
+    """
+
+class ServiceCharacters():
+    """
+    Service string advice, the characters following UNA
+    """
+    def __init__(self, advice=DEFAULT_SERVICE_CHARACTERS):
+        if len(advice) < 6:
+            raise ValueError('service string advice has to be six characters: {}'.format(advice))
+        self.advice = advice[:6]
+        self.component_separator = advice[0]
+        self.data_separator = advice[1]
+        self.decimal_mark = advice[2]
+        self.release_character = advice[3]
+        self.repetition_separator = advice[4] if advice[4] != ' ' else None # reserved in version 3
+        self.segment_terminator = advice[5]
+
+class EDITokenizer():
+    """
+    Splits an EDIFACT interchange into segments while reading it. The
+    source can be a str, a text file object, or bytes, bytearray,
+    memoryview, mmap or a binary file object. Bytes are scanned as they
+    are and every segment is decoded on its own with the given encoding
+    when it is turned into a RawSegment, the payload is never decoded
+    as a whole.
+
+    Elements are returned the same way as pydifact parses them: a str
+    for a simple data element and a list of str for a composite one,
+    without its trailing empty components.
+    """
+    def __init__(self, source, *, encoding='utf-8', chunk_size=CHUNK_SIZE):
+        self.source = source
+        self.encoding = encoding
+        self.chunk_size = chunk_size
+        self.characters = ServiceCharacters()
+
+    def __iter__(self):
+        return self.segments()
+
+    def segments(self):
+        segment = self.segment
+        for raw in self.raw_segments():
+            yield segment(raw)
+
+    def buffers(self):
+        source = self.source
+        if isinstance(source, (str, bytes, bytearray, mmap.mmap)):
+            yield source
+        elif isinstance(source, memoryview):
+            yield source.cast('B') if source.format != 'B' else source
+        else:
+            while True:
+                chunk = source.read(self.chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    """
+    Undecoded text of every segment, a str or bytes slice of the source
+    without its terminator. The UNA segment is returned as None after
+    its service characters have been read.
+    """
+    def raw_segments(self):
+        buffers = self.buffers()
+        buffer = None
+        for chunk in buffers:
+            buffer = chunk if buffer is None else buffer + chunk
+            if len(buffer) >= 9 or buffer[:3] != b'UNA'[:len(buffer)] and buffer[:3] != 'UNA'[:len(buffer)]:
+                break
+        if buffer is None:
+            return
+
+        text = type(buffer) is str
+        start = 0
+        if buffer[:3] == ('UNA' if text else b'UNA'):
+            advice = buffer[3:9]
+            self.characters = ServiceCharacters(advice if text else str(advice, self.encoding))
+            yield None
+            start = 9
+
+        characters = self.characters
+        encode = (lambda c: c) if text else (lambda c: c.encode(self.encoding))
+        terminators = re.compile(re.escape(encode(characters.segment_terminator)))
+        release = characters.release_character if text else ord(encode(characters.release_character))
+        whitespace = encode(LINE_TERMINATORS)
+        copy = type(buffer) is memoryview
+
+        while True:
+            for match in terminators.finditer(buffer, start):
+                end = match.start()
+                if end > start and buffer[end - 1] == release:
+                    released = 1
+                    while end - released > start and buffer[end - released - 1] == release:
+                        released += 1
+                    if released % 2 == 1:
+                        continue
+                raw = buffer[start:end]
+                if copy:
+                    raw = bytes(raw)
+                raw = raw.lstrip(whitespace)
+                start = end + 1
+                if raw:
+                    yield raw
+
+            chunk = next(buffers, None)
+            if chunk is None:
+                break
+            buffer = buffer[start:] + chunk
+            start = 0
+
+        rest = buffer[start:]
+        if copy:
+            rest = bytes(rest)
+        if rest.strip(whitespace):
+            raise ValueError('unexpected end of EDI message: {}'.format(rest[:35]))
+
+    """
+    Tag of a raw segment, without decoding the rest of it
+    """
+    def tag(self, raw) -> str:
+        if raw is None:
+            return 'UNA'
+        if type(raw) is str:
+            return raw.split(self.characters.data_separator, 1)[0]
+        separator = self.characters.data_separator.encode(self.encoding)
+        return str(raw.split(separator, 1)[0], self.encoding)
+
+    def segment(self, raw) -> RawSegment:
+        if raw is None:
+            return RawSegment('UNA', [self.characters.advice])
+        if type(raw) is not str:
+            raw = str(raw, self.encoding)
+        characters = self.characters
+        if characters.release_character in raw:
+            elements = self.split_released(raw)
+        elif characters.repetition_separator is not None:
+            elements = self.split_repetitions(raw)
+        else:
+            component = characters.component_separator
+            elements = [element.split(component) for element in raw.split(characters.data_separator)]
+
+        element = self.element
+        return RawSegment(elements[0][0], [
+            e[0] if len(e) == 1 and type(e) is list else element(e) for e in elements[1:]
+        ])
+
+    """
+    Data element out of its components, trailing empty components are dropped
+    """
+    def element(self, components):
+        if type(components) is Repetitions:
+            return Repetitions(map(self.element, components))
+        n = len(components)
+        while n > 0 and components[n - 1] == '':
+            n -= 1
+        if n == 0:
+            return ''
+        if n == 1:
+            return components[0]
+        return components[:n]
+
+    """
+    Split a segment into data elements of components and repetitions,
+    honouring the release character
+    """
+    def split_released(self, raw: str) -> list:
+        characters = self.characters
+        release = characters.release_character
+        data = characters.data_separator
+        component = characters.component_separator
+        repetition = characters.repetition_separator
+
+        elements = []
+        repetitions = []
+        components = []
+        current = []
+        released = False
+        for c in raw:
+            if released:
+                current.append(c)
+                released = False
+            elif c == release:
+                released = True
+            elif c == component:
+                components.append(''.join(current))
+                current = []
+            elif c == data or c == repetition:
+                components.append(''.join(current))
+                repetitions.append(components)
+                if c == data:
+                    elements.append(repetitions[0] if len(repetitions) == 1 else Repetitions(repetitions))
+                    repetitions = []
+                current = []
+                components = []
+            else:
+                current.append(c)
+        components.append(''.join(current))
+        repetitions.append(components)
+        elements.append(repetitions[0] if len(repetitions) == 1 else Repetitions(repetitions))
+        return elements
+
+    def split_repetitions(self, raw: str) -> list:
+        characters = self.characters
+        elements = []
+        for element in raw.split(characters.data_separator):
+            repetitions = element.split(characters.repetition_separator)
+            if len(repetitions) == 1:
+                elements.append(element.split(characters.component_separator))
+            else:
+                elements.append(Repetitions(r.split(characters.component_separator) for r in repetitions))
+        return elements
+
+"""
+Segments of an EDIFACT interchange as they are read from the source
+"""
+def tokenize(source, **args):
+    return iter(EDITokenizer(source, **args))
@@ -0,0 +1,74 @@
+from collections.abc import MutableSequence
+
+class LazySegments(MutableSequence):
+    """
+    Children of a lazily parsed message. Only the tag and the raw text
+    of every segment are kept while tokenizing, a segment is decoded and
+    loaded the first time it is accessed and its raw text is dropped.
+    Changes are counted in mutations, an index of the segments built
+    before a change is stale, see SegmentIndex.stale.
+    """
+    mutations = 0
+
+    def __init__(self, tokenizer, load):
+        self.tokenizer = tokenizer
+        self.load = load # RawSegment -> Segment
+        self.tags = []
+        self.raws = []
+        tag = tokenizer.tag
+        seen = {}
+        for raw in tokenizer.raw_segments():
+            t = tag(raw)
+            self.tags.append(seen.setdefault(t, t))
+            self.raws.append(raw)
+        self.segments = [None] * len(self.raws)
+
+    def materialize(self, i: int):
+        segment = self.load(self.tokenizer.segment(self.raws[i]))
+        self.segments[i] = segment
+        self.raws[i] = None
+        return segment
+
+    """
+    Number of segments loaded so far
+    """
+    @property
+    def loaded(self) -> int:
+        return len(self.segments) - self.segments.count(None)
+
+    def __getitem__(self, i):
+        if type(i) is slice:
+            return [self[j] for j in range(*i.indices(len(self.segments)))]
+        segment = self.segments[i]
+        if segment is None:
+            if i < 0:
+                i += len(self.segments)
+            segment = self.materialize(i)
+        return segment
+
+    def __iter__(self):
+        segments = self.segments
+        for i in range(len(segments)):
+            segment = segments[i]
+            yield segment if segment is not None else self.materialize(i)
+
+    def __len__(self):
+        return len(self.segments)
+
+    def __setitem__(self, i, segment):
+        self.segments[i] = segment
+        self.tags[i] = segment.tag
+        self.raws[i] = None
+        self.mutations += 1
+
+    def __delitem__(self, i):
+        del self.segments[i]
+        del self.tags[i]
+        del self.raws[i]
+        self.mutations += 1
+
+    def insert(self, i, segment):
+        self.segments.insert(i, segment)
+        self.tags.insert(i, segment.tag)
+        self.raws.insert(i, None)
+        self.mutations += 1
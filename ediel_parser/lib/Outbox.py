@@ -0,0 +1,199 @@
+import time
+import email
+import sqlite3
+import smtplib
+
+MAX_ATTEMPTS = 8
+BACKOFF = 30 # seconds before the first retry, doubled for every further attempt
+MAX_BACKOFF = 3600
+DELIVER_BATCH = 16 # mails handed to the senders at a time, at most these are sent again after a crash
+RETENTION = 30 * 24 * 3600 # seconds a flagged or failed source mail is kept, see prune
+
+PENDING = 'pending'
+SENT = 'sent'
+FAILED = 'failed'
+QUEUED = 'queued'
+FLAGGED = 'flagged'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    source_id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY,
+    source_id TEXT NOT NULL REFERENCES sources(source_id),
+    mail BLOB,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox(state, next_attempt);
+CREATE INDEX IF NOT EXISTS outbox_source ON outbox(source_id);
+"""
+
+"""
+Errors that will not go away by sending again: refused recipients or
+sender and 5xx replies
+"""
+def permanent(error) -> bool:
+    if isinstance(error, (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused)):
+        return True
+    return isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600
+
+class Outbox():
+    """
+    Response mails queued on disk (SQLite) until they are sent, together
+    with the mails they answer. A source mail is queued once with all its
+    responses and flagged on the IMAP server only after every response
+    was sent, a flagged one matching again (flagged by a user to be
+    answered again) is queued again with new responses. A failed send is
+    retried from the outbox instead of the mail being answered again, a
+    crash resends at most the batch that was in flight, and a mail is
+    never flagged before it is answered. A source mail with a response
+    that failed for good is failed itself, it is neither flagged nor
+    queued again. Flagged and failed source mails are kept until they
+    are pruned.
+    """
+    def __init__(self, path=':memory:', *, max_attempts=MAX_ATTEMPTS, backoff=BACKOFF, max_backoff=MAX_BACKOFF, clock=time.time):
+        self.db = sqlite3.connect(path)
+        if path != ':memory:':
+            self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.executescript(SCHEMA)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+
+    def close(self):
+        self.db.close()
+
+    """
+    Queue the responses to a source mail, False when it is still queued.
+    The responses sent to a flagged source mail are replaced by the new ones.
+    """
+    def add(self, source_id: str, mails: list) -> bool:
+        with self.db:
+            row = self.db.execute('SELECT state FROM sources WHERE source_id = ?', (source_id,)).fetchone()
+            if row is None:
+                self.db.execute('INSERT INTO sources (source_id, state, updated) VALUES (?, ?, ?)',
+                                (source_id, QUEUED, self.clock()))
+            elif row[0] == FLAGGED:
+                self.db.execute('UPDATE sources SET state = ?, updated = ? WHERE source_id = ?',
+                                (QUEUED, self.clock(), source_id))
+                self.db.execute('DELETE FROM outbox WHERE source_id = ?', (source_id,))
+            else:
+                return False
+            self.db.executemany(
+                'INSERT INTO outbox (source_id, mail, state) VALUES (?, ?, ?)',
+                [(source_id, mail.as_bytes(), PENDING) for mail in mails],
+            )
+        return True
+
+    """
+    Ids of the source mails that are neither queued in the outbox nor
+    failed, new ones and flagged ones
+    """
+    def unknown(self, source_ids: list) -> list:
+        known = set()
+        for i in range(0, len(source_ids), 500):
+            chunk = source_ids[i:i + 500]
+            rows = self.db.execute(
+                'SELECT source_id FROM sources WHERE state IN (?, ?) AND source_id IN ({})'.format(','.join('?' * len(chunk))),
+                [QUEUED, FAILED] + chunk)
+            known.update(row[0] for row in rows)
+        return [source_id for source_id in source_ids if source_id not in known]
+
+    def delay(self, attempts: int) -> float:
+        return min(self.max_backoff, self.backoff * 2 ** (attempts - 1))
+
+    """
+    Send the mails that are due with send(mails) -> errors, a failed mail
+    is tried again after an exponential backoff until max_attempts and
+    failed for good on a permanent error, its source mail with it. The
+    sent mails are handed to on_sent after they are recorded, e.g. to
+    store them in the sent folder.
+    Delivery is at least once: the sends of a batch are recorded after it
+    was sent, a crash in between sends up to DELIVER_BATCH mails again.
+    (sent, failed) counts are returned.
+    """
+    def deliver(self, send, on_sent=None) -> tuple:
+        sent = failed = 0
+        last_id = 0
+        while True:
+            rows = self.db.execute(
+                'SELECT id, mail, attempts FROM outbox WHERE state = ? AND next_attempt <= ? AND id > ? ORDER BY id LIMIT ?',
+                (PENDING, self.clock(), last_id, DELIVER_BATCH),
+            ).fetchall()
+            if len(rows) == 0:
+                return sent, failed
+            last_id = rows[-1][0]
+            mails = [email.message_from_bytes(row[1]) for row in rows]
+            errors = send(mails)
+            now = self.clock()
+            with self.db:
+                for (row_id, _, attempts), error in zip(rows, errors):
+                    if error is None:
+                        sent += 1
+                        self.db.execute('UPDATE outbox SET state = ?, mail = NULL, error = NULL WHERE id = ?', (SENT, row_id))
+                        continue
+                    attempts += 1
+                    state = FAILED if permanent(error) or attempts >= self.max_attempts else PENDING
+                    failed += state == FAILED
+                    self.db.execute(
+                        'UPDATE outbox SET state = ?, attempts = ?, next_attempt = ?, error = ? WHERE id = ?',
+                        (state, attempts, now + self.delay(attempts), repr(error), row_id),
+                    )
+                    if state == FAILED:
+                        self.db.execute('UPDATE sources SET state = ?, updated = ? WHERE source_id = '
+                                        '(SELECT source_id FROM outbox WHERE id = ?)', (FAILED, now, row_id))
+            if on_sent is not None:
+                on_sent([mail for mail, error in zip(mails, errors) if error is None])
+
+    """
+    Source mails with all responses sent and not flagged yet
+    """
+    def ready(self) -> list:
+        rows = self.db.execute(
+            'SELECT source_id FROM sources s WHERE state = ? AND NOT EXISTS '
+            '(SELECT 1 FROM outbox o WHERE o.source_id = s.source_id AND o.state != ?) ORDER BY rowid',
+            (QUEUED, SENT),
+        )
+        return [row[0] for row in rows]
+
+    """
+    Flag the answered source mails with store(source_ids) and record it,
+    a crash in between flags them again on the next run, which is harmless
+    """
+    def flag(self, store) -> list:
+        source_ids = self.ready()
+        if len(source_ids) > 0:
+            store(source_ids)
+            now = self.clock()
+            with self.db:
+                self.db.executemany('UPDATE sources SET state = ?, updated = ? WHERE source_id = ?',
+                                    [(FLAGGED, now, source_id) for source_id in source_ids])
+        return source_ids
+
+    """
+    (source_id, error) of the responses that failed for good, of the
+    source mails failed since the given time
+    """
+    def failed(self, since: float = 0) -> list:
+        return self.db.execute(
+            'SELECT o.source_id, o.error FROM outbox o JOIN sources s ON s.source_id = o.source_id '
+            'WHERE o.state = ? AND s.state = ? AND s.updated >= ? ORDER BY o.id',
+            (FAILED, FAILED, since),
+        ).fetchall()
+
+    """
+    Forget flagged and failed source mails older than age seconds
+    """
+    def prune(self, age: float):
+        before = self.clock() - age
+        with self.db:
+            self.db.execute('DELETE FROM outbox WHERE source_id IN '
+                            '(SELECT source_id FROM sources WHERE state IN (?, ?) AND updated < ?)', (FLAGGED, FAILED, before))
+            self.db.execute('DELETE FROM sources WHERE state IN (?, ?) AND updated < ?', (FLAGGED, FAILED, before))
@@ -0,0 +1,132 @@
+import time
+import queue
+import smtplib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+POOL_SIZE = 4
+RETRIES = 1 # sends again on a new session when the server dropped the old one
+DROPPED = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+SERVICE_CLOSING = 421
+IDLE_WAIT = 0.05
+
+def dropped(error) -> bool:
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code == SERVICE_CLOSING
+    return isinstance(error, DROPPED)
+
+class RateLimit():
+    """
+    Token bucket letting through rate mails per second on average and
+    bursts of up to burst mails, shared by the threads sending to a server
+    """
+    def __init__(self, rate, burst=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = burst
+        self.last = clock()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            self.tokens -= 1 # below zero reserves a later slot for this caller
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0
+        if delay > 0:
+            self.sleep(delay)
+
+class SMTPPool():
+    """
+    Authenticated SMTP sessions shared by the mails of a burst. Up to size
+    sessions are opened when needed with connect and each one sends many
+    mails, a session the server dropped is replaced and the mail sent again.
+    With a rate the mails to the server are limited to rate per second.
+    """
+    def __init__(self, connect, size=POOL_SIZE, rate=None, burst=1):
+        self.connect = connect # () -> logged in smtplib.SMTP
+        self.size = size
+        self.limit = None if rate is None else RateLimit(rate, burst)
+        self.idle = queue.LifoQueue()
+        self.opened = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            try:
+                return self.idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self.lock:
+                can_open = self.opened < self.size
+                if can_open:
+                    self.opened += 1
+            if can_open:
+                break
+            try: # wait for a session, or for a dropped one to make room
+                return self.idle.get(timeout=IDLE_WAIT)
+            except queue.Empty:
+                continue
+        try:
+            return self.connect()
+        except BaseException:
+            with self.lock:
+                self.opened -= 1
+            raise
+
+    def release(self, session):
+        self.idle.put(session)
+
+    def discard(self, session):
+        with self.lock:
+            self.opened -= 1
+        try:
+            session.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+
+    def send(self, mail):
+        for attempt in range(RETRIES + 1):
+            session = self.acquire()
+            if self.limit is not None:
+                self.limit.wait()
+            try:
+                session.sendmail(mail['From'], mail['To'], mail.as_string())
+            except Exception as error:
+                if not dropped(error):
+                    self.release(session) # refused mail, the session is fine
+                    raise
+                self.discard(session)
+                if attempt == RETRIES:
+                    raise
+                continue
+            self.release(session)
+            return
+
+    """
+    Send mails over the sessions of the pool in parallel, the error of
+    every mail or None when it was sent is returned in order
+    """
+    def send_many(self, mails: list) -> list:
+        if len(mails) == 0:
+            return []
+        with ThreadPoolExecutor(min(self.size, len(mails))) as executor:
+            return list(executor.map(self.try_send, mails))
+
+    def try_send(self, mail):
+        try:
+            self.send(mail)
+        except Exception as error:
+            return error
+        return None
+
+    def close(self):
+        while True:
+            try:
+                session = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            self.discard(session)
@@ -1,5 +1,5 @@
-from pydifact.message import Message as PMessage
-from pydifact.segments import Segment as PSegment
+from ediel_parser.lib.SegmentIndex import SegmentIndex
+from ediel_parser.lib.EDISerializer import serializer
 
 class Segment():
 
@@ -14,19 +14,37 @@ class Segment():
         self.value = value
         self.ref = ref
         self.group = group
+        self._index = None
 
     def __getitem__(self, key):
         if type(key) is str:
-            for child in self.children:
-                if 'r:' in key:
-                    clean_key = key.replace('r:', '')
+            if self.group is True and 'r:' not in key:
+                # the index holds the tag of every child of a group
+                segment = self.index.first(key)
+                if segment is not None: return segment
+                raise IndexError(key + ' does not exist')
+            if 'r:' in key:
+                clean_key = key.replace('r:', '')
+                for child in self.children:
                     if child.ref == clean_key: return child
-                else:
+            else:
+                for child in self.children:
                     if child.id == key or child.tag == key: return child
         if type(key) is int:
             return self.children[key]
+        if type(key) is tuple: # path
+            segment = self
+            for k in key:
+                segment = segment[k]
+            return segment
         raise IndexError(key + ' does not exist')
         
+    """
+    Value of the element at a path of names, refs or positions
+    """
+    def get(self, path: tuple):
+        return self[path].value
+
     def __setitem__(self, key: str or int, value: list or str):
         if type(value) is list:
             for i in range(0, len(value)):
@@ -70,6 +88,7 @@ class Segment():
         for i in range(0, len(children)):
             child = children[i]
             if child.id == key:
+                self._index = None
                 return self.children.pop(i)
         raise IndexError('{} does not exist'.format(key))
 
@@ -125,7 +144,20 @@ class Segment():
                     else:
                         def_segments[i].value = value
     
+    """
+    Use a sequence of children as it is, e.g. LazySegments, indexed by
+    the given tags, or with an index built already
+    """
+    def structure_from(self, children, tags=None, index=None):
+        self.children = children
+        if self.group is not True:
+            self._index = None
+        else:
+            self._index = index if index is not None else SegmentIndex(children, tags)
+        return self
+
     def add_segment(self, segment):
+        self._index = None
         self.children.append(segment)
 
     """
@@ -134,8 +166,20 @@ class Segment():
     def structure(self, *children):
         children = list(children)
         self.children = children
+        self._index = SegmentIndex(children) if self.group is True else None
         return self
 
+    """
+    Tag and transaction index of the children, see SegmentIndex. It is
+    built again after the children changed, from their tags when they
+    keep them (LazySegments) so no segment is loaded for it.
+    """
+    @property
+    def index(self) -> SegmentIndex:
+        if self._index is None or self._index.stale:
+            self._index = SegmentIndex(self.children, getattr(self.children, 'tags', None))
+        return self._index
+
     def validate(self, segment):
         return True # TODO: validate every segment
 
@@ -153,7 +197,7 @@ class Segment():
         if n_children > 0:
             for i in range(0, n_children):
                 cur = children[i]
-                value = self._toList(segment=cur)
+                value = cur.toList()
                 result.append(value)
         else:
             value = segment.value
@@ -176,20 +220,13 @@ class Segment():
         if n_children > 0: # recursion
             for i in range(0, n_children):
                 cur = children[i]
-                result[cur.id] = self._toDict(segment=cur)
+                result[cur.id] = cur.toDict()
         else: # base case
             result = segment.value
         return result
 
     def toEdi(self):
-        assert(self.tag is not None)
-        message = PMessage()
-        tag, elements = self.tag, self.toList()
-        segment = PSegment(tag, None)
-        if elements is not None and len(elements) > 0:
-            segment = PSegment(tag, *elements)
-        message.add_segment(segment)
-        return message.serialize()
+        return serializer.segment(self)
         
 
 Group = Segment.create_group
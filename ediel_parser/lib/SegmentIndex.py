@@ -0,0 +1,147 @@
+from bisect import bisect_left
+
+TRANSACTION_TAG = 'IDE'
+MESSAGE_END_TAGS = ('UNT', 'UNZ')
+
+class Transaction():
+    """
+    IDE transaction of a parsed message, the segments from the IDE
+    segment up to the next IDE segment or the end of the message
+    """
+    __slots__ = ('index', 'start', 'end')
+
+    def __init__(self, index, start: int, end: int):
+        self.index = index
+        self.start = start
+        self.end = end
+
+    @property
+    def ide(self):
+        return self.index.segments[self.start]
+
+    @property
+    def segments(self) -> list:
+        return self.index.segments[self.start:self.end]
+
+    def __iter__(self):
+        segments = self.index.segments
+        for i in range(self.start, self.end):
+            yield segments[i]
+
+    def __len__(self):
+        return self.end - self.start
+
+    def positions(self, tag) -> list:
+        positions = self.index.tags.get(tag, [])
+        return positions[bisect_left(positions, self.start):bisect_left(positions, self.end)]
+
+    def all(self, tag) -> list:
+        segments = self.index.segments
+        return [segments[i] for i in self.positions(tag)]
+
+    def first(self, tag):
+        positions = self.positions(tag)
+        return self.index.segments[positions[0]] if len(positions) > 0 else None
+
+"""
+Positions of every tag in a list of tags
+"""
+def tag_positions(tags) -> dict:
+    positions = {}
+    for i, tag in enumerate(tags):
+        found = positions.get(tag)
+        if found is None:
+            positions[tag] = [i]
+        else:
+            found.append(i)
+    return positions
+
+class SegmentIndex():
+    """
+    Index of the segments of a parsed message, built in one pass:
+    positions per tag and the boundaries of every IDE transaction. The
+    tags can be given separately so lazily loaded segments are indexed
+    without loading them.
+    """
+    def __init__(self, segments: list, tags=None):
+        self.segments = segments
+        self.mutations = getattr(segments, 'mutations', 0)
+        self.tags = {}
+        self.transactions = []
+        start = None
+        if tags is None:
+            tags = [segment.tag for segment in segments]
+        for i, tag in enumerate(tags):
+            positions = self.tags.get(tag)
+            if positions is None:
+                self.tags[tag] = [i]
+            else:
+                positions.append(i)
+            if tag == TRANSACTION_TAG or tag in MESSAGE_END_TAGS:
+                if start is not None:
+                    self.transactions.append(Transaction(self, start, i))
+                start = i if tag == TRANSACTION_TAG else None
+        if start is not None:
+            self.transactions.append(Transaction(self, start, len(segments)))
+
+    """
+    Index of segments loaded in consecutive parts, out of the length and
+    the positions per tag of every part (tag_positions), see parallelParse
+    """
+    @classmethod
+    def joined(cls, segments, parts):
+        index = cls.__new__(cls)
+        index.segments = segments
+        index.mutations = getattr(segments, 'mutations', 0)
+        index.tags = {}
+        offset = 0
+        for length, positions in parts:
+            for tag, part in positions.items():
+                if offset > 0:
+                    part = [offset + i for i in part]
+                existing = index.tags.get(tag)
+                if existing is None:
+                    index.tags[tag] = part
+                else:
+                    existing += part
+            offset += length
+
+        index.transactions = []
+        boundaries = [(i, True) for i in index.tags.get(TRANSACTION_TAG, [])]
+        for tag in MESSAGE_END_TAGS:
+            boundaries += [(i, False) for i in index.tags.get(tag, [])]
+        start = None
+        for i, is_transaction in sorted(boundaries):
+            if start is not None:
+                index.transactions.append(Transaction(index, start, i))
+            start = i if is_transaction else None
+        if start is not None:
+            index.transactions.append(Transaction(index, start, len(segments)))
+        return index
+
+    """
+    Whether the segments changed since the index was built, only known
+    for segments counting their changes like LazySegments
+    """
+    @property
+    def stale(self) -> bool:
+        return getattr(self.segments, 'mutations', 0) != self.mutations
+
+    """
+    Index of a parsed message, or a new index for a plain list of segments
+    """
+    @classmethod
+    def of(cls, segments):
+        index = getattr(segments, 'index', None)
+        return index if isinstance(index, cls) else cls(list(segments))
+
+    def positions(self, tag) -> list:
+        return self.tags.get(tag, [])
+
+    def all(self, tag) -> list:
+        segments = self.segments
+        return [segments[i] for i in self.tags.get(tag, [])]
+
+    def first(self, tag):
+        positions = self.tags.get(tag)
+        return self.segments[positions[0]] if positions else None
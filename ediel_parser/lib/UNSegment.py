@@ -1,12 +1,22 @@
 from ediel_parser.lib.segmentDefinitions import definitions
 from ediel_parser.lib.Segment import Segment
-from copy import deepcopy
+from ediel_parser.lib.CompiledSegment import SegmentSchema, CompiledSegment, registry
+
+schemas = {tag: SegmentSchema.compile(definition) for tag, definition in definitions.items()}
+registry.update(schemas)
 
 def UNSegment(segmentId, **args):
-    segment = definitions.get(segmentId)
-    if segment is None:
+    schema = schemas.get(segmentId)
+    if schema is None:
         print("https://www.truugo.com/edifact/d96a/{}".format(segmentId))
         return Segment(tag=segmentId) # placeholder segment
     else:
-        segment = deepcopy(segment)
-        return segment
\ No newline at end of file
+        return CompiledSegment(schema, list(schema.defaults))
+
+"""
+Pre-resolve a path of element names or refs for segments of a tag,
+e.g. resolve('QTY', ('quantity_details', 'quantity')) == (0, 1),
+the result can be used as segment[path]
+"""
+def resolve(segmentId, path: tuple) -> tuple:
+    return schemas[segmentId].resolve(path)
@@ -1,5 +1,10 @@
 import os
+import sys
+import asyncio
 from lib.EDICommunicator import EDICommunicator
+from lib.AsyncEDICommunicator import AsyncEDICommunicator
+from lib.SMTPPool import POOL_SIZE as SMTP_SESSIONS
+from lib.Outbox import Outbox, RETENTION
 from lib.EDIParser import EDIParser
 import lib.cli.tools as tools
 from types import SimpleNamespace
@@ -26,18 +31,28 @@ def set_args(subparsers):
 
     parser.add_argument('--input-dir')
     parser.add_argument('--output-dir')
+    parser.add_argument('--window', type=int, help='fetch mails for --output-dir with up to WINDOW FETCH commands in flight')
+    parser.add_argument('--smtp-sessions', type=int, default=SMTP_SESSIONS, help='SMTP sessions sending the mails of --input-dir')
+    parser.add_argument('--smtp-rate', type=float, help='mails per second sent to the SMTP server at most')
+    parser.add_argument('--outbox', help='SQLite file queueing the mails of --input-dir until they are sent, mails are retried from it by later runs (needs --uid)')
+    parser.add_argument('--outbox-days', type=float, default=RETENTION / 86400, help='days an answered mail, or one with a response that failed for good, is kept in the outbox')
+    parser.add_argument('--uid', action='store_true', help='mail ids are UIDs, searched, fetched, named and flagged as such in every com run of a pipeline')
 
-def handle_send(payload, args):
-    com = get_com(args)
-    mail = None # result email
+"""
+Send the mails of the payloads as one burst over the SMTP sessions of
+com, the error of every mail or None when it was sent is returned
+"""
+def handle_send(com, payloads: [str], args) -> list:
+    mails = [] # result emails
     if args.from_type == "mail":
-        mail = com.mail_from_str(payload)
+        mails = [com.mail_from_str(payload) for payload in payloads]
     if args.send is True:
-        com.send_mail(mail)
-    return mail
+        return com.send_mails(mails)
+    return [None] * len(mails)
 
 def get_com(args):
-    com = EDICommunicator()
+    com = EDICommunicator(smtp_sessions=getattr(args, 'smtp_sessions', 1), smtp_rate=getattr(args, 'smtp_rate', None),
+                          uid=getattr(args, 'uid', False))
     com.server = args.server
     com.username = args.username
     com.password = args.password
@@ -48,16 +63,57 @@ def vprint(args, *margs):
     if args.verbose is True:
         print(*margs)
 
-def handle_store_query(args, mail_ids_str: str):
-    mail_ids = mail_ids_str.split(',') # to list
-    com = get_com(args)
+"""
+Store the flags of all mails with a few commands over the open connection
+"""
+def handle_store_query(com, args, mail_ids: [str]) -> str:
     query = args.imap_store_query
     if len(query) < 2:  raise ValueError("You need to supply two arguments for imap-store-query, command and flags")
     cmd, flags = query[0], query[1]
-    result_email_ids = com.imap_store_query(mail_ids_str, cmd, '({})'.format(flags))
-    return result_email_ids
+    result_email_ids = com.store_flags(mail_ids, cmd, '({})'.format(flags))
+    return com.str_mail_ids(result_email_ids)
+
+"""
+Write the mails to the output directory with pipelined FETCH commands
+instead of one round trip per mail
+"""
+async def fetch_to_dir(args, mail_ids: [str]):
+    com = AsyncEDICommunicator(username=args.username, password=args.password, server=args.server, uid=args.uid, window=args.window)
+    async with com, com.fetch(mail_ids) as mails:
+        async for mail_id, mail in mails:
+            with open(os.path.join(args.output_dir, '{}.eml'.format(mail_id)), 'wb') as fh:
+                fh.write(mail)
+
+"""
+Queue the mails in the outbox with the id of the mail they answer, send
+what is due and flag the mails with all their responses sent. A mail
+still queued by an earlier run is not queued again, only retried, a
+flagged one is queued again with the new responses. A mail with a
+response that failed for good is reported and not answered again.
+Answered and failed mails older than --outbox-days are forgotten.
+"""
+def handle_outbox(com, args, mail_ids: [str], payloads: [str]) -> [str]:
+    outbox = Outbox(args.outbox)
+    responses = {}
+    for mail_id, payload in zip(mail_ids, payloads):
+        responses.setdefault(mail_id, []).append(com.mail_from_str(payload))
+    for mail_id in outbox.unknown(list(responses)):
+        outbox.add(mail_id, responses[mail_id])
+    delivered = outbox.clock()
+    sent, lost = outbox.deliver(com.pool.send_many, com.append_sent)
+    for mail_id, error in outbox.failed(delivered): # failed for good in this run, kept until pruned
+        print('{}: {}'.format(mail_id, error), file=sys.stderr)
+    if args.imap_store_query:
+        answered = outbox.flag(lambda ids: handle_store_query(com, args, ids))
+    else:
+        answered = outbox.flag(lambda ids: None)
+    outbox.prune(args.outbox_days * 86400)
+    outbox.close()
+    return answered
 
 def run(args):
+    if args.outbox is not None and not args.uid:
+        raise SystemExit('--outbox needs --uid, sequence numbers of the mails change between runs')
     # dependencies on other arguments
     args.outgoing_server = args.server if args.outgoing_server is None else args.outgoing_server
     args.incoming_server = args.server if args.incoming_server is None else args.incoming_server
@@ -92,26 +148,36 @@ def run(args):
     # send emails
     if args.send is True:
         if load.files is True:
-            for i, path in enumerate(load.paths):
+            payloads = []
+            for path in load.paths:
                 fh = open(path, 'r')
-                content = fh.read()
-                mail = handle_send(content, args)
-                if args.imap_store_query:
-                    mail_id = mail_ids_lst[i]
-                    response_id = handle_store_query(args, mail_id)
+                payloads.append(fh.read())
                 fh.close()
+            if args.outbox is not None: # only the answered mails are passed on
+                mail_ids = com.str_mail_ids(handle_outbox(com, args, com.mail_ids_from_filenames(load.filenames), payloads))
+            else: # only the mails with all their files sent are flagged and passed on
+                errors = handle_send(com, payloads, args)
+                for path, error in zip(load.paths, errors):
+                    if error is not None:
+                        print('{}: {!r}'.format(path, error), file=sys.stderr)
+                sent_ids = com.sent_mail_ids(load.filenames, errors)
+                if args.imap_store_query and len(sent_ids) > 0:
+                    handle_store_query(com, args, sent_ids)
+                mail_ids = com.str_mail_ids(sent_ids)
+            com.close()
     else: # write emails
-        if args.output_dir:
-            for mail_id in mail_ids_lst:
-                mail = com.get_mail_with(mail_id)
+        if args.output_dir and args.window is not None:
+            asyncio.run(fetch_to_dir(args, mail_ids_lst))
+        elif args.output_dir:
+            for mail_id, mail in com.fetch_mails(mail_ids_lst):
                 file_name = '{}.eml'.format(mail_id)
                 file_path = os.path.join(args.output_dir, file_name)
-                fh = open(file_path, 'w')
+                fh = open(file_path, 'wb')
                 fh.write(mail)
                 fh.close()
                 
     if args.send is False:
         if args.imap_store_query:
-            mail_ids = handle_store_query(args, mail_ids)
+            mail_ids = handle_store_query(com, args, mail_ids_lst)
 
     print(mail_ids)
\ No newline at end of file
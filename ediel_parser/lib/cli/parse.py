@@ -1,6 +1,12 @@
 import argparse
+import contextlib
 import json
 import os
+import sys
+import traceback
+import multiprocessing
+from functools import partial
+from types import SimpleNamespace
 from lib.EDIParser import EDIParser
 import lib.cli.tools as tools
 
@@ -9,17 +15,28 @@ def set_args(subparsers):
     parser.add_argument('--from', dest='from_type', choices=['edi', 'json', 'mail'], default='edi'),
     parser.add_argument('--to', dest='to_type', choices=['json', 'raw', 'json-arr', 'edi', 'mail'], default='json')
     parser.add_argument('--aperak', action='store_true')
+    parser.add_argument('--our-ediel', default=os.environ.get('SL_EDIEL_ID'), help='EDIEL id used as sender of generated messages')
+    parser.add_argument('--our-city', default=os.environ.get('SL_EDIEL_CITY'))
     parser.add_argument('--input-dir')
     parser.add_argument('--output-dir')
+    parser.add_argument('--jobs', type=int, default=1, help='number of processes parsing the files of --input-dir')
+    parser.add_argument('--chunksize', type=int, help='files handed to a process at a time, default about four chunks per process')
+    parser.add_argument('--unordered', action='store_true', help='write results as files are done instead of in input order')
+    parser.add_argument('--snapshots', help='directory of parsed segments by payload, a payload parsed before is read back from it')
 
-def handle_parse(content, args):
-    parser = EDIParser(content, format=args.from_type)
+"""
+Results of a payload, one per generated message with --aperak
+"""
+def handle_parse(content, args) -> list:
+    parser = EDIParser(content, args.from_type, args.our_ediel, args.our_city, snapshots=args.snapshots)
 
-    work_result = None
+    work_results = [None]
     if args.aperak is True:
-        work_result = parser.create_aperak()
+        work_results = parser.create_aperak()
 
-    to_type = args.to_type
+    return [convert(parser, content, work_result, args.to_type) for work_result in work_results]
+
+def convert(parser, content, work_result, to_type):
     if to_type == 'json':
         result = json.dumps(parser.toDict(work_result))
     elif to_type == 'json-arr':
@@ -28,33 +45,87 @@ def handle_parse(content, args):
         result = parser.toEdi(work_result)
         result = result.replace("'", "'\n") # pretty print
     elif to_type == 'raw':
-        result = payload
+        result = content if type(content) is str else str(content, 'utf-8')
     elif to_type == 'mail':
         result = parser.toMail(work_result)
 
     return result
 
+"""
+Options needed to parse a file, without the open files of the command
+line arguments so they can be sent to a worker process
+"""
+def job_options(args):
+    return SimpleNamespace(
+        from_type=args.from_type,
+        to_type=args.to_type,
+        aperak=args.aperak,
+        our_ediel=args.our_ediel,
+        our_city=args.our_city,
+        snapshots=args.snapshots,
+    )
+
+"""
+Content of an input file, mapped for the tokenizer, read for json.loads
+which takes no memory map
+"""
+def map_input(fh, from_type):
+    if from_type == 'json':
+        return contextlib.nullcontext(fh.read())
+    return tools.map_file(fh)
+
+"""
+Path, results and the traceback if parsing failed, errors are returned
+so one bad file does not stop the others
+"""
+def parse_file(options, path):
+    try:
+        with open(path, 'rb') as fh, map_input(fh, options.from_type) as content:
+            return path, list(map(str, handle_parse(content, options))), None
+    except Exception:
+        return path, None, traceback.format_exc()
+
+def parse_files(paths: list, options, jobs=1, chunksize=None, ordered=True):
+    work = partial(parse_file, options)
+    if jobs <= 1:
+        yield from map(work, paths)
+        return
+    if chunksize is None:
+        chunksize = max(1, len(paths) // (jobs * 4))
+    with multiprocessing.Pool(jobs) as pool:
+        results = pool.imap(work, paths, chunksize) if ordered else pool.imap_unordered(work, paths, chunksize)
+        yield from results
+
+def write_results(path, results, args):
+    extension = tools.extension_for_type(args.to_type)
+    for i, result in enumerate(results):
+        name = os.path.basename(path) if i == 0 else '{}.{}'.format(os.path.basename(path), i)
+        filename = '{}.{}'.format(name, extension)
+        if args.output_dir is None:
+            print(result)
+        else:
+            with open(os.path.join(args.output_dir, filename), 'w') as fh:
+                print(result)
+                fh.write(result)
+
 def run(args):
+    if args.snapshots is not None:
+        os.makedirs(args.snapshots, exist_ok=True)
 
     if args.input_dir is not None:
         filenames, full_paths = tools.get_files(args.input_dir)
-        for path in full_paths:
-            extension = tools.extension_for_type(args.to_type)
-            filename = '{}.{}'.format(os.path.basename(path), extension)
-            fh = open(path, 'r')
-            content = fh.read()
-            fh.close()
-            result = handle_parse(content, args)
-            if args.output_dir is None:
-                print(result)
-            else:
-                path = os.path.join(args.output_dir, filename)
-                fh = open(path, 'w')
-                print(result)
-                fh.write(result.__str__())
-                fh.close()
+        failed = 0
+        for path, results, error in parse_files(full_paths, job_options(args), args.jobs, args.chunksize, not args.unordered):
+            if error is not None:
+                failed += 1
+                print('{}: {}'.format(path, error), file=sys.stderr)
+                continue
+            write_results(path, results, args)
+        if failed > 0:
+            print('{} of {} files failed'.format(failed, len(full_paths)), file=sys.stderr)
+            raise SystemExit(1) # the files that parsed are written, the exit status tells the next stage
         return args.output_dir
     else:
         payload = args.input.read()
-        result = handle_parse(payload, args)
-        print(result)
\ No newline at end of file
+        for result in handle_parse(payload, args):
+            print(result)
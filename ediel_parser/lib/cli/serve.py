@@ -0,0 +1,48 @@
+import os
+from lib.EDICommunicator import EDICommunicator
+import lib.mailPipeline as pipeline
+from lib.SMTPPool import POOL_SIZE as SMTP_SESSIONS
+from lib.Outbox import Outbox, RETENTION
+from lib.Checkpoint import Checkpoint
+from lib.AckCache import AckCache, MAX_AGE
+
+def set_args(subparsers):
+    parser = subparsers.add_parser('serve', description='poll the mailbox and answer EDI mails in one long running process')
+    parser.add_argument('--username', default=os.environ.get('SL_COM_USERNAME'))
+    parser.add_argument('--password', default=os.environ.get('SL_COM_PASSWORD'))
+    parser.add_argument('--server', default=os.environ.get('SL_COM_SERVER'))
+    parser.add_argument('--our-ediel', default=os.environ.get('SL_EDIEL_ID'), help='EDIEL id used as sender of generated messages')
+    parser.add_argument('--our-city', default=os.environ.get('SL_EDIEL_CITY'))
+    parser.add_argument('--imap-search-query', dest='search_query', default=pipeline.SEARCH_QUERY)
+    parser.add_argument('--imap-again-query', dest='again_query', default=pipeline.AGAIN_QUERY,
+                        help='answered mails to answer again, searched below the --checkpoint')
+    parser.add_argument('--again-interval', type=float, default=pipeline.AGAIN_INTERVAL,
+                        help='seconds between searches of --imap-again-query below the --checkpoint, it searches the whole mailbox')
+    parser.add_argument('--utilts-err', action='store_true', help='also send UTILTS ERR for messages with functional errors')
+    parser.add_argument('--interval', type=float, default=60, help='seconds between polls')
+    parser.add_argument('--once', action='store_true', help='poll once and exit')
+    parser.add_argument('--smtp-sessions', type=int, default=SMTP_SESSIONS, help='SMTP sessions sending the responses of a poll')
+    parser.add_argument('--smtp-rate', type=float, help='mails per second sent to the SMTP server at most')
+    parser.add_argument('--outbox', help='SQLite file queueing the responses until they are sent, kept in memory by default')
+    parser.add_argument('--outbox-days', type=float, default=RETENTION / 86400, help='days an answered mail, or one with a response that failed for good, is kept in the outbox')
+    parser.add_argument('--checkpoint', help='JSON file with the last handled UID, only newer mails are searched (needs --outbox)')
+    parser.add_argument('--ack-cache', help='SQLite file with the acknowledgements sent, a duplicate interchange gets them again without being parsed')
+    parser.add_argument('--ack-cache-days', type=float, default=MAX_AGE / 86400, help='days an acknowledgement is kept in the cache')
+
+def run(args):
+    if args.checkpoint is not None and args.outbox is None:
+        raise SystemExit('--checkpoint needs --outbox, responses queued in memory would be lost with the process')
+    com = EDICommunicator(username=args.username, password=args.password, server=args.server,
+                          smtp_sessions=args.smtp_sessions, smtp_rate=args.smtp_rate, uid=True)
+    outbox = Outbox() if args.outbox is None else Outbox(args.outbox)
+    checkpoint = None if args.checkpoint is None else Checkpoint(args.checkpoint)
+    cache = None if args.ack_cache is None else AckCache(args.ack_cache, max_age=args.ack_cache_days * 86400)
+    try:
+        pipeline.serve(com, args, outbox, checkpoint=checkpoint, cache=cache)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        com.close()
+        outbox.close()
+        if cache is not None:
+            cache.close()
@@ -1,4 +1,6 @@
 import os
+import mmap
+from contextlib import contextmanager
 
 def get_files(path, blacklist=True):
     filenames = os.listdir(path)
@@ -36,6 +38,18 @@ def map_files(full_paths: [str], cb=None, *, mode='r'):
             cb(fh, path, extract_filename(path))
             fh.close()
 
+"""
+Read only memory map of an open binary file, empty files can not be
+mapped and are read as empty bytes
+"""
+@contextmanager
+def map_file(fh):
+    if os.fstat(fh.fileno()).st_size == 0:
+        yield b''
+        return
+    with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        yield mapped
+
 def extension_for_type(file_type):
     ft = file_type
     if ft == 'mail':
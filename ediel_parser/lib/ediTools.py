@@ -1,4 +1,5 @@
 from ediel_parser.lib.Segment import Segment
+from ediel_parser.lib.CompiledSegment import CompiledSegment
 
 def format_timestamp(ts):
     return ts.strftime("%Y%m%d%H%M")
@@ -17,6 +18,8 @@ def rstrip(segments: [Segment]):
     return new_segments
 
 def _rstrip(segment: Segment):
+    if isinstance(segment, CompiledSegment):
+        return segment.rstrip()
     new_segment = Segment.create_from(segment)
     new_children = []
     decrement_val = 1
@@ -0,0 +1,56 @@
+import time
+from hashlib import md5
+from itertools import count
+
+ID_LENGTH = 14 # interchange_control_reference is an..14
+
+"""
+Hex digest of the raw payload, computed once per parsed payload
+"""
+def payload_digest(payload) -> str:
+    if type(payload) is str:
+        payload = payload.encode('utf-8')
+    return md5(payload).hexdigest()
+
+class PayloadIdGenerator():
+    """
+    Default ids: md5 of the payload digest, the time and a per generator
+    counter, so every generated message gets a new id
+    """
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.counter = count()
+
+    def __call__(self, digest: str) -> str:
+        hash_string = '{}:{}:{}'.format(digest, self.clock(), next(self.counter)).encode('utf-8')
+        return md5(hash_string).hexdigest()[:ID_LENGTH]
+
+class SeededIdGenerator():
+    """
+    Deterministic ids for tests: the same seed and payload always
+    produce the same sequence of ids
+    """
+    def __init__(self, seed=0):
+        self.seed = seed
+        self.counter = count()
+
+    def __call__(self, digest: str) -> str:
+        hash_string = '{}:{}:{}'.format(self.seed, digest, next(self.counter)).encode('utf-8')
+        return md5(hash_string).hexdigest()[:ID_LENGTH]
+
+class CounterIdGenerator():
+    """
+    Sequential ids, prefix followed by a zero padded counter
+    """
+    def __init__(self, prefix='', start=1):
+        if len(prefix) >= ID_LENGTH:
+            raise ValueError('prefix has to be shorter than {} characters'.format(ID_LENGTH))
+        self.prefix = prefix
+        self.counter = count(start)
+
+    def __call__(self, digest: str) -> str:
+        width = ID_LENGTH - len(self.prefix)
+        unique_id = '{}{:0{}d}'.format(self.prefix, next(self.counter), width)
+        if len(unique_id) > ID_LENGTH:
+            raise OverflowError('{} is longer than {} characters'.format(unique_id, ID_LENGTH))
+        return unique_id
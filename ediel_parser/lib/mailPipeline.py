@@ -0,0 +1,162 @@
+import sys
+import json
+import time
+import imaplib
+import smtplib
+import traceback
+from functools import partial
+from collections import Counter
+
+from ediel_parser.lib.EDIParser import EDIParser, mail_from_payload, attachment_from_mail, response_mail, scan_header
+from ediel_parser.lib.AckCache import content_key, interchange_key
+from ediel_parser.lib.Outbox import Outbox
+
+SEARCH_QUERY = 'OR (NOT ANSWERED SUBJECT UTILTS) (SUBJECT UTILTS FLAGGED)'
+AGAIN_QUERY = 'FLAGGED SUBJECT UTILTS' # answered mails flagged to be answered again, also below a checkpoint
+ANSWERED = ('+FLAGS', '(\\Seen \\Answered)')
+UNFLAGGED = ('-FLAGS', '(\\Flagged)')
+MAX_PARSE_ATTEMPTS = 3 # polls trying a mail that fails to parse, a checkpoint is held before it meanwhile
+AGAIN_INTERVAL = 900 # seconds between searches for mails flagged again below a checkpoint
+CONNECTION_ERRORS = (imaplib.IMAP4.abort, smtplib.SMTPServerDisconnected, OSError)
+
+"""
+Response messages of a parsed payload: an APERAK for every message, and
+with options.utilts_err a UTILTS ERR for every message with functional
+errors
+"""
+def response_messages(parser, options) -> list:
+    messages = parser.create_aperak()
+    if options.utilts_err:
+        messages += parser.create_utilts_errs()
+    return messages
+
+"""
+Scope of the cached acknowledgements, the options changing what is sent
+"""
+def cache_scope(options) -> str:
+    return json.dumps([options.our_ediel, options.our_city, bool(options.utilts_err)])
+
+"""
+Response mails to a mail. With a cache an interchange that was answered
+before with the same options, by digest or by sender and control
+reference, gets the same acknowledgements again without being parsed.
+A hit does not renew the cached acknowledgements, they expire by the
+time they were generated.
+A mail without an EDI attachment is parsed as without a cache.
+"""
+def responses(payload, options, cache=None) -> list:
+    mail = None if cache is None else mail_from_payload(payload)
+    edi = None if mail is None else attachment_from_mail(mail)
+    if not isinstance(edi, bytes):
+        parser = EDIParser(payload, 'mail', options.our_ediel, options.our_city)
+        return [parser.toMail(message) for message in response_messages(parser, options)]
+
+    scope = cache_scope(options)
+    key = content_key(edi, scope)
+    acks = cache.get(key)
+    if acks is None:
+        header_key = interchange_key(scan_header(edi), scope)
+        acks = None if header_key is None else cache.get(header_key)
+        if acks is None:
+            parser = EDIParser(edi, 'edi', options.our_ediel, options.our_city)
+            acks = [(unb_of(message).toEdi(), parser.toEdi(message)) for message in response_messages(parser, options)]
+            cache.put([k for k in (key, header_key) if k is not None], acks)
+        else: # the same interchange in other bytes, cached as old as the first answer
+            cache.alias(key, header_key)
+    return [response_mail(mail, subject, file_content) for subject, file_content in acks]
+
+def unb_of(message):
+    return next(segment for segment in message if segment.tag == 'UNB')
+
+"""
+Answer the mails matching the search query. New mails are fetched in
+batches and queued in the outbox with their responses, then the due
+responses are sent over the SMTP pool and the mails with all responses
+sent are flagged together. A mail that can not be parsed is reported
+and counted in failures, it is tried again by the next polls until it
+failed MAX_PARSE_ATTEMPTS times, a failed send is retried from the
+outbox. With a checkpoint only mails that arrived since the last poll
+are searched, with again also older ones matching options.again_query,
+and the checkpoint moves on once they are queued, but not past a mail
+that is still tried again. Lost IMAP connections are raised to the caller.
+"""
+def poll(com, outbox, options, failures: Counter, log=sys.stderr, checkpoint=None, cache=None, again=True) -> tuple:
+    if checkpoint is None:
+        mail_ids = com.format_mail_ids(com.imap_search_query(options.search_query))
+    else:
+        saved = checkpoint.get(com.mailbox)
+        mail_ids, mark = com.search_new(options.search_query, checkpoint, options.again_query if again else None)
+    failed = []
+    for mail_id, payload in com.fetch_mails(outbox.unknown([i for i in mail_ids if failures[i] < MAX_PARSE_ATTEMPTS])):
+        try:
+            outbox.add(mail_id, responses(payload, options, cache))
+            failures.pop(mail_id, None)
+        except Exception:
+            failures[mail_id] += 1
+            failed.append(mail_id)
+            print('mail {}, attempt {}: {}'.format(mail_id, failures[mail_id], traceback.format_exc()), file=log)
+            if failures[mail_id] == MAX_PARSE_ATTEMPTS:
+                print('mail {} failed {} times, it is not tried again'.format(mail_id, MAX_PARSE_ATTEMPTS), file=log)
+    if checkpoint is not None:
+        last_uid = 0 if saved is None or saved[0] != mark[0] else saved[1]
+        # mails tried again are searched again from the checkpoint, old ones match again_query
+        held = [int(mail_id) - 1 for mail_id in mail_ids
+                if 0 < failures[mail_id] < MAX_PARSE_ATTEMPTS and int(mail_id) > last_uid]
+        checkpoint.save(com.mailbox, mark[0], min([mark[1]] + held))
+
+    delivered = outbox.clock()
+    sent, lost = outbox.deliver(com.pool.send_many, com.append_sent)
+    for mail_id, error in outbox.failed(delivered):
+        print('mail {} is not answered, a response failed for good: {}'.format(mail_id, error), file=log)
+    answered = outbox.flag(partial(store_answered, com))
+    return answered, failed
+
+def store_answered(com, mail_ids: list):
+    com.store_flags(mail_ids, *ANSWERED)
+    com.store_flags(mail_ids, *UNFLAGGED)
+
+"""
+(id, responses, traceback) of the mails of a fetch of an
+AsyncEDICommunicator, each mail is parsed as soon as its body arrives
+while the FETCH commands for the next ones are on the way. The caller
+closes the fetch, `async with com.fetch(ids) as mails:`.
+"""
+async def stream_responses(mails, options, cache=None):
+    async for mail_id, payload in mails:
+        try:
+            result = mail_id, responses(payload, options, cache), None
+        except Exception:
+            result = mail_id, None, traceback.format_exc()
+        yield result
+
+"""
+Poll the mailbox every options.interval seconds with one communicator,
+its IMAP and SMTP sessions are kept between polls and opened again when
+the server drops them. Without an outbox the responses are queued in
+memory, a checkpoint saved to disk needs an outbox on disk so queued
+responses are not lost with the process. Mails flagged again below a
+checkpoint are searched every options.again_interval seconds. Answered
+mails older than options.outbox_days are pruned from the outbox after
+every poll.
+"""
+def serve(com, options, outbox=None, log=sys.stderr, checkpoint=None, cache=None):
+    outbox = Outbox() if outbox is None else outbox
+    failures = Counter()
+    searched_again = None
+    while True:
+        try:
+            com.ensure_imap()
+            now = time.monotonic()
+            again = searched_again is None or now - searched_again >= options.again_interval
+            answered, failed = poll(com, outbox, options, failures, log, checkpoint, cache, again)
+            if again:
+                searched_again = now
+            if len(answered) + len(failed) > 0:
+                print('answered {}, failed {}'.format(','.join(answered) or '-', ','.join(failed) or '-'), file=log)
+            outbox.prune(options.outbox_days * 86400)
+        except CONNECTION_ERRORS:
+            print('connection lost: {}'.format(traceback.format_exc()), file=log)
+            com.close()
+        if options.once:
+            return
+        time.sleep(options.interval)
@@ -0,0 +1,156 @@
+import gc
+import os
+import re
+import marshal
+import multiprocessing
+
+from ediel_parser.lib.EDITokenizer import EDITokenizer, ServiceCharacters, LINE_TERMINATORS
+from ediel_parser.lib.SegmentIndex import SegmentIndex, TRANSACTION_TAG, tag_positions
+from ediel_parser.lib.EDIStream import load_segment
+from ediel_parser.lib.LazySegments import LazySegments
+from ediel_parser.lib.CompiledSegment import CompiledSegment, registry
+from ediel_parser.lib.Segment import Segment
+
+CHUNKS_PER_WORKER = 4
+MIN_TRANSACTIONS_PER_CHUNK = 64 # smaller payloads are not worth sending to workers
+
+class LoadedSegments(LazySegments):
+    """
+    Children of a parallel parse, the tags and values of the segments as
+    the workers loaded them. A segment is built from its values the first
+    time it is accessed, a placeholder of an unknown tag from its tag.
+    """
+    def __init__(self, tags: list, items: list):
+        self.tags = tags
+        self.raws = items
+        self.segments = [None] * len(tags)
+
+    def materialize(self, i: int):
+        values = self.raws[i]
+        tag = self.tags[i]
+        segment = Segment(tag=tag) if values is None else CompiledSegment(registry[tag], values)
+        self.segments[i] = segment
+        self.raws[i] = None
+        return segment
+
+"""
+Service characters of a payload, from its UNA segment
+"""
+def service_characters(payload, encoding='utf-8') -> ServiceCharacters:
+    head = payload[:9]
+    if type(head) is not str:
+        head = str(bytes(head), encoding)
+    return ServiceCharacters(head[3:]) if head[:3] == 'UNA' else ServiceCharacters()
+
+"""
+Offsets of the IDE segments of a payload, found by searching its text
+for a segment terminator followed by an IDE tag instead of splitting it
+into segments. A released terminator does not end a segment.
+"""
+def transaction_offsets(payload, characters: ServiceCharacters, encoding='utf-8') -> list:
+    pattern = '{}[{}]*({})'.format(re.escape(characters.segment_terminator), re.escape(LINE_TERMINATORS),
+                                   re.escape(TRANSACTION_TAG + characters.data_separator))
+    release = characters.release_character
+    if type(payload) is not str:
+        pattern = pattern.encode(encoding)
+        release = release.encode(encoding)[0]
+    offsets = []
+    for match in re.finditer(pattern, payload):
+        end = match.start()
+        released = 0
+        while end > released and payload[end - released - 1] == release:
+            released += 1
+        if released % 2 == 0:
+            offsets.append(match.start(1))
+    return offsets
+
+"""
+Text of a payload cut before IDE segments into at most n_chunks chunks
+of whole transactions, the segments before the first transaction are a
+chunk of their own
+"""
+def transaction_chunks(payload, characters: ServiceCharacters, n_chunks: int, encoding='utf-8') -> list:
+    offsets = transaction_offsets(payload, characters, encoding)
+    if len(offsets) == 0:
+        return [payload]
+    size = max(MIN_TRANSACTIONS_PER_CHUNK, -(-len(offsets) // n_chunks))
+    chunks = [payload[:offsets[0]]]
+    for k in range(0, len(offsets), size):
+        end = offsets[k + size] if k + size < len(offsets) else len(payload)
+        chunks.append(payload[offsets[k]:end])
+    return chunks
+
+"""
+Tags of the segments of a chunk, their values, None for placeholders of
+unknown tags, and the positions of every tag in the chunk
+"""
+def load(advice: str, encoding: str, text) -> tuple:
+    tokenizer = EDITokenizer(text, encoding=encoding)
+    tokenizer.characters = ServiceCharacters(advice)
+    segments = list(map(load_segment, tokenizer))
+    tags = [s.tag for s in segments]
+    return tags, [s.values if isinstance(s, CompiledSegment) else None for s in segments], tag_positions(tags)
+
+"""
+Worker: load one chunk, sent back marshalled, which the main process
+reads back a lot faster than pickled segments
+"""
+def load_chunk(job) -> bytes:
+    return marshal.dumps(load(*job))
+
+"""
+Children and index out of the marshalled chunks, in order
+"""
+def join(results) -> tuple:
+    tags, items, parts = [], [], []
+    enabled = gc.isenabled()
+    gc.disable() # the values are acyclic lists, collecting while they are read back only costs time
+    try:
+        for data in results:
+            chunk_tags, chunk_items, positions = marshal.loads(data)
+            tags += chunk_tags
+            items += chunk_items
+            parts.append((len(chunk_tags), positions))
+        children = LoadedSegments(tags, items)
+        return children, SegmentIndex.joined(children, parts)
+    finally:
+        if enabled:
+            gc.enable()
+
+"""
+Children of a payload loaded by worker processes, and their index. The
+main process only searches the payload for IDE segments, reads back the
+chunks and joins their tag positions into the index, segments are built
+from their values when they are accessed (LoadedSegments).
+
+workers is the number of processes, of a pool for this parse only, or
+of the running multiprocessing pool given as pool. A payload of too few
+transactions for two chunks, or a pool of one process, is parsed in the
+main process instead.
+
+Validation is not parallel: FunctionalErrors carries the resolution, the
+time zone offset and the last meter readings from one transaction to the
+next, and an APERAK or UTILTS-ERR is built from all messages in order.
+"""
+def parse(payload, workers: int, encoding='utf-8', pool=None) -> tuple:
+    if hasattr(payload, 'read'):
+        payload = payload.read()
+    if type(payload) is memoryview:
+        payload = payload.cast('B') if payload.format != 'B' else payload
+    characters = service_characters(payload, encoding)
+    processes = workers if pool is not None else min(workers, os.cpu_count() or 1)
+    chunks = transaction_chunks(payload, characters, processes * CHUNKS_PER_WORKER, encoding) if processes > 1 else [payload]
+
+    if len(chunks) <= 2: # header and at most one chunk of transactions
+        segments = list(map(load_segment, EDITokenizer(payload, encoding=encoding)))
+        return segments, None
+
+    jobs = [(characters.advice, encoding, bytes(chunk) if type(chunk) is memoryview else chunk) for chunk in chunks]
+    own_pool = pool is None
+    pool = multiprocessing.Pool(processes) if own_pool else pool
+    try:
+        return join(pool.imap(load_chunk, jobs))
+    finally:
+        if own_pool:
+            pool.close()
+            pool.join()
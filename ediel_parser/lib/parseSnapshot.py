@@ -0,0 +1,66 @@
+import gc
+import os
+import marshal
+from hashlib import md5
+
+from ediel_parser.lib.Segment import Segment
+from ediel_parser.lib.UNSegment import schemas
+from ediel_parser.lib.CompiledSegment import CompiledSegment
+
+FORMAT_VERSION = 1
+MAGIC = b'EDISNAP'
+SUFFIX = '.snap'
+
+def layout(schema) -> tuple:
+    return (schema.id, schema.tag, schema.ref, schema.length, schema.min, schema.max, schema.mandatory,
+            schema.group, schema.slot, tuple(layout(child) for child in schema.children))
+
+"""
+Digest of the compiled segment definitions, a snapshot written with
+other definitions is not read back
+"""
+def fingerprint(schemas: dict) -> str:
+    definitions = sorted((tag, layout(schema), schema.defaults) for tag, schema in schemas.items())
+    return md5(repr((FORMAT_VERSION, definitions)).encode('utf-8')).hexdigest()
+
+HEADER = MAGIC + fingerprint(schemas).encode('ascii')
+
+"""
+Snapshot file of a payload in a cache directory, by the payload digest
+"""
+def snapshot_path(directory: str, digest: str, format: str, encoding: str) -> str:
+    return os.path.join(directory, '{}.{}.{}{}'.format(digest, format, encoding, SUFFIX))
+
+"""
+Segments of a snapshot, None when there is none or it was written for
+other segment definitions. Segments are stored as their tags and lists
+of values (marshal), placeholders of unknown tags as their tag only.
+"""
+def read(path: str):
+    try:
+        with open(path, 'rb') as fh:
+            if fh.read(len(HEADER)) != HEADER:
+                return None
+            data = fh.read() # marshal.load on the file is a lot slower
+    except FileNotFoundError:
+        return None
+    enabled = gc.isenabled()
+    gc.disable() # the values are acyclic lists, collecting while they are built only costs time
+    try:
+        tags, items = marshal.loads(data)
+        get = schemas.get
+        return [Segment(tag=tag) if values is None else CompiledSegment(get(tag), values) for tag, values in zip(tags, items)]
+    except (EOFError, ValueError, TypeError):
+        return None # truncated or corrupt, parsed and written again
+    finally:
+        if enabled:
+            gc.enable()
+
+def write(path: str, segments: list):
+    tags = [segment.tag for segment in segments]
+    items = [segment.values if isinstance(segment, CompiledSegment) else None for segment in segments]
+    temporary = '{}.{}.tmp'.format(path, os.getpid())
+    with open(temporary, 'wb') as fh:
+        fh.write(HEADER)
+        marshal.dump((tags, items), fh)
+    os.replace(temporary, path) # readers see the old snapshot or the new one, never half of one
@@ -0,0 +1,218 @@
+import calendar
+from array import array
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from typing import NamedTuple
+
+from ediel_parser.lib.UNSegment import schemas, resolve
+from ediel_parser.lib.SegmentIndex import SegmentIndex
+
+try:
+    import numpy
+except ImportError: # optional, only needed for to_numpy and save_npz
+    numpy = None
+
+"""
+Position of a simple element in the values of the segments of a tag,
+the values are read directly instead of through CompiledSegment.get
+"""
+def slot(tag: str, path: tuple) -> int:
+    schema = schemas[tag]
+    for position in resolve(tag, path):
+        schema = schema.children[position]
+    return schema.slot
+
+IDE_NUMBER = slot('IDE', ('identification_number', 'identity_number'))
+LOC_QUALIFIER = slot('LOC', ('place-location_qualifier',))
+LOC_IDENTIFICATION = slot('LOC', ('location_identification', 'place-location_identification'))
+SEQ_NUMBER = slot('SEQ', ('sequence_information', 'sequence_number'))
+DTM_QUALIFIER = slot('DTM', ('date-time-period', 'date-time-period_qualifier'))
+DTM_PERIOD = slot('DTM', ('date-time-period', 'date-time-period'))
+QTY_QUALIFIER = slot('QTY', ('quantity_details', 'quantity_qualifier'))
+QTY_QUANTITY = slot('QTY', ('quantity_details', 'quantity'))
+
+METERING_POINT = '172'
+INTERVAL = '136' # metered quantity of an interval of the resolution
+READING = '220' # meter reading, at the DTM+597 of its SEQ
+UTC_OFFSET = '+0000' # without DTM+735
+MISSING = -2 ** 63 # NULL quantities and unknown timestamps, NaT as datetime64
+STEPS = {'QUARTER_HOURLY': 900, 'HOURLY': 3600, 'DAILY': 86400} # seconds, MONTHLY steps a calendar month
+
+VALUE_FIELDS = [('timestamp', 'datetime64[s]'), ('quantity', 'i8'), ('qualifier', 'i2'), ('seq', 'i4')]
+
+def need_numpy():
+    if numpy is None:
+        raise ImportError('numpy is needed for NumPy arrays of the metering values, pip install numpy')
+
+"""
+Quantity in milli-units as in FunctionalErrors, rounded instead of
+truncated, MISSING for NULL
+"""
+def milli(quantity: str) -> int:
+    if quantity is None or quantity == 'NULL':
+        return MISSING
+    return round(float(quantity) * 1_000)
+
+"""
+Seconds east of UTC of a DTM+735 offset, e.g. '+0100'
+"""
+def utc_offset(offset: str) -> int:
+    seconds = int(offset[1:3]) * 3600 + int(offset[3:5]) * 60
+    return -seconds if offset[0] == '-' else seconds
+
+"""
+Seconds since the epoch of a CCYYMMDDHHMM moment, months added to it
+in calendar months. Same moments as EDIParser.to_datetime without
+strptime, which costs more than the values of a small transaction.
+"""
+@lru_cache(maxsize=4096) # the same periods come in every transaction
+def epoch(moment: str, offset: str, months=0) -> int:
+    month = int(moment[4:6]) - 1 + months
+    fields = (int(moment[:4]) + month // 12, month % 12 + 1, int(moment[6:8]), int(moment[8:10]), int(moment[10:12]), 0)
+    return calendar.timegm(fields) - utc_offset(offset)
+
+class Series(NamedTuple):
+    """
+    Metering values of one IDE transaction in arrays of the same length:
+    timestamps in seconds since the epoch, quantities in milli-units,
+    QTY qualifiers and the SEQ number of every value. Interval values
+    (QTY+136) are stamped with the start of their interval, readings
+    (QTY+220) with the DTM+597 of their SEQ.
+    """
+    transaction: str
+    metering_point: str
+    start: int
+    end: int
+    resolution: str
+    timestamps: array
+    quantities: array
+    qualifiers: array
+    seqs: array
+
+    """
+    Structured NumPy array of the values, fields timestamp, quantity,
+    qualifier and seq, e.g. for numpy.save
+    """
+    def to_numpy(self):
+        need_numpy()
+        values = numpy.empty(len(self.quantities), dtype=VALUE_FIELDS)
+        values['timestamp'] = numpy.frombuffer(self.timestamps, dtype='i8').view('datetime64[s]')
+        values['quantity'] = numpy.frombuffer(self.quantities, dtype='i8')
+        values['qualifier'] = numpy.frombuffer(self.qualifiers, dtype='i2')
+        values['seq'] = numpy.frombuffer(self.seqs, dtype='i4')
+        return values
+
+"""
+Timestamps of the values of a transaction: the interval values in a row
+from the start of the period, the readings at the first DTM+597 after
+them in their SEQ
+"""
+def stamp(transaction, qualifiers: list, positions: list, period: str, resolution: str, offset: str) -> array:
+    intervals = [i for i, qualifier in enumerate(qualifiers) if qualifier == INTERVAL]
+    stamps = ()
+    if period is not None and resolution is not None:
+        step = STEPS.get(resolution)
+        if step is None:
+            stamps = [epoch(period, offset, k) for k in range(len(intervals))]
+        else:
+            first = epoch(period, offset)
+            stamps = range(first, first + len(intervals) * step, step)
+    if len(stamps) == len(qualifiers):
+        return array('q', stamps) # interval values only, the common case
+    timestamps = array('q', [MISSING]) * len(qualifiers)
+    for i, timestamp in zip(intervals, stamps):
+        timestamps[i] = timestamp
+    if READING not in qualifiers:
+        return timestamps
+
+    loaded = transaction.index.segments
+    seqs = transaction.positions('SEQ')
+    moments = [p for p in transaction.positions('DTM') if loaded[p].values[DTM_QUALIFIER] == '597']
+    for i, qualifier in enumerate(qualifiers):
+        if qualifier != READING:
+            continue
+        position = positions[i]
+        k = bisect_right(seqs, position)
+        seq_end = seqs[k] if k < len(seqs) else transaction.end
+        k = bisect_right(moments, position)
+        if k < len(moments) and moments[k] < seq_end:
+            timestamps[i] = epoch(loaded[moments[k]].values[DTM_PERIOD], offset)
+    return timestamps
+
+def transaction_series(transaction, parser, offset: str) -> Series:
+    loaded = transaction.index.segments
+    metering_point = None
+    for p in transaction.positions('LOC'):
+        values = loaded[p].values
+        if values[LOC_QUALIFIER] == METERING_POINT:
+            metering_point = values[LOC_IDENTIFICATION]
+            break
+    period = resolution = None
+    for p in transaction.positions('DTM'):
+        values = loaded[p].values
+        qualifier = values[DTM_QUALIFIER]
+        if qualifier == '324':
+            period = values[DTM_PERIOD]
+        elif qualifier == '354':
+            resolution = parser.get_resolution(loaded[p])
+        if period is not None and resolution is not None:
+            break # the DTM+597 of the SEQs follow
+
+    positions = transaction.positions('QTY')
+    quantities = [loaded[p].values for p in positions]
+    qualifiers = [values[QTY_QUALIFIER] for values in quantities]
+    seqs = transaction.positions('SEQ')
+    numbers = [0] + [int(loaded[p].values[SEQ_NUMBER] or 0) for p in seqs] # 0 before the first SEQ
+    return Series(
+        loaded[transaction.start].values[IDE_NUMBER],
+        metering_point,
+        MISSING if period is None else epoch(period[:12], offset),
+        MISSING if period is None else epoch(period[12:], offset),
+        resolution,
+        stamp(transaction, qualifiers, positions, period, resolution, offset),
+        array('q', [milli(values[QTY_QUANTITY]) for values in quantities]),
+        array('h', [int(qualifier) for qualifier in qualifiers]),
+        array('i', [numbers[bisect_right(seqs, p)] for p in positions]),
+    )
+
+"""
+Metering values of every IDE transaction, each value column built in
+one pass over the positions of its tag in the segment index. Resolutions
+are read with the parser as in the validation, moments in the UTC
+offset of the DTM+735 of the message.
+"""
+def extract(segments, parser) -> list:
+    index = SegmentIndex.of(segments)
+    loaded = index.segments
+    dtms = index.positions('DTM')
+    offset = UTC_OFFSET
+    header_start = 0
+    result = []
+    for transaction in index.transactions:
+        for p in dtms[bisect_left(dtms, header_start):bisect_left(dtms, transaction.start)]:
+            values = loaded[p].values
+            if values[DTM_QUALIFIER] == '735':
+                offset = values[DTM_PERIOD] or UTC_OFFSET
+        header_start = transaction.end
+        result.append(transaction_series(transaction, parser, offset))
+    return result
+
+"""
+Write the series to one .npz file: transaction, metering_point and
+resolution per series, and the values of all series in one structured
+array, those of series i at values[offsets[i]:offsets[i + 1]]
+"""
+def save_npz(path, series: list):
+    need_numpy()
+    lengths = [len(s.quantities) for s in series]
+    offsets = numpy.zeros(len(series) + 1, dtype='i8')
+    numpy.cumsum(lengths, out=offsets[1:])
+    values = numpy.concatenate([s.to_numpy() for s in series]) if series else numpy.empty(0, dtype=VALUE_FIELDS)
+    numpy.savez_compressed(
+        path,
+        transaction=numpy.array([s.transaction or '' for s in series], dtype=str),
+        metering_point=numpy.array([s.metering_point or '' for s in series], dtype=str),
+        resolution=numpy.array([s.resolution or '' for s in series], dtype=str),
+        offsets=offsets,
+        values=values,
+    )
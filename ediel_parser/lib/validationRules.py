@@ -0,0 +1,252 @@
+from abc import ABC, abstractmethod
+from copy import copy
+from itertools import chain
+from math import isclose
+
+from ediel_parser.lib.UNSegment import resolve
+from ediel_parser.lib.SegmentIndex import SegmentIndex
+
+DTM_QUALIFIER = resolve('DTM', ('date-time-period', 'date-time-period_qualifier'))
+DTM_PERIOD = resolve('DTM', ('date-time-period', 'date-time-period'))
+RFF_QUALIFIER = resolve('RFF', ('reference', 'reference_qualifier'))
+STS_EVENT = resolve('STS', ('status_event', 'status_event-coded'))
+QTY_QUALIFIER = resolve('QTY', ('quantity_details', 'quantity_qualifier'))
+QTY_QUANTITY = resolve('QTY', ('quantity_details', 'quantity'))
+
+class Rule(ABC):
+    """
+    Declaration of a check over the segments of a message. A RuleSet
+    starts a copy of every rule per pass and feeds it, in message order,
+    only the segments with one of the rule's tags.
+    """
+    name = None
+    code = None # incorrect field code used when the rule fails
+    tags = ()
+
+    def start(self, parser):
+        rule = copy(self)
+        rule.parser = parser
+        rule.done = False
+        rule.reset()
+        return rule
+
+    def reset(self):
+        pass
+
+    def feed(self, segment):
+        pass
+
+    """
+    Outcome of the pass, read by Verdict: whether the check passed, or
+    the functional error codes of a rule without code
+    """
+    @abstractmethod
+    def result(self):
+        pass
+
+class QualifierBefore(Rule):
+    """
+    A segment with the qualifier has to come before the first segment
+    tagged with `before`
+    """
+    def __init__(self, name, code, tag, path, qualifier, before):
+        self.name = name
+        self.code = code
+        self.tag = tag
+        self.path = path
+        self.qualifier = qualifier
+        self.before = before
+        self.tags = (tag, before)
+
+    def reset(self):
+        self.seen = False
+
+    def feed(self, segment):
+        if segment.tag == self.before:
+            self.done = True
+        elif segment.get(self.path) == self.qualifier:
+            self.seen = True
+            self.done = True
+
+    def result(self):
+        return self.seen
+
+class QualifierRequired(Rule):
+    """
+    If there are any segments of the tag, one of them has to carry the qualifier
+    """
+    def __init__(self, name, code, tag, path, qualifier):
+        self.name = name
+        self.code = code
+        self.path = path
+        self.qualifier = qualifier
+        self.tags = (tag,)
+
+    def reset(self):
+        self.seen_tag = False
+        self.seen = False
+
+    def feed(self, segment):
+        self.seen_tag = True
+        if segment.get(self.path) == self.qualifier:
+            self.seen = True
+            self.done = True
+
+    def result(self):
+        return self.seen or not self.seen_tag
+
+class FunctionalErrors(Rule):
+    """
+    Metering values of every IDE transaction, checked when the next
+    transaction starts:
+    E50 number of QTY+136 does not match the DTM+324 period and DTM+354 resolution
+    E19 QTY+136 does not add up to the difference of the QTY+220 readings
+    E90 STS+46 after QTY+136
+    E98 negative QTY+136
+    """
+    name = 'functional_errors'
+    tags = ('IDE', 'STS', 'DTM', 'QTY')
+
+    def reset(self):
+        self.last_qty_220 = None
+        self.last_qty_diff = None
+        self.num_qty_136 = 0
+        self.qty_136 = 0
+        self.error = []
+        self.ediel_tz_offset = None
+        self.resolution = None
+        self.start_time = None
+        self.end_time = None
+        self.i = 0
+
+    def feed(self, s):
+        tag = s.tag
+        if tag == 'IDE':
+            self.i += 1
+            if(self.num_qty_136 and not self.parser.check_num_qty(self.resolution, self.num_qty_136, self.start_time, self.end_time)):
+                self.add_error('E50')
+            elif(not self.last_qty_diff or not self.last_qty_220 or isclose(self.last_qty_diff, self.qty_136, abs_tol=10)):
+                self.last_qty_220 = None
+                self.last_qty_diff = None
+                self.qty_136 = 0
+            else:
+                self.add_error('E19')
+
+            self.num_qty_136 = 0
+        elif tag == 'STS':
+            if s.get(STS_EVENT) == '46' and self.num_qty_136 > 0:
+                self.add_error('E90')
+        elif tag == 'DTM':
+            qualifier = s.get(DTM_QUALIFIER)
+            if qualifier == '354':
+                self.resolution = self.parser.get_resolution(s)
+            elif qualifier == '735':
+                self.ediel_tz_offset = s.get(DTM_PERIOD)
+            elif qualifier == '324':
+                period = s.get(DTM_PERIOD)
+                self.start_time = self.parser.to_datetime(period[:12], self.ediel_tz_offset)
+                self.end_time = self.parser.to_datetime(period[12:], self.ediel_tz_offset)
+        elif tag == 'QTY':
+            qualifier = s.get(QTY_QUALIFIER)
+            quantity = s.get(QTY_QUANTITY)
+            if qualifier == '220':
+                if self.last_qty_220:
+                    # this should not be null if it is, ignore it
+                    if quantity != 'NULL':
+                        self.last_qty_diff = int(float(quantity) * 1_000) - self.last_qty_220
+                        self.last_qty_220 = None
+                else:
+                    self.last_qty_220 = int(float(quantity) * 1_000)
+            elif qualifier == '136':
+                if float(quantity) >= 0:
+                    self.qty_136 += int(float(quantity) * 1_000)
+                    self.num_qty_136 += 1
+                else:
+                    self.last_qty_220 = None
+                    self.last_qty_diff = None
+                    self.qty_136 = 0
+                    self.num_qty_136 += 1
+                    self.add_error('E98')
+
+    # at most one error per transaction seen so far
+    def add_error(self, code):
+        if len(self.error) < self.i: self.error.append(code)
+
+    def result(self):
+        return self.error
+
+class Verdict():
+    """
+    Results of one pass of a RuleSet, by rule name
+    """
+    def __init__(self, rules: list, results: dict):
+        self.rules = rules
+        self.results = results
+
+    def __getitem__(self, name):
+        return self.results[name]
+
+    @property
+    def valid(self) -> bool:
+        return self.incorrect_field is None
+
+    """
+    Code of the first failing check, in declaration order
+    """
+    @property
+    def incorrect_field(self):
+        for rule in self.rules:
+            if rule.code is not None and self.results[rule.name] is False:
+                return rule.code
+        return None
+
+    """
+    Functional error codes of the rules that report them
+    """
+    @property
+    def errors(self) -> list:
+        errors = []
+        for rule in self.rules:
+            if rule.code is None:
+                errors += self.results[rule.name]
+        return errors
+
+class RuleSet():
+    """
+    Runs all rules in a single pass over the segments
+    """
+    def __init__(self, *rules):
+        self.rules = list(rules)
+
+    def __add__(self, other):
+        return RuleSet(*self.rules, *other.rules)
+
+    def run(self, segments, parser=None) -> Verdict:
+        rules = [rule.start(parser) for rule in self.rules]
+        dispatch = {}
+        for rule in rules:
+            for tag in rule.tags:
+                dispatch.setdefault(tag, []).append(rule)
+
+        index = getattr(segments, 'index', None)
+        if isinstance(index, SegmentIndex):
+            # only the segments the rules subscribe to, lazily loaded ones are left alone
+            positions = sorted(chain.from_iterable(index.positions(tag) for tag in dispatch))
+            loaded = index.segments
+            segments = (loaded[i] for i in positions)
+
+        for segment in segments:
+            subscribers = dispatch.get(segment.tag)
+            if subscribers is not None:
+                for rule in subscribers:
+                    if not rule.done:
+                        rule.feed(segment)
+
+        return Verdict(rules, {rule.name: rule.result() for rule in rules})
+
+REF_QUALIFIER = QualifierBefore('ref_qualifier', '512', 'DTM', DTM_QUALIFIER, '137', before='SEQ')
+REG_TIME = QualifierBefore('reg_time', '512', 'DTM', DTM_QUALIFIER, '597', before='SEQ')
+REG_MOMENT = QualifierRequired('reg_moment', '224', 'RFF', RFF_QUALIFIER, 'MG')
+FUNCTIONAL_ERRORS = FunctionalErrors()
+
+APERAK_RULES = RuleSet(REF_QUALIFIER, REG_TIME, REG_MOMENT, FUNCTIONAL_ERRORS)
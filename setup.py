@@ -28,5 +28,6 @@ setup(
     ],
     keywords='ediel energy parser consumption svk sunlabs edifact',
     packages=find_packages(),
-    install_requires=[]
+    install_requires=[],
+    extras_require={'numpy': ['numpy']}
 )
\ No newline at end of file
@@ -0,0 +1,145 @@
+import re
+import bisect
+import asyncio
+import threading
+from contextlib import contextmanager
+
+COMMAND = re.compile(rb'^(\S+) (?:(UID) )?(\S+)(?: (.*))?\r\n$', re.IGNORECASE)
+
+
+def parse_set(value, ids):
+    selected = set()
+    top = ids[-1] if len(ids) > 0 else 0
+    for part in value.split(','):
+        first, _, last = part.partition(':')
+        low = top if first == '*' else int(first)
+        high = low if last == '' else (top if last == '*' else int(last))
+        low, high = min(low, high), max(low, high)
+        selected.update(ids[bisect.bisect_left(ids, low):bisect.bisect_right(ids, high)])
+    return sorted(selected)
+
+
+class FakeIMAPServer:
+    """
+    Mailbox on localhost speaking enough IMAP for the communicators:
+    LOGIN, SELECT, STATUS, SEARCH, FETCH and STORE with or without UID.
+    SEARCH understands a leading UID set, NOT ANSWERED and a leading FLAGGED, and checks
+    every mail in its range like a server evaluating a query. Every
+    answer is delayed by latency seconds, commands sent before the
+    previous ones are answered overlap like on a real connection.
+    """
+
+    def __init__(self, mails, latency=0.0):
+        self.uids = list(range(1, len(mails) + 1))
+        self.mails = dict(zip(self.uids, mails))
+        self.flags = {uid: set() for uid in self.uids}
+        self.uidvalidity = 1
+        self.latency = latency
+        self.commands = []
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    def deliver(self, mail):
+        uid = self.uids[-1] + 1 if len(self.uids) > 0 else 1
+        self.uids.append(uid)
+        self.mails[uid] = mail
+        self.flags[uid] = set()
+        return uid
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        writer.write(b'* OK fake imap ready\r\n')
+        previous = None
+        while True:
+            line = await reader.readline()
+            if line == b'':
+                break
+            self.commands.append(line)
+            previous = asyncio.ensure_future(self.answer(line, writer, previous))
+            if line.split()[1:2] == [b'LOGOUT']:
+                await previous
+                break
+        writer.close()
+
+    async def answer(self, line, writer, previous):
+        await asyncio.sleep(self.latency)
+        if previous is not None:
+            await previous
+        writer.write(self.respond(line))
+        await writer.drain()
+
+    def respond(self, line):
+        tag, uid, command, args = COMMAND.match(line).groups()
+        command, args = command.upper().decode(), (args or b'').decode()
+        out = b''
+        seq = lambda u: bisect.bisect_left(self.uids, u) + 1
+        if command == 'SEARCH':
+            candidates = self.uids
+            criteria = args.split(' ', 2)
+            query = args
+            if criteria[0].upper() == 'UID':
+                candidates = parse_set(criteria[1], self.uids)
+                query = criteria[2] if len(criteria) > 2 else ''
+            if 'NOT ANSWERED' in args.upper():
+                candidates = [u for u in candidates if '\\Answered' not in self.flags[u]]
+            if query.lstrip('(').upper().startswith('FLAGGED'):
+                candidates = [u for u in candidates if '\\Flagged' in self.flags[u]]
+            found = candidates if uid else [seq(u) for u in candidates]
+            out += b'* SEARCH' + b''.join(b' %d' % i for i in found) + b'\r\n'
+        elif command == 'STATUS':
+            uidnext = self.uids[-1] + 1 if len(self.uids) > 0 else 1
+            out += b'* STATUS INBOX (UIDVALIDITY %d UIDNEXT %d)\r\n' % (self.uidvalidity, uidnext)
+        elif command == 'FETCH':
+            id_set, items = args.split(' ', 1)
+            for u in self.selected(id_set, uid):
+                body = self.mails[u]
+                if 'PEEK' not in items:
+                    self.flags[u].add('\\Seen')
+                out += b'* %d FETCH (UID %d BODY[] {%d}\r\n' % (seq(u), u, len(body)) + body + b')\r\n'
+        elif command == 'STORE':
+            id_set, action, flags = args.split(' ', 2)
+            for u in self.selected(id_set, uid):
+                change = set(flags.strip('()').split())
+                self.flags[u] = self.flags[u] | change if action.startswith('+') else self.flags[u] - change
+                uid_item = b'UID %d ' % u if uid else b''
+                out += b'* %d FETCH (%sFLAGS (%s))\r\n' % (seq(u), uid_item, ' '.join(sorted(self.flags[u])).encode())
+        elif command == 'CAPABILITY':
+            out += b'* CAPABILITY IMAP4rev1\r\n'
+        elif command == 'LOGOUT':
+            out += b'* BYE\r\n'
+        elif command == 'SELECT':
+            out += b'* %d EXISTS\r\n* OK [UIDVALIDITY %d]\r\n' % (len(self.uids), self.uidvalidity)
+        elif command not in ('LOGIN', 'NOOP'):
+            return tag + b' BAD unknown command\r\n'
+        return out + tag + b' OK ' + command.encode() + b' completed\r\n'
+
+    def selected(self, id_set, uid):
+        if uid:
+            return parse_set(id_set, self.uids)
+        return [self.uids[i - 1] for i in parse_set(id_set, list(range(1, len(self.uids) + 1)))]
+
+
+@contextmanager
+def serving(server):
+    """
+    Run the server on an event loop in a thread, for the blocking
+    imaplib based communicator
+    """
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result()
+    try:
+        yield server
+    finally:
+        asyncio.run_coroutine_threadsafe(server.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
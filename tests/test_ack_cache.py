@@ -0,0 +1,49 @@
+import unittest
+
+from ediel_parser.lib.AckCache import AckCache, content_key, interchange_key, EVICT_EVERY
+from ediel_parser.lib.EDIParser import scan_header
+
+EDI = b"UNA:+.? 'UNB+UNOC:3+11111:14+99999:14+200101:1200+ICR42++23-DDQ-PRODSTAT'UNZ+0+ICR42'"
+
+
+class TestAckCache(unittest.TestCase):
+
+    def test_keys(self):
+        self.assertEqual(content_key(EDI), content_key(bytes(EDI)))
+        self.assertNotEqual(content_key(EDI), content_key(EDI + b'\n'))
+        self.assertNotEqual(content_key(EDI, 'a'), content_key(EDI, 'b'))
+        self.assertEqual(interchange_key(scan_header(EDI), 'a'), 'a|unb:11111:ICR42')
+
+    def test_get_put(self):
+        cache = AckCache()
+        self.assertIsNone(cache.get('a'))
+        cache.put(['a', 'b'], [('UNB+x', 'UNA:+.? UNB+x')])
+        self.assertEqual(cache.get('a'), [('UNB+x', 'UNA:+.? UNB+x')])
+        self.assertEqual(cache.get('b'), cache.get('a'))
+        self.assertEqual(len(cache), 2)
+
+    def test_eviction(self):
+        now = [0.0]
+        cache = AckCache(max_entries=10, max_age=100, clock=lambda: now[0])
+        cache.put(['old'], [])
+        now[0] += 101
+        self.assertIsNone(cache.get('old'))
+        for i in range(EVICT_EVERY - 1):
+            now[0] += 1
+            cache.put([str(i)], [])
+        self.assertEqual(len(cache), 10)
+        self.assertIsNone(cache.get('0'))
+        self.assertEqual(cache.get(str(EVICT_EVERY - 2)), [])
+
+    def test_alias_keeps_age(self):
+        now = [0.0]
+        cache = AckCache(max_age=100, clock=lambda: now[0])
+        cache.put(['unb'], [('UNB+x', 'UNA:+.? UNB+x')])
+        now[0] += 60
+        cache.alias('md5', 'unb')
+        self.assertEqual(cache.get('md5'), cache.get('unb'))
+        now[0] += 50
+        self.assertIsNone(cache.get('md5'))
+        self.assertIsNone(cache.get('unb'))
+        cache.alias('other', 'missing')
+        self.assertEqual(len(cache), 2)
@@ -0,0 +1,76 @@
+import io
+import unittest
+import contextlib
+from types import SimpleNamespace
+
+from ediel_parser.lib.AsyncEDICommunicator import AsyncEDICommunicator, IMAPError
+import ediel_parser.lib.mailPipeline as pipeline
+from tests.imap_server import FakeIMAPServer
+from tests.utils import mail_with
+
+
+class TestAsyncCommunicator(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.mails = [b'Subject: mail %d\r\n\r\nbody {%d}\r\n' % (i, i) for i in range(1, 24)]
+        self.server = await FakeIMAPServer(self.mails).start()
+
+    async def asyncTearDown(self):
+        await self.server.stop()
+
+    def communicator(self, **args):
+        return AsyncEDICommunicator(username='user', password='pass"word', server='127.0.0.1',
+                                    port=self.server.port, use_tls=False, **args)
+
+    async def test_fetch_pipelines_batches(self):
+        async with self.communicator(window=3, batch_size=5) as com:
+            ids = await com.search('ALL')
+            self.assertEqual(ids, [str(i) for i in range(1, 24)])
+            async with com.fetch(ids) as mails:
+                fetched = [item async for item in mails]
+        self.assertEqual(fetched, list(zip(ids, self.mails)))
+        fetches = [c for c in self.server.commands if b' UID FETCH ' in c]
+        self.assertEqual(len(fetches), 5)
+        self.assertIn(b' UID FETCH 1:5 (UID BODY.PEEK[])', fetches[0])
+        self.assertIn(b'LOGIN "user" "pass\\"word"', self.server.commands[0])
+
+    async def test_sequence_numbers_and_store(self):
+        async with self.communicator(uid=False) as com:
+            async with com.fetch(['3', '1']) as mails:
+                fetched = dict([item async for item in mails])
+            self.assertEqual(fetched, {'1': self.mails[0], '3': self.mails[2]})
+            await com.store(['1', '3'], '+FLAGS', '(\\Seen \\Answered)')
+            self.assertEqual(self.server.flags[3], {'\\Seen', '\\Answered'})
+            with self.assertRaises(IMAPError):
+                await com.command('BOGUS')
+
+    async def test_stop_early_keeps_session(self):
+        async with self.communicator(window=4, batch_size=2) as com:
+            ids = await com.search('ALL')
+            async with com.fetch(ids) as mails:
+                async for mail_id, body in mails:
+                    break
+            self.assertEqual(await com.search('ALL'), ids)
+
+    async def test_unexpected_completion(self):
+        async with self.communicator(window=4, batch_size=2) as com:
+            ids = await com.search('ALL')
+            mails = com.fetch(ids)
+            async for mail_id, body in mails:
+                break
+            with self.assertRaises(IMAPError): # the answers of the fetch are not taken for those of SEARCH
+                await com.search('ALL')
+
+    async def test_stream_responses(self):
+        with open('tests/fixtures/1b.edi') as fh:
+            mail = mail_with(fh.read())
+        self.server.mails[2] = mail
+        options = SimpleNamespace(our_ediel='99999', our_city='Uzbekistan', utilts_err=False)
+        async with self.communicator(batch_size=1) as com:
+            async with com.fetch(['1', '2']) as mails:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results = [r async for r in pipeline.stream_responses(mails, options)]
+        self.assertEqual([r[0] for r in results], ['1', '2'])
+        self.assertIsNotNone(results[0][2])
+        self.assertEqual(len(results[1][1]), 1)
+        self.assertIsNone(results[1][2])
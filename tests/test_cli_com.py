@@ -0,0 +1,18 @@
+import os
+import sys
+import unittest
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestCliCom(unittest.TestCase):
+
+    def test_outbox_needs_uid(self):
+        result = subprocess.run(
+            [sys.executable, 'cli.py', 'com', '--send', '--outbox', 'outbox.sqlite', '--input-dir', '.', '--server', 'imap.invalid'],
+            cwd=os.path.join(ROOT, 'ediel_parser'), env=dict(os.environ, PYTHONPATH=ROOT), capture_output=True, text=True,
+        )
+        self.assertEqual(result.returncode, 1)
+        self.assertIn('--outbox needs --uid', result.stderr)
+        self.assertFalse(os.path.exists(os.path.join(ROOT, 'ediel_parser', 'outbox.sqlite')))
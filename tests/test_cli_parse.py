@@ -0,0 +1,67 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+from ediel_parser.lib.EDIParser import scan_header
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def cli(*args):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.run(
+        [sys.executable, 'cli.py', 'parse', *args],
+        cwd=os.path.join(ROOT, 'ediel_parser'), env=env, capture_output=True, text=True,
+    )
+
+
+class TestCliParse(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.input_dir = os.path.join(self.dir, 'in')
+        os.mkdir(self.input_dir)
+        for i in range(4):
+            shutil.copy(os.path.join(ROOT, 'tests/fixtures/1b.edi'), os.path.join(self.input_dir, '{}.edi'.format(i)))
+        with open(os.path.join(self.input_dir, 'broken.edi'), 'w') as fh:
+            fh.write('UNB+broken')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def parse(self, *args, returncode=1):
+        output_dir = tempfile.mkdtemp(dir=self.dir)
+        result = cli('--aperak', '--to', 'edi', '--our-ediel', '99999',
+                     '--input-dir', self.input_dir, '--output-dir', output_dir, *args)
+        self.assertEqual(result.returncode, returncode, result.stderr)
+        return output_dir, result
+
+    def test_jobs(self):
+        expected = ['{}.edi.edi'.format(i) for i in range(4)]
+        for args in ((), ('--jobs', '2'), ('--jobs', '2', '--chunksize', '1', '--unordered')):
+            output_dir, result = self.parse(*args)
+            self.assertEqual(sorted(os.listdir(output_dir)), expected)
+            self.assertIn('broken.edi', result.stderr)
+            self.assertIn('1 of 5 files failed', result.stderr)
+            with open(os.path.join(output_dir, '0.edi.edi')) as fh:
+                header = scan_header(fh.read().replace('\n', ''))
+            self.assertEqual((header.message_type, header.sender), ('APERAK', '99999'))
+
+    def test_exit_status(self):
+        os.remove(os.path.join(self.input_dir, 'broken.edi'))
+        output_dir, result = self.parse(returncode=0)
+        self.assertEqual(len(os.listdir(output_dir)), 4)
+
+    def test_from_json(self):
+        json_dir, result = self.parse('--to', 'json-arr', '--from', 'edi')
+        output_dir, result = self.parse('--from', 'json', '--input-dir', json_dir, returncode=0)
+        self.assertEqual(sorted(os.listdir(output_dir)), ['{}.edi.json-arr.edi'.format(i) for i in range(4)])
+        self.assertNotIn('Error', result.stderr)
+
+    def test_raw(self):
+        result = cli('--to', 'raw', '--input-dir', self.input_dir)
+        with open(os.path.join(ROOT, 'tests/fixtures/1b.edi')) as fh:
+            self.assertIn(fh.read(), result.stdout)
@@ -0,0 +1,99 @@
+import os
+import shutil
+import imaplib
+import tempfile
+import unittest
+
+from ediel_parser.lib.EDICommunicator import EDICommunicator, id_ranges, id_sets
+from ediel_parser.lib.Checkpoint import Checkpoint
+from tests.imap_server import FakeIMAPServer, serving
+
+
+class TestIdSets(unittest.TestCase):
+
+    def test_ranges(self):
+        self.assertEqual(id_ranges(['5', '1', '2', '3', '3', b'7', '8']), ['1:3', '5', '7:8'])
+        self.assertEqual(id_sets([str(i) for i in range(1, 501)] + ['502']), ['1:500,502'])
+        self.assertEqual(id_sets([]), [])
+
+    def test_sent_mail_ids(self):
+        filenames = ['7.eml.eml', '7.eml.1.eml', '8.eml.eml', '9.eml.eml', '9.eml.1.eml']
+        errors = [None, OSError('refused'), None, None, None]
+        self.assertEqual(EDICommunicator().sent_mail_ids(filenames, errors), ['8', '9'])
+
+    def test_limits(self):
+        self.assertEqual(id_sets(['1', '2', '3', '4', '5'], 2), ['1:2', '3:4', '5'])
+        sets = id_sets([str(i) for i in range(1, 2000, 2)], max_length=100)
+        self.assertTrue(all(len(s) <= 100 for s in sets))
+        self.assertEqual(sum(len(s.split(',')) for s in sets), 1000)
+
+
+class TestCommunicator(unittest.TestCase):
+
+    def setUp(self):
+        self.mails = [b'Subject: mail %d\r\n\r\nbody\r\n' % i for i in range(1, 301)]
+
+    def test_batched_fetch_and_store(self):
+        with serving(FakeIMAPServer(self.mails)) as server:
+            com = EDICommunicator()
+            com.imap = imaplib.IMAP4('127.0.0.1', server.port)
+            com.imap.login('user', 'pass')
+            com.imap.select()
+            ids = com.format_mail_ids(com.imap_search_query('ALL'))
+            fetched = list(com.fetch_mails(ids, batch_size=120))
+            self.assertEqual(fetched, list(zip(ids, self.mails)))
+            answered = [i for i in ids if i != '42']
+            stored = com.store_flags(answered, '+FLAGS', '(\\Seen \\Answered)')
+            self.assertEqual(stored, answered)
+            com.close()
+        commands = [c.split(b' ', 1)[1] for c in server.commands]
+        self.assertEqual(sum(c.startswith(b'FETCH') for c in commands), 3)
+        self.assertIn(b'STORE 1:41,43:300 +FLAGS (\\Seen \\Answered)\r\n', commands)
+        self.assertEqual(server.flags[42], set())
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'checkpoint.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def connect(self, server):
+        com = EDICommunicator(uid=True)
+        com.imap = imaplib.IMAP4('127.0.0.1', server.port)
+        com.imap.login('user', 'pass')
+        com.imap.select()
+        return com
+
+    def test_only_new_uids_are_searched(self):
+        with serving(FakeIMAPServer([b'Subject: %d\r\n\r\n' % i for i in range(5)])) as server:
+            server.flags[2].add('\\Answered')
+            com = self.connect(server)
+            checkpoint = Checkpoint(self.path)
+            found, mark = com.search_new('NOT ANSWERED', checkpoint)
+            self.assertEqual((found, mark), (['1', '3', '4', '5'], (1, 5)))
+            checkpoint.save(com.mailbox, *mark)
+
+            self.assertEqual(com.search_new('NOT ANSWERED', checkpoint), ([], (1, 5)))
+            server.deliver(b'Subject: new\r\n\r\n')
+            server.deliver(b'Subject: newer\r\n\r\n')
+            checkpoint = Checkpoint(self.path) # read back from the file
+            found, mark = com.search_new('NOT ANSWERED', checkpoint)
+            self.assertEqual((found, mark), (['6', '7'], (1, 7)))
+            self.assertIn(b'UID SEARCH UID 6:* (NOT ANSWERED)\r\n', [c.split(b' ', 1)[1] for c in server.commands])
+            self.assertEqual([uid for uid, body in com.fetch_mails(found)], ['6', '7'])
+            self.assertEqual(com.store_flags(found, '+FLAGS', '(\\Answered)'), ['6', '7'])
+            checkpoint.save(com.mailbox, *mark)
+
+            server.flags[3].add('\\Flagged') # answered again, below the checkpoint
+            found, mark = com.search_new('NOT ANSWERED', checkpoint, 'FLAGGED')
+            self.assertEqual((found, mark), (['3'], (1, 7)))
+            self.assertIn(b'UID SEARCH UID 1:7 (FLAGGED)\r\n', [c.split(b' ', 1)[1] for c in server.commands])
+
+            server.uidvalidity = 2 # mailbox recreated, search everything again
+            found, mark = com.search_new('NOT ANSWERED', checkpoint)
+            self.assertEqual((found, mark), (['1', '3', '4', '5'], (2, 7)))
+            com.close()
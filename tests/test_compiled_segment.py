@@ -0,0 +1,85 @@
+import unittest
+from copy import deepcopy
+
+from pydifact.message import Message as PMessage
+
+from ediel_parser.lib.segmentDefinitions import definitions
+from ediel_parser.lib.UNSegment import UNSegment, schemas, resolve
+
+
+class TestCompiledSegment(unittest.TestCase):
+    fixture = 'tests/fixtures/1b.edi'
+
+    def setUp(self):
+        with open(self.fixture) as fh:
+            self.segments = PMessage.from_str(fh.read()).segments
+
+    def test_same_as_definition_tree(self):
+        for segment in self.segments:
+            tree = deepcopy(definitions[segment.tag])
+            tree.load(segment.elements)
+            compiled = UNSegment(segment.tag)
+            compiled.load(segment.elements)
+            self.assertEqual(compiled.toDict(), tree.toDict())
+            self.assertEqual(compiled.toList(), tree.toList())
+            self.assertEqual(compiled.toEdi(), tree.toEdi())
+
+    def test_shared_schema(self):
+        first, second = UNSegment('QTY'), UNSegment('QTY')
+        self.assertIs(first.schema, second.schema)
+        self.assertIs(first.schema, schemas['QTY'])
+        self.assertEqual(first.values, [None, None, None])
+
+    def test_element_views(self):
+        qty = UNSegment('QTY')
+        qty.load([['220', '1486']])
+        details = qty['quantity_details']
+        self.assertEqual(details.id, 'quantity_details')
+        self.assertEqual(details['quantity'].length, (0, 15))
+        self.assertIsNone(details.value)
+        details['quantity'].value = '42'
+        self.assertEqual(qty.values, ['220', '42', None])
+        qty['quantity_details'] = ['136', '7']
+        self.assertEqual(qty.toList(), [['136', '7', None]])
+        with self.assertRaises(AttributeError):
+            details.value = '1'
+
+    def test_views_are_kept(self):
+        qty = UNSegment('QTY')
+        qty.load([['220', '1486']])
+        quantity = qty['quantity_details']['quantity']
+        self.assertIs(qty['quantity_details']['quantity'], quantity)
+        self.assertIs(qty[0], qty[0])
+        self.assertIsNot(qty[0], qty['quantity_details']) # kept per key
+        qty['quantity_details'] = ['136', '7']
+        self.assertEqual(quantity.value, '7')
+        self.assertIsNone(UNSegment('QTY').views)
+        self.assertEqual(deepcopy(qty)['quantity_details']['quantity'].value, '7')
+
+    def test_structure_is_fixed(self):
+        qty = UNSegment('QTY')
+        with self.assertRaises(AttributeError):
+            qty.add_segment(UNSegment('DTM'))
+        with self.assertRaises(AttributeError):
+            qty.children.append(UNSegment('DTM'))
+        self.assertEqual(len(qty.children), 1)
+
+    def test_lookup(self):
+        unh = UNSegment('UNH')
+        unh['r:0062'] = '1'
+        unh[1] = ['UTILTS', 'D', '02B']
+        self.assertEqual(unh['message_reference_number'].value, '1')
+        self.assertEqual(unh['r:S009']['r:0065'].value, 'UTILTS')
+        self.assertEqual(unh[1][2].value, '02B')
+        with self.assertRaises(IndexError):
+            unh['missing']
+
+    def test_resolve(self):
+        path = resolve('QTY', ('quantity_details', 'quantity'))
+        self.assertEqual(path, (0, 1))
+        self.assertEqual(resolve('IDE', ('r:C206', 'r:7402')), (1, 0))
+        qty = UNSegment('QTY')
+        qty.load([['220', '1486']])
+        self.assertEqual(qty[path].value, '1486')
+        self.assertEqual(qty.get(path), '1486')
+        self.assertEqual(definitions['QTY'][path].id, 'quantity')
@@ -0,0 +1,39 @@
+import unittest
+
+from ediel_parser.lib.EDIParser import EDIParser
+from ediel_parser.lib.idGenerators import SeededIdGenerator, CounterIdGenerator, PayloadIdGenerator, payload_digest
+from tests.utils import get_tag
+
+
+class TestIdGenerators(unittest.TestCase):
+    fixture = 'tests/fixtures/1b.edi'
+
+    def setUp(self):
+        with open(self.fixture) as fh:
+            self.edi = fh.read()
+
+    def parser(self, id_generator=None):
+        return EDIParser(self.edi, 'edi', '99999', 'Uzbekistan', id_generator=id_generator)
+
+    def test_seeded(self):
+        first = self.parser(SeededIdGenerator(7))
+        second = self.parser(SeededIdGenerator(7))
+        ids = [first.new_id(), first.new_id()]
+        self.assertEqual(ids, [second.new_id(), second.new_id()])
+        self.assertNotEqual(ids[0], ids[1])
+        self.assertNotEqual(ids[0], self.parser(SeededIdGenerator(8)).new_id())
+        self.assertEqual(len(ids[0]), 14)
+
+    def test_payload_digest(self):
+        parser = self.parser()
+        self.assertEqual(parser.payload_digest, payload_digest(self.edi.encode('utf-8')))
+        generator = PayloadIdGenerator(clock=lambda: 0)
+        self.assertNotEqual(generator(parser.payload_digest), generator(parser.payload_digest))
+
+    def test_counter(self):
+        parser = self.parser(CounterIdGenerator('E', start=9))
+        contrl = parser.create_contrl()
+        self.assertEqual(get_tag(contrl, 'UNB')['interchange_control_reference'].value, 'E0000000000009')
+        self.assertEqual(parser.new_id(), 'E0000000000010')
+        with self.assertRaises(OverflowError):
+            CounterIdGenerator('E' * 13, start=10)('')
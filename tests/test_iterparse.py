@@ -0,0 +1,72 @@
+import io
+import unittest
+import contextlib
+
+from ediel_parser.lib.EDIParser import EDIParser
+
+
+def edi(segments):
+    return ''.join(s.toEdi() for s in segments)
+
+
+class TestIterparse(unittest.TestCase):
+    fixture = 'tests/fixtures/1b.edi'
+
+    def setUp(self):
+        with open(self.fixture) as fh:
+            self.edi = fh.read()
+        self.parser = EDIParser(self.edi, 'edi', '99999', 'Uzbekistan')
+
+    def test_transactions(self):
+        transactions = self.parser.segments.index.transactions
+        with open(self.fixture, 'rb') as fh:
+            parts = list(EDIParser.iterparse(fh, chunk_size=64))
+        self.assertEqual(len(parts), len(transactions))
+        for part, transaction in zip(parts, transactions):
+            self.assertEqual(edi(part), edi(transaction))
+            self.assertEqual(part.ide.tag, 'IDE')
+        first, second = parts
+        self.assertEqual(first.number, 0)
+        self.assertEqual(second.number, 1)
+        self.assertIs(first.header, second.header)
+        self.assertEqual([s.tag for s in first.header.children], ['UNA', 'UNB', 'UNH', 'BGM', 'DTM', 'DTM', 'MKS', 'NAD', 'NAD', 'NAD'])
+        self.assertEqual(second['BGM']['document-message_number'].value, 'E230417749099')
+        self.assertEqual(second['LOC'].toEdi(), transactions[1].first('LOC').toEdi())
+        self.assertEqual(len(first.header.index.all('NAD')), 3)
+
+    def test_parsed(self):
+        streamed = [edi(part) for part in EDIParser.iterparse(self.edi)]
+        self.assertEqual([edi(part) for part in self.parser.iter_transactions()], streamed)
+
+    def test_messages(self):
+        parts = list(EDIParser.iterparse(io.StringIO(self.edi), 'message'))
+        self.assertEqual(len(parts), 1)
+        message = parts[0]
+        self.assertEqual([s.tag for s in message.header.children], ['UNA', 'UNB'])
+        self.assertEqual(message.segments[0].tag, 'UNH')
+        self.assertEqual(message.segments[-1].tag, 'UNT')
+        self.assertIsNone(message.ide)
+        self.assertEqual(edi(message.message()), edi(self.parser.segments.children[:-1]))
+        self.assertEqual([edi(p) for p in self.parser.iter_messages()], [edi(message)])
+
+    def test_multiple_messages(self):
+        header, body = self.edi.split('IDE+', 1)
+        unh = header[header.index('UNH'):]
+        trailer = "UNT+50+1'"
+        payload = header + 'IDE+' + body.replace("UNZ+", trailer + unh + 'IDE+24+E2' + "'UNZ+", 1)
+        transactions = list(EDIParser.iterparse(payload))
+        self.assertEqual([t.number for t in transactions], [0, 1, 0])
+        self.assertIsNot(transactions[1].header, transactions[2].header)
+        self.assertEqual(transactions[2].ide['identification_number']['identity_number'].value, 'E2')
+        self.assertEqual([m.number for m in EDIParser.iterparse(payload, 'message')], [0, 1])
+
+    def test_aperak(self):
+        parser = self.parser
+        message = next(EDIParser.iterparse(self.edi, 'message')).message()
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(parser.validate(message)['reg_moment'], parser.validate()['reg_moment'])
+            self.assertEqual(len(parser.create_aperak(message)[0]), len(parser.create_aperak()[0]))
+
+    def test_unit(self):
+        with self.assertRaises(ValueError):
+            EDIParser.iterparse(self.edi, 'segment')
@@ -0,0 +1,81 @@
+import io
+import unittest
+import contextlib
+
+from ediel_parser.lib.EDIParser import EDIParser
+from ediel_parser.lib.UNSegment import UNSegment
+from ediel_parser.lib.idGenerators import CounterIdGenerator
+
+
+class TestLazy(unittest.TestCase):
+    fixture = 'tests/fixtures/1b.edi'
+
+    def setUp(self):
+        with open(self.fixture) as fh:
+            self.edi = fh.read()
+        self.eager = EDIParser(self.edi, 'edi', '99999', 'Uzbekistan', id_generator=CounterIdGenerator())
+        self.parser = EDIParser(self.edi.encode('utf-8'), 'edi', '99999', 'Uzbekistan',
+                                id_generator=CounterIdGenerator(), lazy=True)
+        self.children = self.parser.segments.children
+
+    def test_routing(self):
+        self.assertEqual(self.children.loaded, 0)
+        segments = self.parser.segments
+        self.assertEqual(segments['UNB']['interchange_control_reference'].value, 'E230417749098')
+        self.assertEqual(segments['BGM']['document-message_number'].value, 'E230417749099')
+        ids = [s['identification_number']['identity_number'].value for s in segments.index.all('IDE')]
+        self.assertEqual(ids, ['E230417749096', 'E230417749097'])
+        self.assertEqual(self.children.loaded, 4)
+        self.assertIsNone(self.parser['ERC'])
+        with self.assertRaises(IndexError):
+            segments['ERC']
+
+    def test_same_as_eager(self):
+        self.assertEqual(len(self.parser.segments), len(self.eager.segments))
+        self.assertEqual(self.children[-1].tag, 'UNZ')
+        self.assertEqual([s.tag for s in self.children[:3]], ['UNA', 'UNB', 'UNH'])
+        self.assertEqual(self.parser.toEdi(), self.eager.toEdi())
+        self.assertEqual(self.parser.toDict(), self.eager.toDict())
+        self.assertEqual(self.children.loaded, len(self.children))
+        self.assertEqual(self.children.raws, [None] * len(self.children))
+
+    def test_validate(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            verdict = self.parser.validate()
+            self.assertEqual(verdict.results, self.eager.validate().results)
+        index = self.parser.segments.index
+        for tag in ('LOC', 'CCI', 'CAV', 'NAD'):
+            self.assertEqual([self.children.segments[i] for i in index.positions(tag)], [None] * len(index.positions(tag)))
+
+    def test_aperak(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            lazy = self.parser.create_aperak()[0]
+            eager = self.eager.create_aperak()[0]
+        self.assertEqual(lazy[3].toEdi(), eager[3].toEdi())
+        self.assertEqual(len(lazy), len(eager))
+
+    def test_mutation(self):
+        segments = self.parser.segments
+        ftx = UNSegment('FTX')
+        segments.add_segment(ftx)
+        self.assertIs(segments['FTX'], ftx)
+        del segments['FTX']
+        self.assertEqual(len(segments), len(self.eager.segments))
+        self.assertEqual(segments.index.positions('FTX'), [])
+
+    def test_mutation_of_children(self):
+        segments = self.parser.segments
+        bgm = segments.index.positions('BGM')[0]
+        self.children.insert(bgm, UNSegment('FTX'))
+        self.assertEqual(segments.index.positions('FTX'), [bgm])
+        self.assertEqual(segments.index.positions('BGM'), [bgm + 1])
+        self.children[bgm] = UNSegment('DTM')
+        self.assertEqual(segments.index.positions('FTX'), [])
+        self.assertIs(segments['DTM'], self.children[bgm])
+        del self.children[bgm]
+        self.assertEqual(self.children.loaded, 0) # indexed again by the tags
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(self.parser.validate().results, self.eager.validate().results)
+        first, second = segments.index.transactions
+        self.assertEqual(first.ide.tag, 'IDE')
+        self.assertEqual(second.end, len(self.children) - 2) # UNT
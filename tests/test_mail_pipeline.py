@@ -0,0 +1,206 @@
+import io
+import base64
+import smtplib
+import unittest
+import contextlib
+from types import SimpleNamespace
+from collections import Counter
+from unittest import mock
+
+import ediel_parser.lib.mailPipeline as pipeline
+from ediel_parser.lib.Outbox import Outbox
+from ediel_parser.lib.Checkpoint import Checkpoint
+from ediel_parser.lib.AckCache import AckCache
+from tests.utils import mail_with, FakeCom
+
+
+class TestMailPipeline(unittest.TestCase):
+    fixture = 'tests/fixtures/1b.edi'
+
+    def setUp(self):
+        with open(self.fixture) as fh:
+            self.edi = fh.read()
+        self.options = SimpleNamespace(our_ediel='99999', our_city='Uzbekistan', search_query=pipeline.SEARCH_QUERY,
+                                       again_query=pipeline.AGAIN_QUERY, again_interval=0, utilts_err=False, interval=0,
+                                       once=True, outbox_days=30)
+        self.log = io.StringIO()
+
+    def poll(self, com, failures, outbox=None):
+        outbox = Outbox() if outbox is None else outbox
+        with contextlib.redirect_stdout(io.StringIO()):
+            return pipeline.poll(com, outbox, self.options, failures, self.log)
+
+    def test_answers_and_flags(self):
+        com = FakeCom({'1': mail_with(self.edi), '2': mail_with(self.edi)})
+        self.assertEqual(self.poll(com, Counter()), (['1', '2'], []))
+        self.assertEqual(len(com.sent), 2)
+        self.assertEqual(len(com.appended), 2)
+        mail = com.sent[0]
+        self.assertEqual((mail['From'], mail['To']), ('us@example.com', 'partner@example.com'))
+        self.assertIn('APERAK', base64.b64decode(mail.get_payload()).decode('utf-8'))
+        self.assertEqual(com.fetches, 1)
+        self.assertEqual(com.stored, [(['1', '2'], '+FLAGS', '(\\Seen \\Answered)'), (['1', '2'], '-FLAGS', '(\\Flagged)')])
+
+    def test_broken_mail_is_skipped(self):
+        com = FakeCom({'1': b'From: a@b\r\n\r\nUNB+broken', '2': mail_with(self.edi)})
+        failures = Counter()
+        self.assertEqual(self.poll(com, failures), (['2'], ['1']))
+        self.assertEqual([s[0] for s in com.stored], [['2'], ['2']])
+        self.assertIn('mail 1, attempt 1', self.log.getvalue())
+        for attempt in range(2, pipeline.MAX_PARSE_ATTEMPTS + 1):
+            self.assertEqual(self.poll(com, failures), ([], ['1']))
+        self.assertIn('mail 1 failed 3 times', self.log.getvalue())
+        self.assertEqual(self.poll(com, failures), ([], [])) # 1 given up, 2 answered
+        self.assertEqual(failures, Counter({'1': 3}))
+
+    def test_flagged_mail_is_answered_again(self):
+        com = FakeCom({'1': mail_with(self.edi)})
+        outbox = Outbox()
+        self.assertEqual(self.poll(com, Counter(), outbox), (['1'], []))
+        self.assertEqual(self.poll(com, Counter(), outbox), ([], []))
+        com.flagged.add('1') # flagged by a user to be answered again
+        self.assertEqual(self.poll(com, Counter(), outbox), (['1'], []))
+        self.assertEqual(self.poll(com, Counter(), outbox), ([], []))
+        self.assertEqual(len(com.sent), 2)
+        self.assertEqual(com.flagged, set())
+
+    def test_unsent_mail_is_retried_from_outbox(self):
+        now = [1000.0]
+        outbox = Outbox(clock=lambda: now[0], backoff=10)
+        refused = mail_with(self.edi, 'other@example.com')
+        com = FakeCom({'1': refused, '2': mail_with(self.edi)})
+        com.refuse_to = 'other@example.com'
+        failures = Counter()
+        self.assertEqual(self.poll(com, failures, outbox), (['2'], []))
+        self.assertEqual(com.stored[0][0], ['2'])
+        self.assertEqual(failures, Counter())
+
+        com.refuse_to = None
+        self.assertEqual(self.poll(com, failures, outbox), ([], [])) # backing off
+        now[0] += 10
+        self.assertEqual(self.poll(com, failures, outbox), (['1'], []))
+        self.assertEqual(com.fetches, 3)
+        self.assertEqual(len(com.sent), 2)
+        self.assertEqual(com.sent[1]['To'], 'other@example.com')
+
+    def test_refused_mail_is_reported(self):
+        outbox = Outbox()
+        com = FakeCom({'1': mail_with(self.edi, 'other@example.com')})
+        com.refuse_to = 'other@example.com'
+        com.refuse = smtplib.SMTPRecipientsRefused({'other@example.com': (550, b'no')})
+        self.assertEqual(self.poll(com, Counter(), outbox), ([], []))
+        self.assertIn('mail 1 is not answered', self.log.getvalue())
+        com.refuse_to = None
+        self.assertEqual(self.poll(com, Counter(), outbox), ([], []))
+        self.assertEqual(com.sent, []) # not answered again until pruned
+        self.assertEqual(self.log.getvalue().count('mail 1 is not answered'), 1)
+
+    def test_checkpoint(self):
+        com = FakeCom({'1': mail_with(self.edi)})
+        checkpoint = Checkpoint()
+        outbox = Outbox()
+        failures = Counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            poll = lambda again=True: pipeline.poll(com, outbox, self.options, failures, self.log, checkpoint, again=again)
+            self.assertEqual(poll(), (['1'], []))
+            com.mails['2'] = b'From: a@b\r\n\r\nUNB+broken'
+            self.assertEqual(poll(), ([], ['2']))
+            self.assertEqual(checkpoint.get('INBOX'), (1, 1)) # not past the failed mail
+            com.mails['2'] = mail_with(self.edi)
+            self.assertEqual(poll(), (['2'], []))
+            self.assertEqual(checkpoint.get('INBOX'), (1, 2))
+
+            com.mails['3'] = b'From: a@b\r\n\r\nUNB+broken'
+            for attempt in range(pipeline.MAX_PARSE_ATTEMPTS):
+                self.assertEqual(checkpoint.get('INBOX'), (1, 2))
+                self.assertEqual(poll(), ([], ['3']))
+            self.assertEqual(checkpoint.get('INBOX'), (1, 3)) # given up, moved past it
+            self.assertIn('mail 3 failed 3 times', self.log.getvalue())
+
+            com.flagged.add('1') # below the checkpoint
+            self.assertEqual(poll(again=False), ([], []))
+            self.assertEqual(poll(), (['1'], []))
+            self.assertEqual(poll(), ([], []))
+        self.assertEqual(checkpoint.get('INBOX'), (1, 3))
+        self.assertEqual(len(com.sent), 3)
+
+    def test_serve_searches_again_on_interval(self):
+        com = FakeCom({})
+        calls = []
+        com.search_new = lambda query, checkpoint, again=None: calls.append(again) or ([], (1, 0))
+        self.options.once = False
+        self.options.again_interval = 900
+        sleeps = []
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 3:
+                raise KeyboardInterrupt
+        with mock.patch.object(pipeline.time, 'sleep', sleep), mock.patch.object(pipeline.time, 'monotonic', lambda: 100.0 * len(sleeps)):
+            with self.assertRaises(KeyboardInterrupt):
+                pipeline.serve(com, self.options, log=self.log, checkpoint=Checkpoint())
+        self.assertEqual(calls, [pipeline.AGAIN_QUERY, None, None])
+
+    def test_duplicates_are_answered_from_cache(self):
+        cache = AckCache()
+        resent = self.edi + '\n' # same interchange, other bytes
+        com = FakeCom({'1': mail_with(self.edi), '2': mail_with(self.edi), '3': mail_with(resent)})
+        with mock.patch.object(pipeline, 'EDIParser', wraps=pipeline.EDIParser) as parser:
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(pipeline.poll(com, Outbox(), self.options, Counter(), self.log, cache=cache), (['1', '2', '3'], []))
+        self.assertEqual(parser.call_count, 1)
+        self.assertEqual(len(cache), 3) # content and UNB key of the first, content key of the resend
+        self.assertEqual(len(com.sent), 3)
+        bodies = [base64.b64decode(mail.get_payload()) for mail in com.sent]
+        self.assertEqual(bodies[0], bodies[1])
+        self.assertEqual(bodies[0], bodies[2])
+        self.assertEqual(com.sent[0]['Subject'], com.sent[2]['Subject'])
+
+    def test_cache_hits_do_not_renew(self):
+        now = [0.0]
+        cache = AckCache(max_age=100, clock=lambda: now[0])
+        with mock.patch.object(pipeline, 'EDIParser', wraps=pipeline.EDIParser) as parser:
+            with contextlib.redirect_stdout(io.StringIO()):
+                for i in range(4): # resent every 40 s with other bytes
+                    pipeline.responses(mail_with(self.edi + '\n' * i), self.options, cache)
+                    now[0] += 40
+        self.assertEqual(parser.call_count, 2) # parsed again once the first answer is 100 s old
+
+    def test_cache_is_scoped_by_options(self):
+        cache = AckCache()
+        payload = mail_with(self.edi)
+        with mock.patch.object(pipeline, 'EDIParser', wraps=pipeline.EDIParser) as parser:
+            with contextlib.redirect_stdout(io.StringIO()):
+                pipeline.responses(payload, self.options, cache)
+                self.options.utilts_err = True
+                pipeline.responses(payload, self.options, cache)
+                self.options.our_ediel = '88888'
+                other = pipeline.responses(payload, self.options, cache)
+                pipeline.responses(payload, self.options, cache)
+        self.assertEqual(parser.call_count, 3)
+        self.assertIn('88888', base64.b64decode(other[0].get_payload()).decode('utf-8'))
+        self.assertEqual(len(cache), 6)
+
+    def test_mail_without_attachment(self):
+        payload = b'From: partner@example.com\r\nTo: us@example.com\r\n\r\nno attachment'
+        with mock.patch.object(pipeline, 'EDIParser') as parser:
+            parser.return_value.create_aperak.return_value = []
+            self.assertEqual(pipeline.responses(payload, self.options, AckCache()), [])
+        parser.assert_called_once_with(payload, 'mail', '99999', 'Uzbekistan')
+
+    def test_serve_prunes_outbox(self):
+        now = [1000.0]
+        outbox = Outbox(clock=lambda: now[0])
+        com = FakeCom({'1': mail_with(self.edi)})
+        with contextlib.redirect_stdout(io.StringIO()):
+            pipeline.serve(com, self.options, outbox, log=self.log)
+            self.assertEqual(outbox.db.execute('SELECT COUNT(*) FROM sources').fetchone()[0], 1)
+            now[0] += 31 * 86400
+            pipeline.serve(com, self.options, outbox, log=self.log)
+        self.assertEqual(outbox.db.execute('SELECT COUNT(*) FROM sources').fetchone()[0], 0)
+
+    def test_serve_reconnects(self):
+        com = FakeCom({})
+        com.drop = True
+        pipeline.serve(com, self.options, log=self.log)
+        self.assertEqual((com.connects, com.closed), (1, 1))
+        self.assertIn('connection lost', self.log.getvalue())
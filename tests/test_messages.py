@@ -0,0 +1,66 @@
+import io
+import unittest
+import contextlib
+
+from ediel_parser.lib.EDIParser import EDIParser
+
+
+def value(segments, tag, qualifier):
+    for s in segments:
+        if s.tag == tag and s.toList()[0][0] == qualifier:
+            return s.toList()[0][1]
+
+
+class TestMessages(unittest.TestCase):
+    fixture = 'tests/fixtures/1b.edi'
+
+    def setUp(self):
+        with open(self.fixture) as fh:
+            edi = fh.read()
+        start, end = edi.index('UNH+'), edi.index('UNZ+')
+        header, message = edi[:start], edi[start:end]
+        second = (message
+                  .replace('UNH+1+', 'UNH+2+')
+                  .replace('E230417749099', 'E230417749199')
+                  .replace('IDE+24+E2304177490', 'IDE+24+E2304177491')
+                  .replace("QTY+220:1253'", "QTY+136:-5'QTY+220:1253'"))
+        self.edi = header + message + second + "UNZ+2+E230417749098'"
+        self.parser = EDIParser(self.edi, 'edi', '99999', 'Uzbekistan')
+
+    def test_split(self):
+        first, second = self.parser.messages
+        for message in (first, second):
+            self.assertEqual([s.tag for s in message.children[:3]], ['UNA', 'UNB', 'UNH'])
+            self.assertEqual(message.children[-1].tag, 'UNT')
+            self.assertEqual(len(message.index.transactions), 2)
+        self.assertEqual(second['BGM']['document-message_number'].value, 'E230417749199')
+        self.assertEqual(second['IDE']['identification_number']['identity_number'].value, 'E230417749196')
+        self.assertIs(self.parser.messages, self.parser.messages)
+
+    def test_single_message(self):
+        with open(self.fixture) as fh:
+            parser = EDIParser(fh.read(), 'edi', '99999', 'Uzbekistan')
+        self.assertEqual(parser.messages, [parser.segments])
+
+    def test_aperak(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            aperak, utilts = self.parser.create_aperak()
+        self.assertEqual(aperak[3]['document-message_name'][0].value, '312')
+        doc = [s for s in aperak if s.tag == 'DOC'][0]
+        self.assertEqual(doc.get(('document-message_details', 'document-message_number')), 'E230417749099')
+        self.assertEqual(
+            [s.toList()[0][1] for s in aperak if s.tag == 'RFF' and s.toList()[0][0] == 'ACW'],
+            ['E230417749096', 'E230417749097'])
+        self.assertEqual(utilts[3]['document-message_name'].toList()[0], 'ERR')
+        self.assertEqual(value(utilts, 'RFF', 'E66'), 'E230417749199')
+        self.assertEqual(
+            [s['identification_number']['identity_number'].value for s in utilts if s.tag == 'IDE'],
+            ['E230417749196', 'E230417749197'])
+
+    def test_utilts_errs(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            responses = self.parser.create_utilts_errs()
+        self.assertEqual(len(responses), 1)
+        self.assertEqual(value(responses[0], 'RFF', 'E66'), 'E230417749199')
+        statuses = [s['status_reason_1']['status_reason-coded'].value for s in responses[0] if s.tag == 'STS']
+        self.assertEqual(statuses[1], 'E98')
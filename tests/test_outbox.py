@@ -0,0 +1,122 @@
+import os
+import shutil
+import smtplib
+import tempfile
+import unittest
+
+from ediel_parser.lib.Outbox import Outbox
+from tests.utils import mail_to
+
+
+class Sender:
+
+    def __init__(self):
+        self.errors = {}
+        self.sent = []
+        self.calls = 0
+
+    def __call__(self, mails):
+        self.calls += 1
+        errors = [self.errors.get(mail['To']) for mail in mails]
+        self.sent += [mail['To'] for mail, error in zip(mails, errors) if error is None]
+        return errors
+
+
+class TestOutbox(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'outbox.sqlite')
+        self.outbox = self.open()
+
+    def tearDown(self):
+        self.outbox.close()
+        shutil.rmtree(self.dir)
+
+    def open(self):
+        return Outbox(self.path, clock=lambda: self.now, backoff=10, max_backoff=25, max_attempts=4)
+
+    def test_source_is_queued_once(self):
+        self.assertTrue(self.outbox.add('1', [mail_to('a@x'), mail_to('b@x')]))
+        self.assertFalse(self.outbox.add('1', [mail_to('a@x')]))
+        self.assertEqual(self.outbox.unknown(['3', '1', '2']), ['3', '2'])
+        send = Sender()
+        self.assertEqual(self.outbox.deliver(send), (2, 0))
+        self.assertEqual(self.outbox.deliver(send), (0, 0))
+        self.assertEqual(send.sent, ['a@x', 'b@x'])
+
+    def test_flagged_source_is_queued_again(self):
+        self.outbox.add('1', [mail_to('a@x')])
+        send = Sender()
+        self.outbox.deliver(send)
+        self.outbox.flag(lambda ids: None)
+        self.assertEqual(self.outbox.unknown(['1']), ['1'])
+        self.assertTrue(self.outbox.add('1', [mail_to('b@x'), mail_to('c@x')]))
+        self.assertFalse(self.outbox.add('1', [mail_to('d@x')]))
+        self.assertEqual(self.outbox.deliver(send), (2, 0))
+        self.assertEqual(self.outbox.flag(lambda ids: None), ['1'])
+        self.assertEqual(send.sent, ['a@x', 'b@x', 'c@x'])
+
+    def test_flag_after_all_responses_sent(self):
+        self.outbox.add('1', [mail_to('a@x'), mail_to('b@x')])
+        self.outbox.add('2', [mail_to('c@x')])
+        send = Sender()
+        send.errors['b@x'] = smtplib.SMTPServerDisconnected('gone')
+        appended = []
+        self.outbox.deliver(send, appended.extend)
+        self.assertEqual([m['To'] for m in appended], ['a@x', 'c@x'])
+        stored = []
+        self.assertEqual(self.outbox.flag(stored.extend), ['2'])
+        self.assertEqual(self.outbox.flag(stored.extend), [])
+
+        send.errors.clear()
+        self.now += 10
+        self.outbox.close()
+        self.outbox = self.open() # survives a restart
+        self.assertEqual(self.outbox.deliver(send), (1, 0))
+        self.assertEqual(self.outbox.flag(stored.extend), ['1'])
+        self.assertEqual(stored, ['2', '1'])
+        self.assertEqual(send.sent, ['a@x', 'c@x', 'b@x'])
+
+    def test_backoff_and_failures(self):
+        self.outbox.add('1', [mail_to('a@x')])
+        self.outbox.add('2', [mail_to('refused@x')])
+        send = Sender()
+        send.errors['a@x'] = smtplib.SMTPServerDisconnected('gone')
+        send.errors['refused@x'] = smtplib.SMTPRecipientsRefused({'refused@x': (550, b'no')})
+        self.assertEqual(self.outbox.deliver(send), (0, 1))
+        delays = []
+        for attempt in range(3):
+            start, calls = self.now, send.calls
+            while send.calls == calls and self.now < start + 100:
+                self.now += 1
+                self.outbox.deliver(send)
+            delays.append(self.now - start)
+        self.assertEqual(delays, [10, 20, 25])
+        self.assertEqual([source for source, error in self.outbox.failed()], ['1', '2'])
+        self.assertEqual(self.outbox.ready(), [])
+
+    def test_failed_source(self):
+        self.outbox.add('1', [mail_to('a@x'), mail_to('refused@x')])
+        send = Sender()
+        send.errors['refused@x'] = smtplib.SMTPRecipientsRefused({'refused@x': (550, b'no')})
+        self.now += 10
+        self.assertEqual(self.outbox.deliver(send), (1, 1))
+        self.assertEqual([source for source, error in self.outbox.failed(self.now)], ['1'])
+        self.assertEqual(self.outbox.failed(self.now + 1), [])
+        self.assertEqual(self.outbox.unknown(['1']), []) # neither flagged nor queued again
+        self.assertFalse(self.outbox.add('1', [mail_to('a@x')]))
+        self.assertEqual(self.outbox.flag(lambda ids: None), [])
+        self.now += 100
+        self.outbox.prune(50)
+        self.assertEqual(self.outbox.failed(), [])
+        self.assertEqual(self.outbox.unknown(['1']), ['1'])
+
+    def test_prune(self):
+        self.outbox.add('1', [mail_to('a@x')])
+        self.outbox.deliver(Sender())
+        self.outbox.flag(lambda ids: None)
+        self.now += 100
+        self.outbox.prune(50)
+        self.assertEqual(self.outbox.unknown(['1']), ['1'])
@@ -0,0 +1,90 @@
+import io
+import pickle
+import unittest
+import contextlib
+import multiprocessing
+from unittest import mock
+
+from ediel_parser.lib.EDIParser import EDIParser
+from ediel_parser.lib.UNSegment import UNSegment
+from ediel_parser.lib.idGenerators import CounterIdGenerator
+import ediel_parser.lib.ediTools as edi
+import ediel_parser.lib.parallelParse as parallel
+
+
+class TestParallelParse(unittest.TestCase):
+    fixture = 'tests/fixtures/1b.edi'
+
+    def setUp(self):
+        with open(self.fixture) as fh:
+            fixture = fh.read()
+        start, end = fixture.index('IDE+'), fixture.index('UNT+')
+        transactions = fixture[start:end]
+        # 300 transactions, enough for several chunks, and a segment without definition
+        body = ''.join(transactions.replace('IDE+24+E2304177490', 'IDE+24+E{:03d}'.format(i)) for i in range(150))
+        self.edi = fixture[:start] + body + "XYZ+1'" + fixture[end:]
+
+    def parser(self, payload=None, **args):
+        payload = self.edi if payload is None else payload
+        with contextlib.redirect_stdout(io.StringIO()):
+            return EDIParser(payload, 'edi', '99999', 'Uzbekistan', id_generator=CounterIdGenerator(), **args)
+
+    def test_chunks(self):
+        characters = parallel.service_characters(self.edi)
+        chunks = parallel.transaction_chunks(self.edi, characters, 8)
+        self.assertEqual(len(chunks), 6) # header and 5 chunks of at least 64 transactions
+        self.assertTrue(chunks[0].startswith('UNA'))
+        self.assertTrue(all(chunk.startswith('IDE+') for chunk in chunks[1:]))
+        self.assertEqual(''.join(chunks), self.edi)
+        encoded = parallel.transaction_chunks(self.edi.encode('utf-8'), characters, 8)
+        self.assertEqual([chunk.decode('utf-8') for chunk in encoded], chunks)
+
+    def test_released_terminator(self):
+        characters = parallel.service_characters(self.edi)
+        payload = "UNA:+.? 'FTX+a?'IDE+b'FTX+c??'\nIDE+d'"
+        self.assertEqual(parallel.transaction_offsets(payload, characters), [payload.index('IDE+d')])
+
+    def test_same_as_sequential(self):
+        sequential = self.parser()
+        with multiprocessing.Pool(2) as pool:
+            for payload in (self.edi, self.edi.encode('utf-8')):
+                parser = self.parser(payload, workers=2, pool=pool)
+                self.assertIsInstance(parser.segments.children, parallel.LoadedSegments)
+                self.assertEqual(parser.segments.children.loaded, 0)
+                self.assertEqual(parser.toEdi(), sequential.toEdi())
+                index, expected = parser.segments.index, sequential.segments.index
+                self.assertEqual(index.tags, expected.tags)
+                self.assertEqual([(t.start, t.end) for t in index.transactions], [(t.start, t.end) for t in expected.transactions])
+                self.assertEqual(len(index.transactions), 300)
+                self.assertEqual(parser['XYZ'].tag, 'XYZ')
+                with contextlib.redirect_stdout(io.StringIO()):
+                    self.assertEqual(parser.validate().results, sequential.validate().results)
+
+    def test_chunks_for_pool_size(self):
+        with multiprocessing.Pool(3) as pool:
+            with mock.patch.object(parallel, 'transaction_chunks', wraps=parallel.transaction_chunks) as chunks:
+                parallel.parse(self.edi, 3, pool=pool)
+        self.assertEqual(chunks.call_args.args[2], 3 * parallel.CHUNKS_PER_WORKER)
+
+    def test_one_core(self):
+        with mock.patch.object(parallel.os, 'cpu_count', return_value=1):
+            with mock.patch.object(parallel.multiprocessing, 'Pool') as pool:
+                segments, index = parallel.parse(self.edi, 4)
+        pool.assert_not_called()
+        self.assertIsNone(index)
+        self.assertEqual(len(segments), self.edi.count("'"))
+
+    def test_small_payload(self):
+        with open(self.fixture) as fh:
+            payload = fh.read()
+        parser = EDIParser(payload, 'edi', '99999', 'Uzbekistan', workers=4)
+        self.assertEqual(parser.toEdi(), EDIParser(payload, 'edi', '99999', 'Uzbekistan').toEdi())
+
+    def test_pickle(self):
+        qty = UNSegment('QTY')
+        qty[0] = ['136', '5']
+        copy = pickle.loads(pickle.dumps(qty))
+        self.assertIs(copy.schema, qty.schema)
+        self.assertEqual(copy.toEdi(), qty.toEdi())
+        stripped = edi.rstrip([qty])[0]
+        self.assertEqual(pickle.loads(pickle.dumps(stripped)).toEdi(), "QTY+136:5'")
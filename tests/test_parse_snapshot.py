@@ -0,0 +1,71 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import contextlib
+from unittest import mock
+
+import ediel_parser.lib.parseSnapshot as snapshot
+from ediel_parser.lib.EDIParser import EDIParser
+from ediel_parser.lib.UNSegment import schemas
+from ediel_parser.lib.idGenerators import CounterIdGenerator
+
+
+class TestParseSnapshot(unittest.TestCase):
+    fixture = 'tests/fixtures/1b.edi'
+
+    def setUp(self):
+        with open(self.fixture) as fh:
+            self.edi = fh.read()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def parse(self, payload):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return EDIParser(payload, 'edi', '99999', 'Uzbekistan', id_generator=CounterIdGenerator(),
+                             snapshots=self.directory)
+
+    def snapshots(self):
+        return [name for name in os.listdir(self.directory) if name.endswith(snapshot.SUFFIX)]
+
+    def test_read_back(self):
+        payload = self.edi.replace("UNH+", "XYZ+1'UNH+", 1) # placeholder of an unknown tag
+        first = self.parse(payload)
+        self.assertEqual(len(self.snapshots()), 1)
+        with mock.patch.object(EDIParser, 'parse_payload') as parse_payload:
+            second = self.parse(payload)
+        parse_payload.assert_not_called()
+        self.assertEqual(second.toEdi(), first.toEdi())
+        self.assertEqual(second.toDict(), first.toDict())
+        self.assertEqual(second.segments['XYZ'].tag, 'XYZ')
+        with contextlib.redirect_stdout(io.StringIO()):
+            aperaks = [second.toEdi(m) for m in second.create_aperak()], [first.toEdi(m) for m in first.create_aperak()]
+        self.assertEqual(*aperaks)
+
+    def test_other_definitions_parse_again(self):
+        self.parse(self.edi)
+        path = os.path.join(self.directory, self.snapshots()[0])
+        with open(path, 'r+b') as fh:
+            fh.write(snapshot.MAGIC + b'0' * 32)
+        self.assertIsNone(snapshot.read(path))
+        self.assertIn('UNZ+', self.parse(self.edi).toEdi())
+        self.assertIsNotNone(snapshot.read(path)) # written again
+
+    def test_corrupt_snapshot(self):
+        self.parse(self.edi)
+        path = os.path.join(self.directory, self.snapshots()[0])
+        with open(path, 'r+b') as fh:
+            fh.truncate(len(snapshot.HEADER) + 10)
+        self.assertIsNone(snapshot.read(path))
+        self.assertIn('UNZ+', self.parse(self.edi).toEdi())
+
+    def test_fingerprint_follows_definitions(self):
+        changed = dict(schemas)
+        changed['XYZ'] = schemas['UNZ']
+        self.assertNotEqual(snapshot.fingerprint(changed), snapshot.fingerprint(schemas))
+
+    def test_lazy_parsing_writes_no_snapshot(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            EDIParser(self.edi, 'edi', '99999', 'Uzbekistan', lazy=True, snapshots=self.directory)
+        self.assertEqual(self.snapshots(), [])
@@ -0,0 +1,50 @@
+import io
+import unittest
+
+from ediel_parser.lib.EDIParser import EDIParser, Header, scan_header
+from tests.utils import mail_with
+
+
+class TestScanHeader(unittest.TestCase):
+    fixture = 'tests/fixtures/1b.edi'
+
+    def setUp(self):
+        with open(self.fixture) as fh:
+            self.edi = fh.read()
+
+    def test_header(self):
+        header = scan_header(self.edi)
+        parser = EDIParser(self.edi, 'edi', '99999', 'Uzbekistan')
+        self.assertEqual(header.sender, parser['UNB']['interchange_sender']['sender_identification'].value)
+        self.assertEqual(header.application_reference, '23-DDQ-E66-S')
+        self.assertEqual(header.message_type, 'UTILTS')
+        self.assertEqual(header.association_code, 'E5SE1B')
+        self.assertEqual((header.document_name, header.document_number), ('E66', 'E230417749099'))
+        with self.assertRaises(AttributeError):
+            header.sender = '1'
+
+    def test_sources(self):
+        header = scan_header(self.edi)
+        self.assertEqual(scan_header(self.edi.encode('utf-8')), header)
+        self.assertEqual(scan_header(io.BytesIO(self.edi.encode('utf-8'))), header)
+        mail = mail_with(self.edi)
+        self.assertEqual(scan_header(mail, 'mail'), header)
+        self.assertEqual(scan_header(mail.decode('ascii'), 'mail'), header)
+
+    def test_mail_without_attachment(self):
+        with self.assertRaisesRegex(ValueError, 'no EDI attachment'):
+            scan_header(b'From: a@b\r\nSubject: hello\r\n\r\nno attachment\r\n', 'mail')
+
+    def test_stops_at_header(self):
+        # the rest of the interchange is never tokenized
+        broken = self.edi.replace("UNZ+1+E230417749098'", "UNZ+1+E230417749098")
+        with self.assertRaises(ValueError):
+            EDIParser(broken, 'edi', '99999', 'Uzbekistan')
+        self.assertEqual(scan_header(broken), scan_header(self.edi))
+
+    def test_missing(self):
+        header = scan_header("UNB+UNOC:3+1:14+2:14+230417:2200+7'IDE+24+1'BGM+E66+2'")
+        self.assertEqual((header.sender, header.interchange_control_reference), ('1', '7'))
+        self.assertIsNone(header.message_type)
+        self.assertIsNone(header.document_number)
+        self.assertEqual(scan_header(''), Header())
@@ -0,0 +1,36 @@
+import unittest
+
+from ediel_parser.lib.EDIParser import EDIParser
+from ediel_parser.lib.SegmentIndex import SegmentIndex
+
+
+class TestSegmentIndex(unittest.TestCase):
+    fixture = 'tests/fixtures/1b.edi'
+
+    def setUp(self):
+        with open(self.fixture) as fh:
+            self.parser = EDIParser(fh.read(), 'edi', '99999', 'Uzbekistan')
+        self.index = self.parser.segments.index
+
+    def test_tags(self):
+        segments = self.parser.segments
+        self.assertEqual(self.index.positions('BGM'), [3])
+        self.assertEqual(len(self.index.all('IDE')), 2)
+        self.assertIs(self.parser['BGM'], segments[3])
+        self.assertIs(segments['BGM'], segments[3])
+        self.assertIsNone(self.parser['ERC'])
+
+    def test_transactions(self):
+        first, second = self.index.transactions
+        self.assertEqual(first.ide['identification_number']['identity_number'].value, 'E230417749096')
+        self.assertEqual(second.ide['identification_number']['identity_number'].value, 'E230417749097')
+        self.assertEqual(first.end, second.start)
+        self.assertEqual(second.segments[-1].tag, 'QTY')
+        self.assertEqual([s['place-location_qualifier'].value for s in first.all('LOC')], ['239', '172'])
+        self.assertEqual(second.first('QTY')['quantity_details']['quantity'].value, '11557')
+        self.assertEqual(len(first.all('QTY')), 3)
+
+    def test_plain_list(self):
+        index = SegmentIndex.of(list(self.parser.segments))
+        self.assertEqual(index.positions('IDE'), self.index.positions('IDE'))
+        self.assertIs(SegmentIndex.of(self.parser.segments), self.index)
@@ -0,0 +1,63 @@
+import io
+import unittest
+
+from pydifact.message import Message as PMessage
+from pydifact.segments import Segment as PSegment
+
+from ediel_parser.lib.EDIParser import EDIParser
+from ediel_parser.lib.EDISerializer import serializer
+from ediel_parser.lib.Segment import Segment
+from ediel_parser.lib.UNSegment import UNSegment
+import ediel_parser.lib.ediTools as edi
+
+
+def pydifact_edi(segment):
+    message = PMessage()
+    elements = segment.toList()
+    if elements is not None and len(elements) > 0:
+        message.add_segment(PSegment(segment.tag, *elements))
+    else:
+        message.add_segment(PSegment(segment.tag, None))
+    return message.serialize()
+
+
+class TestSerializer(unittest.TestCase):
+    fixture = 'tests/fixtures/1b.edi'
+
+    def setUp(self):
+        with open(self.fixture) as fh:
+            self.edi = fh.read()
+
+    def test_parsed(self):
+        parser = EDIParser(self.edi, 'edi', '99999', 'Uzbekistan')
+        for segment in parser.segments:
+            self.assertEqual(segment.toEdi(), pydifact_edi(segment))
+        self.assertEqual(parser.toEdi(), ''.join(map(pydifact_edi, parser.segments)))
+        buffer = io.StringIO()
+        parser.writeEdi(buffer)
+        self.assertEqual(buffer.getvalue(), parser.toEdi())
+
+    def test_release_characters(self):
+        ftx = UNSegment('FTX')
+        ftx[0] = 'AAO'
+        ftx[3] = ["it's 1+1?", 'a:b']
+        expected = "FTX+AAO++::+it?'s 1?+1??:a?:b:::+'"
+        self.assertEqual(ftx.toEdi(), expected)
+        self.assertEqual(ftx.toEdi(), pydifact_edi(ftx))
+        self.assertEqual(edi.rstrip([ftx])[0].toEdi(), "FTX+AAO+++it?'s 1?+1??:a?:b'")
+
+    def test_stripped(self):
+        for segment in [UNSegment('NAD'), UNSegment('UNB'), UNSegment('ERC')]:
+            segment[0] = 'MS'
+            stripped = edi.rstrip([segment])[0]
+            self.assertEqual(stripped.toEdi(), pydifact_edi(stripped))
+        erc = UNSegment('ERC')
+        erc[0] = ['100', None, '260']
+        self.assertEqual(edi.rstrip([erc])[0].toEdi(), "ERC+100::260'")
+        self.assertEqual(edi.rstrip([UNSegment('DTM')])[0].toEdi(), "DTM+'")
+
+    def test_plain_segment(self):
+        self.assertEqual(Segment(tag='XYZ').toEdi(), "XYZ+'")
+        self.assertEqual(UNSegment('UNA').toEdi(), "UNA:+.? '")
+        with self.assertRaises(TypeError):
+            serializer.escape(1)
@@ -0,0 +1,93 @@
+import time
+import smtplib
+import threading
+import unittest
+
+from ediel_parser.lib.SMTPPool import SMTPPool, RateLimit
+from tests.utils import mail_to
+
+
+class FakeSMTP:
+
+    def __init__(self, server):
+        self.server = server
+        self.quit_called = False
+
+    def sendmail(self, sender, to, body):
+        with self.server.lock:
+            self.server.active += 1
+            self.server.most_active = max(self.server.most_active, self.server.active)
+        time.sleep(0.001)
+        with self.server.lock:
+            self.server.active -= 1
+            if to in self.server.drop_once:
+                self.server.drop_once.remove(to)
+                raise smtplib.SMTPServerDisconnected('gone')
+        if to == 'refused@example.com':
+            raise smtplib.SMTPRecipientsRefused({to: (550, b'no')})
+        self.server.sent.append((id(self), to))
+
+    def quit(self):
+        self.quit_called = True
+
+
+class FakeServer:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions = []
+        self.sent = []
+        self.active = 0
+        self.most_active = 0
+        self.drop_once = set()
+
+    def connect(self):
+        session = FakeSMTP(self)
+        self.sessions.append(session)
+        return session
+
+
+class TestSMTPPool(unittest.TestCase):
+
+    def test_sessions_are_reused(self):
+        server = FakeServer()
+        pool = SMTPPool(server.connect, 3)
+        mails = [mail_to('p{}@example.com'.format(i)) for i in range(30)]
+        self.assertEqual(pool.send_many(mails), [None] * 30)
+        self.assertLessEqual(len(server.sessions), 3)
+        self.assertLessEqual(server.most_active, 3)
+        self.assertEqual(sorted(to for _, to in server.sent), sorted(m['To'] for m in mails))
+        pool.send(mail_to('later@example.com'))
+        self.assertLessEqual(len(server.sessions), 3)
+        pool.close()
+        self.assertTrue(all(s.quit_called for s in server.sessions))
+
+    def test_reconnects_and_reports_errors(self):
+        server = FakeServer()
+        server.drop_once.add('a@example.com')
+        pool = SMTPPool(server.connect, 1)
+        errors = pool.send_many([mail_to('a@example.com'), mail_to('refused@example.com'), mail_to('b@example.com')])
+        self.assertIsNone(errors[0])
+        self.assertIsInstance(errors[1], smtplib.SMTPRecipientsRefused)
+        self.assertIsNone(errors[2])
+        self.assertEqual(len(server.sessions), 2) # the dropped session was replaced, the refusal kept it
+        self.assertEqual([to for _, to in server.sent], ['a@example.com', 'b@example.com'])
+
+
+class TestRateLimit(unittest.TestCase):
+
+    def test_bucket(self):
+        now = [0.0]
+        slept = []
+
+        def sleep(seconds):
+            slept.append(seconds)
+            now[0] += seconds
+
+        limit = RateLimit(2, burst=3, clock=lambda: now[0], sleep=sleep)
+        for _ in range(5):
+            limit.wait()
+        self.assertEqual(slept, [0.5, 0.5])
+        now[0] += 10
+        limit.wait()
+        self.assertEqual(len(slept), 2)
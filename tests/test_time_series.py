@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timezone
+
+import ediel_parser.lib.timeSeries as series
+from ediel_parser.lib.EDIParser import EDIParser
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+HEADER = "UNA:+.? 'UNB+UNOC:3+91100:ZZ+92165:ZZ+230417:2200+E1++23-DDQ-E66-S++1'UNH+1+UTILTS:D:02B:UN:E5SE1B'DTM+735:?+0100:406'"
+
+def epoch(*moment):
+    return int(datetime(*moment, tzinfo=timezone.utc).timestamp())
+
+def quarter_hourly(quantities):
+    return (
+        HEADER + "IDE+24+E2'LOC+172+735999888000000042::9'DTM+324:202303012300202303020100:719'DTM+354:15:806'"
+        + ''.join("SEQ++{}'QTY+136:{}'".format(i + 1, q) for i, q in enumerate(quantities))
+        + "UNT+1+1'UNZ+1+E1'"
+    )
+
+
+class TestTimeSeries(unittest.TestCase):
+    fixture = 'tests/fixtures/1b.edi'
+
+    def parse(self, payload, **args):
+        return EDIParser(payload, 'edi', '99999', 'Uzbekistan', **args)
+
+    def test_fixture(self):
+        with open(self.fixture) as fh:
+            edi = fh.read()
+        first, second = self.parse(edi).time_series()
+        self.assertEqual((first.transaction, first.metering_point, first.resolution), ('E230417749096', '735999888000013017', 'MONTHLY'))
+        self.assertEqual((first.start, first.end), (epoch(2023, 2, 28, 23), epoch(2023, 3, 31, 23)))
+        self.assertEqual(list(first.quantities), [1_253_000, 3_354_000, 42_000])
+        self.assertEqual(list(first.qualifiers), [220, 220, 136])
+        self.assertEqual(list(first.seqs), [1, 2, 3])
+        self.assertEqual(list(first.timestamps), [epoch(2023, 2, 28, 23), epoch(2023, 3, 31, 23), epoch(2023, 2, 28, 23)])
+        self.assertEqual(second.metering_point, '735999888000013024')
+        self.assertEqual([s.quantities for s in self.parse(edi.encode('utf-8'), lazy=True).time_series()],
+                         [first.quantities, second.quantities])
+
+    def test_quarter_hourly(self):
+        quantities = ['0.25', '1.001', 'NULL'] + ['2'] * 5
+        [values] = self.parse(quarter_hourly(quantities)).time_series()
+        self.assertEqual(list(values.timestamps), [epoch(2023, 3, 1, 22) + 900 * i for i in range(8)])
+        self.assertEqual(list(values.quantities), [250, 1001, series.MISSING] + [2000] * 5)
+        self.assertEqual(list(values.qualifiers), [136] * 8)
+
+    def test_epoch(self):
+        parser = self.parse(quarter_hourly([]))
+        for moment, offset in [('202311012300', '+0100'), ('202303260200', '-0530'), ('202312010000', '+0000')]:
+            self.assertEqual(series.epoch(moment, offset), int(parser.to_datetime(moment, offset).timestamp()))
+        self.assertEqual(series.epoch('202311010000', '+0000', 3), epoch(2024, 2, 1))
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_numpy(self):
+        parsed = self.parse(quarter_hourly(['1', 'NULL', '3'])).time_series()
+        values = parsed[0].to_numpy()
+        self.assertEqual(values.dtype.names, ('timestamp', 'quantity', 'qualifier', 'seq'))
+        self.assertEqual(values['timestamp'][0], numpy.datetime64('2023-03-01T22:00:00'))
+        self.assertEqual(values['quantity'].tolist(), [1000, series.MISSING, 3000])
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'series.npz')
+        series.save_npz(path, parsed * 2)
+        with numpy.load(path) as saved:
+            self.assertEqual(saved['offsets'].tolist(), [0, 3, 6])
+            self.assertEqual(saved['metering_point'].tolist(), ['735999888000000042'] * 2)
+            self.assertTrue((saved['values'][3:6] == values).all())
+
+    @unittest.skipIf(numpy is not None, 'numpy is installed')
+    def test_without_numpy(self):
+        with self.assertRaises(ImportError):
+            self.parse(quarter_hourly(['1'])).time_series()[0].to_numpy()
@@ -0,0 +1,114 @@
+import io
+import mmap
+import tempfile
+import unittest
+
+from pydifact.message import Message as PMessage
+
+from ediel_parser.lib.EDIParser import EDIParser
+from ediel_parser.lib.EDITokenizer import EDITokenizer, tokenize, Repetitions
+from tests.utils import mail_with
+
+
+def pydifact_tokens(payload):
+    return [(s.tag, s.elements) for s in PMessage.from_str(payload).segments]
+
+def tokens(source, **args):
+    return [tuple(s) for s in tokenize(source, **args)]
+
+
+class TestTokenizer(unittest.TestCase):
+    fixture = 'tests/fixtures/1b.edi'
+
+    def setUp(self):
+        with open(self.fixture) as fh:
+            self.edi = fh.read()
+
+    def test_same_as_pydifact(self):
+        self.assertEqual(tokens(self.edi), pydifact_tokens(self.edi))
+
+    def test_chunked(self):
+        expected = tokens(self.edi)
+        for chunk_size in (1, 2, 7, 1024):
+            self.assertEqual(tokens(io.StringIO(self.edi), chunk_size=chunk_size), expected)
+            self.assertEqual(tokens(io.BytesIO(self.edi.encode('utf-8')), chunk_size=chunk_size), expected)
+        self.assertEqual(tokens(self.edi.encode('utf-8')), expected)
+
+    def test_incremental(self):
+        segments = tokenize(io.StringIO(self.edi), chunk_size=16)
+        self.assertEqual(next(segments).tag, 'UNA')
+        self.assertEqual(next(segments).tag, 'UNB')
+
+    def test_release_characters(self):
+        edi = "UNA:+.? 'FTX+AAO+++it?'s 1?+1??:a?:b'\r\nDTM+735:?+0100:406'"
+        expected = [
+            ('UNA', [":+.? '"]),
+            ('FTX', ['AAO', '', '', ["it's 1+1?", 'a:b']]),
+            ('DTM', [['735', '+0100', '406']]),
+        ]
+        self.assertEqual(tokens(edi), expected)
+        self.assertEqual(tokens(edi), pydifact_tokens(edi))
+        self.assertEqual(tokens(io.StringIO(edi), chunk_size=1), expected)
+
+    def test_components(self):
+        edi = "NAD+MR+:SVK+92165::260++:'"
+        self.assertEqual(tokens(edi), [('NAD', ['MR', ['', 'SVK'], ['92165', '', '260'], '', ''])])
+        self.assertEqual(tokens(edi), pydifact_tokens(edi))
+
+    def test_service_characters(self):
+        edi = "UNA|*,# !UNB*UNOC|3*a#!b!\nUNZ*1!"
+        self.assertEqual(tokens(edi), [
+            ('UNA', ["|*,# !"]),
+            ('UNB', [['UNOC', '3'], 'a!b']),
+            ('UNZ', ['1']),
+        ])
+
+    def test_repetitions(self):
+        edi = "UNA:+.?*'UNB+UNOC:4+a*b:c+d?*e'"
+        segment = tokens(edi)[1]
+        self.assertEqual(segment, ('UNB', [['UNOC', '4'], Repetitions(['a', ['b', 'c']]), 'd*e']))
+        self.assertIs(type(segment[1][1]), Repetitions)
+
+    def test_unterminated(self):
+        with self.assertRaises(ValueError):
+            tokens("UNB+UNOC:3'UNH+1")
+
+    def test_parse_bytes(self):
+        parser = EDIParser(self.edi.encode('utf-8'), 'edi', '99999', 'Uzbekistan')
+        self.assertEqual(parser.toEdi(), EDIParser(self.edi, 'edi', '99999', 'Uzbekistan').toEdi())
+
+    def test_buffers(self):
+        expected = tokens(self.edi)
+        encoded = self.edi.encode('utf-8')
+        self.assertEqual(tokens(bytearray(encoded)), expected)
+        self.assertEqual(tokens(memoryview(encoded)), expected)
+        with tempfile.TemporaryFile() as fh:
+            fh.write(encoded)
+            fh.flush()
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                self.assertEqual(tokens(mapped), expected)
+                parser = EDIParser(mapped, 'edi', '99999', 'Uzbekistan')
+                self.assertEqual(parser.toEdi(), EDIParser(self.edi, 'edi', '99999', 'Uzbekistan').toEdi())
+
+    def test_encoding(self):
+        edi = "UNA:+.? 'NAD+MS+++Åke Ström?'s'"
+        expected = [('UNA', [":+.? '"]), ('NAD', ['MS', '', '', "Åke Ström's"])]
+        self.assertEqual(tokens(edi.encode('utf-8')), expected)
+        self.assertEqual(tokens(edi.encode('latin-1'), encoding='latin-1'), expected)
+        self.assertEqual(tokens(io.BytesIO(edi.encode('utf-8')), chunk_size=1), expected)
+
+    def test_raw_segments(self):
+        tokenizer = EDITokenizer(self.edi.encode('utf-8'))
+        raw = list(tokenizer.raw_segments())
+        self.assertIsNone(raw[0])
+        self.assertEqual(raw[1][:4], b'UNB+')
+        self.assertEqual([tokenizer.tag(r) for r in raw[:3]], ['UNA', 'UNB', 'UNH'])
+        self.assertEqual(tuple(tokenizer.segment(raw[2])), ('UNH', ['1', ['UTILTS', 'D', '02B', 'UN', 'E5SE1B']]))
+
+    def test_parse_mail_bytes(self):
+        mail = mail_with(self.edi)
+        parser = EDIParser(mail, 'mail', '99999', 'Uzbekistan')
+        self.assertEqual(parser.toEdi(), EDIParser(self.edi, 'edi', '99999', 'Uzbekistan').toEdi())
+        self.assertEqual(EDIParser(mail.decode('ascii'), 'mail', '99999', 'Uzbekistan').toEdi(), parser.toEdi())
+        response = parser.toMail(list(parser.segments.children))
+        self.assertEqual((response['From'], response['To']), ('us@example.com', 'partner@example.com'))
@@ -0,0 +1,27 @@
+import unittest
+
+from ediel_parser.lib.segmentDefinitions import definitions
+from ediel_parser.lib.UNSegment import UNSegment
+
+
+class TestUNSegment(unittest.TestCase):
+
+    def test_matches_definition(self):
+        for tag, definition in definitions.items():
+            segment = UNSegment(tag)
+            self.assertEqual(segment.toDict(), definition.toDict())
+            self.assertEqual(segment.toList(), definition.toList())
+
+    def test_independent_copies(self):
+        qty = UNSegment('QTY')
+        qty.load([['220', '1486']])
+        other = UNSegment('QTY')
+        self.assertEqual(qty['quantity_details']['quantity'].value, '1486')
+        self.assertIsNone(other['quantity_details']['quantity'].value)
+        self.assertIsNone(definitions['QTY']['quantity_details']['quantity'].value)
+        self.assertIsNot(qty.values, other.values)
+
+    def test_unknown_tag(self):
+        segment = UNSegment('XYZ')
+        self.assertEqual(segment.tag, 'XYZ')
+        self.assertEqual(len(segment), 0)
@@ -0,0 +1,28 @@
+import unittest
+
+from ediel_parser.lib.EDIParser import EDIParser
+
+
+class TestUtiltsErr(unittest.TestCase):
+    fixture = 'tests/fixtures/1b.edi'
+
+    def setUp(self):
+        with open(self.fixture) as fh:
+            edi = fh.read()
+        # give the second transaction its own status
+        head, second = edi.split("IDE+24+E230417749097'")
+        edi = head + "IDE+24+E230417749097'" + second.replace("STS+7++E88::260'", "STS+7++E89::260'")
+        self.parser = EDIParser(edi, 'edi', '99999', 'Uzbekistan')
+
+    def runTest(self):
+        utilts = self.parser.create_utilts_err(self.parser.segments, ['E19', 'E50'])
+        tags = [s.tag for s in utilts]
+        self.assertEqual(tags.count('IDE'), 2)
+        first = tags.index('IDE')
+        second = tags.index('IDE', first + 1)
+        self.assertEqual(tags[first:second], ['IDE', 'LOC', 'LOC', 'STS', 'STS', 'RFF', 'RFF'])
+
+        locs = [s['place-location_qualifier'].value for s in utilts if s.tag == 'LOC']
+        self.assertEqual(locs, ['172', '239', '172', '239'])
+        statuses = [s['status_reason_1']['status_reason-coded'].value for s in utilts if s.tag == 'STS']
+        self.assertEqual(statuses, ['E88', 'E19', 'E89', 'E50'])
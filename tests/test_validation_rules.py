@@ -0,0 +1,73 @@
+import unittest
+
+from ediel_parser.lib.EDIParser import EDIParser
+from ediel_parser.lib.UNSegment import UNSegment
+import ediel_parser.lib.validationRules as rules
+
+
+class CountingRule(rules.Rule):
+    name = 'qty_count'
+    tags = ('QTY',)
+
+    def reset(self):
+        self.count = 0
+
+    def feed(self, segment):
+        self.count += 1
+
+    def result(self):
+        return self.count
+
+
+class TestValidationRules(unittest.TestCase):
+    fixture = 'tests/fixtures/1b.edi'
+
+    def parser(self, payload):
+        return EDIParser(payload, 'edi', '99999', 'Uzbekistan')
+
+    def setUp(self):
+        with open(self.fixture) as fh:
+            self.edi = fh.read()
+
+    def test_valid(self):
+        verdict = self.parser(self.edi).validate()
+        self.assertTrue(verdict['ref_qualifier'])
+        self.assertTrue(verdict['reg_time'])
+        self.assertTrue(verdict['reg_moment'])
+        self.assertTrue(verdict.valid)
+        self.assertIsNone(verdict.incorrect_field)
+        self.assertEqual(verdict.errors, [])
+
+    def test_missing_ref_qualifier(self):
+        verdict = self.parser(self.edi.replace("DTM+137:202304172100:203'\n", '')).validate()
+        self.assertFalse(verdict['ref_qualifier'])
+        self.assertEqual(verdict.incorrect_field, '512')
+
+    def test_missing_reg_moment(self):
+        verdict = self.parser(self.edi.replace("RFF+MG:M-0131'\n", '').replace("RFF+MG:M-0132'\n", '')).validate()
+        self.assertTrue(verdict['ref_qualifier'])
+        self.assertFalse(verdict['reg_moment'])
+        self.assertEqual(verdict.incorrect_field, '224')
+
+    def test_negative_quantity(self):
+        verdict = self.parser(self.edi.replace("QTY+136:42'", "QTY+136:-42'")).validate()
+        self.assertEqual(verdict.errors, ['E98'])
+
+    def test_same_as_single_checks(self):
+        parser = self.parser(self.edi)
+        verdict = parser.validate()
+        self.assertEqual(verdict['ref_qualifier'], parser.check_ref_qualifier(parser.segments))
+        self.assertEqual(verdict['reg_time'], parser.check_reg_time(parser.segments))
+        self.assertEqual(verdict['reg_moment'], parser.check_reg_moment(parser.segments))
+
+    def test_custom_rule(self):
+        parser = self.parser(self.edi)
+        verdict = parser.validate(rule_set=rules.APERAK_RULES + rules.RuleSet(CountingRule()))
+        self.assertEqual(verdict['qty_count'], 6)
+        self.assertTrue(verdict.valid)
+
+    def test_rule_needs_result(self):
+        class Unfinished(rules.Rule):
+            name = 'unfinished'
+        with self.assertRaises(TypeError):
+            Unfinished()
@@ -1,4 +1,97 @@
+import base64
+import smtplib
+from email.mime.text import MIMEText
+
+
 def get_tag(ediel_result_list, tag):
     for ediel_result in ediel_result_list:
         if ediel_result.tag == tag:
-            return ediel_result
\ No newline at end of file
+            return ediel_result
+
+
+def mail_with(edi, sender='partner@example.com'):
+    return (
+        'From: {}\r\nTo: us@example.com\r\n'.format(sender) +
+        'Content-Type: multipart/mixed; boundary="b"\r\n\r\n'
+        '--b\r\nContent-Type: application/edifact\r\n'
+        'Content-Disposition: attachment; filename="edifact.edi"\r\n'
+        'Content-Transfer-Encoding: base64\r\n\r\n'
+        + base64.encodebytes(edi.encode('utf-8')).decode('ascii') +
+        '--b--\r\n'
+    ).encode('ascii')
+
+
+def mail_to(to):
+    mail = MIMEText('APERAK')
+    mail['From'], mail['To'] = 'us@example.com', to
+    return mail
+
+
+class FakeCom:
+    """
+    Communicator on a dict of mails by id: searches return the mails
+    not answered and the flagged ones like SEARCH_QUERY of mailPipeline,
+    mails to refuse_to are refused with refuse, sent mails and stored
+    flags are recorded
+    """
+    mailbox = 'INBOX'
+
+    def __init__(self, mails):
+        self.mails = mails
+        self.sent = []
+        self.stored = []
+        self.connects = 0
+        self.closed = 0
+        self.fetches = 0
+        self.refuse_to = None
+        self.refuse = smtplib.SMTPServerDisconnected('gone')
+        self.drop = False
+        self.pool = self
+        self.appended = []
+        self.answered = set()
+        self.flagged = set()
+
+    def ensure_imap(self):
+        self.connects += 1
+
+    def close(self):
+        self.closed += 1
+
+    def imap_search_query(self, query):
+        if self.drop:
+            raise OSError('connection reset')
+        return [i.encode('utf-8') for i in self.matching()]
+
+    def matching(self):
+        return [i for i in self.mails if i not in self.answered or i in self.flagged]
+
+    def search_new(self, query, checkpoint, again=None):
+        saved = checkpoint.get(self.mailbox)
+        last_uid = 0 if saved is None else saved[1]
+        new = [i for i in self.matching() if int(i) > last_uid]
+        old = [i for i in self.mails if i in self.flagged and int(i) <= last_uid] if again is not None else []
+        return old + new, (1, max([last_uid] + [int(i) for i in new]))
+
+    def format_mail_ids(self, mail_ids):
+        return [i.decode('utf-8') for i in mail_ids]
+
+    def fetch_mails(self, mail_ids):
+        self.fetches += 1
+        for mail_id in mail_ids:
+            yield mail_id, self.mails[mail_id]
+
+    def send_many(self, mails):
+        errors = [self.refuse if mail['To'] == self.refuse_to else None for mail in mails]
+        self.sent += [mail for mail, error in zip(mails, errors) if error is None]
+        return errors
+
+    def append_sent(self, mails):
+        self.appended += mails
+
+    def store_flags(self, mail_ids, command, flags):
+        self.stored.append((mail_ids, command, flags))
+        if command == '+FLAGS' and '\\Answered' in flags:
+            self.answered.update(mail_ids)
+        if command == '-FLAGS' and '\\Flagged' in flags:
+            self.flagged.difference_update(mail_ids)
+        return mail_ids